@@ -20,8 +20,10 @@ const RestaurantDetails = () => {
     address: "",
     reviews: [],
     favorited_by: [],
+    favorite_count: 0,
     food_users: [],
   });
+  const [isFavorite, setIsFavorite] = useState(false);
   const [showReviewForm, setShowReviewForm] = useState(false);
   const { enqueueSnackbar } = useSnackbar();
 
@@ -29,6 +31,23 @@ const RestaurantDetails = () => {
     fetchRestaurantDetails();
   }, [id]);
 
+  useEffect(() => {
+    fetchIsFavorite();
+  }, [id, currentUser?.id]);
+
+  // favorited_by ne contient que la première page : on interroge directement
+  // la liste des favoris filtrée sur l'utilisateur connecté.
+  const fetchIsFavorite = () => {
+    if (!currentUser) {
+      setIsFavorite(false);
+      return;
+    }
+    fetch(`/restaurants/${id}/favorited_by?food_user_id=${currentUser.id}`)
+      .then((resp) => (resp.ok ? resp.json() : []))
+      .then((favorites) => setIsFavorite(favorites.length > 0))
+      .catch(() => setIsFavorite(false));
+  };
+
   const fetchRestaurantDetails = () => {
     fetch(`/restaurants/${id}`)
       .then((resp) => resp.json())
@@ -60,6 +79,7 @@ const RestaurantDetails = () => {
       .then((response) => response.json())
       .then(() => {
         fetchRestaurantDetails();
+        fetchIsFavorite();
         enqueueSnackbar("Favorite added successfully!", { variant: "success" });
       })
       .catch((error) => {
@@ -74,6 +94,7 @@ const RestaurantDetails = () => {
       .then((response) => response.json())
       .then(() => {
         fetchRestaurantDetails();
+        fetchIsFavorite();
         enqueueSnackbar("Favorite removed successfully!", {
           variant: "success",
         });
@@ -205,8 +226,6 @@ const RestaurantDetails = () => {
     }
   };
 
-  const isFavorite = restaurant.favorited_by.includes(currentUser?.username);
-
   return (
     <div className="one_restaurant">
       <div className="image-container">
@@ -273,7 +292,7 @@ const RestaurantDetails = () => {
       </div>
 
       <aside className="favorites-container">
-        <h3>Itilizatè ki favorize Restoran:</h3>
+        <h3>Itilizatè ki favorize Restoran ({restaurant.favorite_count}):</h3>
         <ul>
           {/* List of users who favorited */}
           {restaurant.favorited_by.map((username, index) => (
@@ -14,19 +14,27 @@ const Restaurants = () => {
     const fetchRestaurants = async () => {
       setIsLoading(true);
       try {
-        const response = await fetch("/restaurants");
-        if (!response.ok) {
-          throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        if (
-          response.headers.get("content-type")?.includes("application/json")
-        ) {
-          const data = await response.json();
-          setRestaurants(data);
-          setFilteredRestaurants(data);
-        } else {
-          throw new Error("Response not JSON");
-        }
+        // The API returns pages of at most 100 restaurants; the next page's
+        // cursor is announced in the X-Next-Cursor header.
+        const data = [];
+        let cursor = null;
+        do {
+          const params = new URLSearchParams({ limit: "100" });
+          if (cursor) params.set("cursor", cursor);
+          const response = await fetch(`/restaurants?${params}`);
+          if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+          }
+          if (
+            !response.headers.get("content-type")?.includes("application/json")
+          ) {
+            throw new Error("Response not JSON");
+          }
+          data.push(...(await response.json()));
+          cursor = response.headers.get("X-Next-Cursor");
+        } while (cursor);
+        setRestaurants(data);
+        setFilteredRestaurants(data);
       } catch (error) {
         setAlertMessage(error.message); // Update alert message state
       } finally {
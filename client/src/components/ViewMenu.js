@@ -8,10 +8,10 @@ const ViewMenu = () => {
   const [isLoading, setIsLoading] = useState(true);
 
   useEffect(() => {
-    fetch(`/menus?restaurant_id=${id}`)
+    fetch(`/restaurants/${id}/menus`)
       .then((response) => response.json())
       .then((data) => {
-        setMenus(data);
+        setMenus(data.menus || []);
         setIsLoading(false);
       })
       .catch((error) => {
@@ -34,10 +34,9 @@ const ViewMenu = () => {
             <section key={menu.id} className="menu-section">
               <h3 className="menu-section-title">{menu.name}</h3>
               <ul className="menu-list">
-                {menu.menu_dishes.map((menuDish) => (
-                  <li key={menuDish.id} className="menu-item">
-                    {menuDish.dish.name} - {menuDish.dish.description} - $
-                    {menuDish.dish.price}
+                {menu.dishes.map((dish) => (
+                  <li key={dish.id} className="menu-item">
+                    {dish.name} - {dish.description} - ${dish.price}
                   </li>
                 ))}
               </ul>
@@ -0,0 +1,205 @@
+# aggregates.py
+# Agrégats dénormalisés sur la table restaurants : ceux des critiques
+# (review_count, rating_sum, star_1_count ... star_5_count) et le nombre de
+# favoris (favorite_count).
+#
+# Ils sont maintenus de façon incrémentale par un écouteur de session : à chaque
+# flush, les critiques et favoris ajoutés, modifiés ou supprimés (y compris par
+# cascade, ex. suppression d'un utilisateur) produisent des deltas appliqués par
+# un UPDATE atomique ("col = col + delta") dans la même transaction.
+# La commande `flask aggregates rebuild` les recalcule entièrement (au premier
+# plan, ou dans une tâche de fond avec --background).
+from collections import defaultdict
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, case, event, func, inspect, select, update
+from sqlalchemy.orm import Session
+
+from config import db
+from jobs import job_queue
+from restaurant import Restaurant
+from review import Review
+from favorite import Favorite
+
+STAR_COLUMNS = ('star_1_count', 'star_2_count', 'star_3_count', 'star_4_count', 'star_5_count')
+AGGREGATE_COLUMNS = ('review_count', 'rating_sum') + STAR_COLUMNS
+
+
+def star_bucket(rating):
+    """Arrondit une note (0 à 5) au nombre d'étoiles de l'histogramme (1 à 5)."""
+    if rating is None:
+        return None
+    for stars, upper in ((1, 1.5), (2, 2.5), (3, 3.5), (4, 4.5)):
+        if rating < upper:
+            return stars
+    return 5
+
+
+def _star_bucket_sql(rating):
+    # Même découpage que star_bucket(), en SQL, pour la reconstruction.
+    return case(
+        (rating < 1.5, 1),
+        (rating < 2.5, 2),
+        (rating < 3.5, 3),
+        (rating < 4.5, 4),
+        else_=5,
+    )
+
+
+def _committed_value(obj, key):
+    """Valeur de l'attribut telle qu'elle est en base (avant les modifications en cours)."""
+    history = inspect(obj).attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(obj, key)
+
+
+class _Deltas:
+    def __init__(self):
+        self.by_restaurant = defaultdict(lambda: dict.fromkeys(AGGREGATE_COLUMNS + ('favorite_count',), 0))
+
+    def add(self, restaurant_id, rating, sign):
+        if restaurant_id is None:
+            return
+        delta = self.by_restaurant[restaurant_id]
+        delta['review_count'] += sign
+        stars = star_bucket(rating)
+        if stars is not None:
+            delta['rating_sum'] += sign * rating
+            delta[STAR_COLUMNS[stars - 1]] += sign
+
+    def add_favorite(self, restaurant_id, sign):
+        if restaurant_id is not None:
+            self.by_restaurant[restaurant_id]['favorite_count'] += sign
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_review_deltas(session, flush_context):
+    deltas = _Deltas()
+
+    for obj in session.new:
+        if isinstance(obj, Review):
+            deltas.add(obj.restaurant_id, obj.rating, +1)
+        elif isinstance(obj, Favorite):
+            deltas.add_favorite(obj.restaurant_id, +1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Review):
+            deltas.add(_committed_value(obj, 'restaurant_id'), _committed_value(obj, 'rating'), -1)
+        elif isinstance(obj, Favorite):
+            deltas.add_favorite(_committed_value(obj, 'restaurant_id'), -1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Review) and session.is_modified(obj):
+            old = (_committed_value(obj, 'restaurant_id'), _committed_value(obj, 'rating'))
+            new = (obj.restaurant_id, obj.rating)
+            if old != new:
+                deltas.add(*old, -1)
+                deltas.add(*new, +1)
+        elif isinstance(obj, Favorite) and session.is_modified(obj):
+            old = _committed_value(obj, 'restaurant_id')
+            if old != obj.restaurant_id:
+                deltas.add_favorite(old, -1)
+                deltas.add_favorite(obj.restaurant_id, +1)
+
+    table = Restaurant.__table__
+    connection = session.connection()
+    stale = session.info.setdefault('stale_review_aggregates', set())
+    for restaurant_id, delta in deltas.by_restaurant.items():
+        changes = {name: table.c[name] + value for name, value in delta.items() if value}
+        if not changes:
+            continue
+        connection.execute(update(table).where(table.c.id == restaurant_id).values(**changes))
+        stale.add(restaurant_id)
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _expire_stale_restaurants(session, flush_context):
+    # Les UPDATE ont été faits en SQL : on expire les valeurs en mémoire pour
+    # que le prochain accès relise les compteurs à jour.
+    for restaurant_id in session.info.pop('stale_review_aggregates', ()):
+        restaurant = session.identity_map.get(inspect(Restaurant).identity_key_from_primary_key((restaurant_id,)))
+        if restaurant is not None:
+            session.expire(restaurant, AGGREGATE_COLUMNS + ('favorite_count',))
+
+
+def rebuild_review_aggregates(chunk_size=1000):
+    """
+    Recalcule les agrégats de tous les restaurants à partir de la table reviews :
+    une seule agrégation GROUP BY, puis des UPDATE groupés par paquets.
+    Renvoie le nombre de restaurants ayant au moins une critique.
+    """
+    stars = _star_bucket_sql(Review.rating)
+    rated = Review.rating.isnot(None)
+    rows = db.session.execute(
+        select(
+            Review.restaurant_id,
+            func.count(Review.id),
+            func.coalesce(func.sum(Review.rating), 0),
+            *[func.count(case((rated & (stars == n), 1))) for n in range(1, 6)],
+        ).group_by(Review.restaurant_id)
+    ).all()
+
+    table = Restaurant.__table__
+    db.session.execute(update(table).values(**dict.fromkeys(AGGREGATE_COLUMNS, 0)))
+
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam('restaurant_id'))
+        .values(**{name: bindparam(f'new_{name}') for name in AGGREGATE_COLUMNS})
+    )
+    params = [
+        {'restaurant_id': row[0], **{f'new_{name}': value for name, value in zip(AGGREGATE_COLUMNS, row[1:])}}
+        for row in rows
+    ]
+    for start in range(0, len(params), chunk_size):
+        db.session.execute(statement, params[start:start + chunk_size])
+    db.session.commit()
+    return len(params)
+
+
+def rebuild_favorite_counts():
+    """
+    Recalcule favorite_count de tous les restaurants en un seul UPDATE
+    (sous-requête corrélée servie par l'index favorites(restaurant_id, ...)).
+    """
+    table = Restaurant.__table__
+    favorites = (
+        select(func.count(Favorite.id))
+        .where(Favorite.restaurant_id == table.c.id)
+        .scalar_subquery()
+    )
+    db.session.execute(update(table).values(favorite_count=favorites))
+    db.session.commit()
+    return db.session.scalar(select(func.count()).where(table.c.favorite_count > 0))
+
+
+@job_queue.handler('aggregates.rebuild')
+def rebuild_job(chunk_size=1000):
+    rebuild_review_aggregates(chunk_size)
+    rebuild_favorite_counts()
+
+
+aggregates_cli = AppGroup('aggregates', help="Agrégats dénormalisés des critiques et des favoris.")
+
+
+@aggregates_cli.command('rebuild')
+@click.option('--chunk-size', default=1000, show_default=True, help="Nombre de restaurants par UPDATE groupé.")
+@click.option('--background', is_flag=True, help="Planifie le recalcul dans la file de tâches.")
+def rebuild_command(chunk_size, background):
+    """Recalcule review_count, rating_sum, l'histogramme des étoiles et favorite_count."""
+    if background:
+        job_id = job_queue.enqueue('aggregates.rebuild', {'chunk_size': chunk_size}, key='aggregates.rebuild')
+        click.echo(f"Tâche #{job_id} planifiée." if job_id else "Un recalcul est déjà en attente.")
+        return
+    count = rebuild_review_aggregates(chunk_size)
+    click.echo(f"Agrégats recalculés ({count} restaurants avec critiques).")
+    count = rebuild_favorite_counts()
+    click.echo(f"Favoris recomptés ({count} restaurants en favori).")
+
+
+def init_app(app):
+    app.cli.add_command(aggregates_cli)
@@ -1,7 +1,10 @@
-from flask import jsonify, request, session, make_response
+from flask import current_app, jsonify, request, session, make_response, url_for
 from flask_restful import Resource
 
-from config import app, db, api, bcrypt
+from config import make_app, db, api, bcrypt
+from pagination import (
+    KeysetOrder, PaginationError, decode_cursor, encode_cursor, paginate, parse_limit,
+)
 
 # Import your model files
 from food_user import FoodUser
@@ -11,7 +14,35 @@ from dish import Dish
 from menu_dish import MenuDish
 from review import Review
 from favorite import Favorite
-import requests, json 
+from loading import (
+    DISH_TO_DICT, FOOD_USER_TO_DICT, MENU_TO_DICT, RESTAURANT_TO_DICT, REVIEW_TO_DICT,
+)
+import json 
+import click
+from flask.cli import with_appcontext
+from jobs import job_queue
+import aggregates
+import search
+import geo
+from leaderboard import LeaderboardError, leaderboard
+from recommendations import RecommendationsLoading, recommender
+import index_advisor
+from cache import response_cache
+from negotiation import wire_formats
+from streaming import stream_query, wants_stream
+from schemas import SchemaError, serializer_for
+from read_models import (
+    RESTAURANT_LITE, REVIEW, FAVORITED_BY, NEARBY, LEADERBOARD, RECOMMENDATION, review_query, favorited_by_query,
+    menu_tree_response, nearby_records, leaderboard_records, recommendation_records,
+)
+from hashing import HashingOverloaded, password_hasher
+from session_cache import session_users
+from google_auth import TokenRejected, VerifierUnavailable, google_verifier
+from profiling import request_profiler
+
+def overloaded(error):
+    # Délestage : le pool bcrypt est saturé, le client peut réessayer.
+    return {'message': str(error)}, 503, {'Retry-After': '1'}
 
 
 # La configuration OAuth est conservée mais simplifiée pour le besoin du client.
@@ -19,9 +50,13 @@ import requests, json
 class FoodUsers(Resource):
     def get(self):
         try:
+            options, serialize = serializer_for('food_user', request.args, FOOD_USER_TO_DICT, FoodUser.to_dict)
+            query = FoodUser.query.options(*options)
+            if wants_stream():
+                return stream_query(query, serialize)
             # ✅ Changement 1: Utilisation de la méthode to_dict() par défaut, 
             # qui est rapide et n'inclut pas les relations complètes.
-            food_users = [food_user.to_dict() for food_user in FoodUser.query.all()]
+            food_users = [serialize(food_user) for food_user in query.all()]
             return food_users, 200
         except Exception as e:
             return {'message': str(e)}, 400
@@ -46,6 +81,9 @@ class FoodUsers(Resource):
             session["food_user_id"] = new_food_user.id 
             # ✅ Changement 2: to_dict() sans argument.
             return new_food_user.to_dict(), 201
+        except HashingOverloaded as e:
+            db.session.rollback()
+            return overloaded(e)
         except Exception as e:
             db.session.rollback()
             return {'message': str(e)}, 400
@@ -54,14 +92,19 @@ api.add_resource(FoodUsers, "/food_users")
 
 class FoodUsersById(Resource):
     def get(self, id):
-        food_user = db.session.get(FoodUser, id) 
+        try:
+            options, serialize = serializer_for('food_user', request.args, FOOD_USER_TO_DICT, FoodUser.to_dict)
+        except SchemaError as e:
+            return {'message': str(e)}, 400
+
+        food_user = db.session.get(FoodUser, id, options=options)
         if not food_user:
             return {'message': f"FoodUser {id} non trouvé"}, 404
 
         # ✅ Changement 3: Utilisation de la méthode to_dict() complète du modèle FoodUser.
         # Cette méthode est censée sérialiser toutes les relations (reviews, favorites).
         # Nous supprimons l'argument `rules`.
-        return food_user.to_dict(), 200
+        return serialize(food_user), 200
 
     def patch(self, id):
         food_user = db.session.get(FoodUser, id) 
@@ -83,8 +126,12 @@ class FoodUsersById(Resource):
                 food_user.password_hash = data['newPassword'] 
 
             db.session.commit()
+            session_users.invalidate(id)
             # ✅ Changement 4: to_dict() sans argument.
             return food_user.to_dict(), 200 
+        except HashingOverloaded as e:
+            db.session.rollback()
+            return overloaded(e)
         except Exception as e:
             db.session.rollback()
             return {'message': str(e)}, 400
@@ -100,6 +147,7 @@ class FoodUsersById(Resource):
 
             db.session.delete(food_user)
             db.session.commit()
+            session_users.invalidate(id)
             return {}, 204
         except Exception as e:
             db.session.rollback()
@@ -107,16 +155,53 @@ class FoodUsersById(Resource):
 
 api.add_resource(FoodUsersById, "/food_users/<int:id>")
 
+class FoodUserRecommendations(Resource):
+    def get(self, id):
+        # Calculé en mémoire à partir des voisins de chaque restaurant : pas de cache de réponse.
+        try:
+            limit = parse_limit(request.args.get('limit'), default=10)
+        except PaginationError as e:
+            return {'message': str(e)}, 400
+
+        try:
+            ranking = recommender.recommend(id, limit)
+        except RecommendationsLoading as e:
+            return {'message': str(e)}, 503, {'Retry-After': '5'}
+        if ranking is None:
+            if db.session.get(FoodUser, id) is None:
+                return {'message': f"FoodUser {id} non trouvé"}, 404
+            # Ni favori ni critique positive : les mieux classés.
+            ranking = [(restaurant_id, score) for _, restaurant_id, score in leaderboard.top(limit)]
+        return RECOMMENDATION.response(recommendation_records(ranking))
+
+api.add_resource(FoodUserRecommendations, "/food_users/<int:id>/recommendations")
+
 class Reviews(Resource):
     def get(self):
+        try:
+            options, serialize = serializer_for('review', request.args, REVIEW_TO_DICT, None)
+        except SchemaError as e:
+            return {'message': str(e)}, 400
+
         restaurant_id = request.args.get('restaurant_id')
-        query = Review.query
+
+        if serialize is None and not wants_stream():
+            # Liste par défaut : read model (colonnes + encodeur compilé, sans objets ORM).
+            query = review_query()
+            if restaurant_id:
+                query = query.filter(Review.restaurant_id == restaurant_id)
+            return REVIEW.response(REVIEW.records(query.all()))
+
+        query = Review.query.options(*options)
         if restaurant_id:
             query = query.filter_by(restaurant_id=restaurant_id)
+
+        if wants_stream():
+            return stream_query(query, serialize or Review.to_dict)
             
         # ✅ Changement 5: to_dict() sans argument. La sérialisation dans le modèle Review
         # inclut déjà le FoodUser et le Restaurant en version Lite.
-        reviews = [review.to_dict() for review in query.all()]
+        reviews = [serialize(review) for review in query.all()]
         return reviews, 200
 
     def post(self):
@@ -169,13 +254,74 @@ class Reviews(Resource):
 api.add_resource(Reviews, '/reviews', '/reviews/<int:id>')
 
 
+RESTAURANT_SORTS = {
+    'id': KeysetOrder(Restaurant.id, Restaurant.id),
+    '-id': KeysetOrder(Restaurant.id, Restaurant.id, descending=True),
+    'rating': KeysetOrder(Restaurant.rating, Restaurant.id),
+    '-rating': KeysetOrder(Restaurant.rating, Restaurant.id, descending=True),
+    'name': KeysetOrder(Restaurant.name, Restaurant.id),
+    '-name': KeysetOrder(Restaurant.name, Restaurant.id, descending=True),
+    # Score bayésien persisté par leaderboard.py (NULL : moins de critiques que le minimum).
+    'score': KeysetOrder(Restaurant.bayesian_score, Restaurant.id),
+    '-score': KeysetOrder(Restaurant.bayesian_score, Restaurant.id, descending=True),
+}
+
+
+# Borne supérieure des chaînes commençant par un préfixe donné.
+PREFIX_END = '\U0010ffff'
+
+
 class Restaurants(Resource):
+    @response_cache.cached(lambda: ['restaurants'])
     def get(self):
+        # Pagination keyset : ?limit=&cursor=&sort=(-)id|(-)rating|(-)name
+        # Filtres : ?min_rating=4&name_prefix=Seo
+        args = request.args
+        sort = args.get('sort', 'id')
+        if sort not in RESTAURANT_SORTS:
+            return {'message': f"Tri inconnu '{sort}' (valeurs possibles : {', '.join(RESTAURANT_SORTS)})"}, 400
+
+        try:
+            limit = parse_limit(args.get('limit'))
+            order = RESTAURANT_SORTS[sort]
+            options, serialize = serializer_for('restaurant', args, (), None, extra_columns=[order.column])
+            if serialize is None:
+                # Liste par défaut : read model (colonnes + encodeur compilé, sans objets ORM).
+                query = RESTAURANT_LITE.select()
+            else:
+                query = Restaurant.query.options(*options)
+
+            min_rating = args.get('min_rating')
+            if min_rating not in (None, ''):
+                try:
+                    query = query.filter(Restaurant.rating >= float(min_rating))
+                except ValueError:
+                    return {'message': "Le paramètre 'min_rating' doit être un nombre"}, 400
+
+            name_prefix = args.get('name_prefix')
+            if name_prefix:
+                # Plage sur lower(name) plutôt qu'un ILIKE (lower(name) LIKE ?, sans index) :
+                # ix_restaurants_name_lower est parcouru de lower(p) à lower(p) + U+10FFFF.
+                lowered = db.func.lower(Restaurant.name)
+                query = query.filter(lowered >= db.func.lower(name_prefix),
+                                     lowered < db.func.lower(name_prefix + PREFIX_END))
+
+            page, next_cursor = paginate(query, order, args.get('cursor'), limit, sort)
+        except (PaginationError, SchemaError) as e:
+            return {'message': str(e)}, 400
+
         try:
-            # ❌ Changement 6: Remplacement de `only` par la méthode `restaurant_lite_dict()`.
-            # Nous utilisons la version Lite pour les listes.
-            restaurants = [restaurant.restaurant_lite_dict() for restaurant in Restaurant.query.all()]
-            return restaurants, 200
+            headers = {}
+            if next_cursor:
+                # Le corps reste une liste ; la page suivante est annoncée dans les en-têtes.
+                next_args = args.to_dict()
+                next_args['cursor'] = next_cursor
+                headers['X-Next-Cursor'] = next_cursor
+                headers['Link'] = f'<{url_for("restaurants", **next_args)}>; rel="next"'
+            if serialize is None:
+                return RESTAURANT_LITE.response(RESTAURANT_LITE.records(page), headers=headers)
+            restaurants = [serialize(restaurant) for restaurant in page]
+            return restaurants, 200, headers
         except Exception as e:
             return {'message': str(e)}, 400
 
@@ -198,37 +344,136 @@ class Restaurants(Resource):
 
 api.add_resource(Restaurants, "/restaurants")
 
+class RestaurantsNearby(Resource):
+    @response_cache.cached(lambda: ['restaurants'])
+    def get(self):
+        # Les plus proches d'un point : ?lat=47.61&lng=-122.33&radius=<km>&limit=
+        args = request.args
+        try:
+            lat, lng, radius = geo.parse_position(
+                args,
+                current_app.config.get('NEARBY_DEFAULT_RADIUS_KM', 5),
+                current_app.config.get('NEARBY_MAX_RADIUS_KM', 50),
+            )
+            limit = parse_limit(args.get('limit'), default=20)
+        except (geo.GeoError, PaginationError) as e:
+            return {'message': str(e)}, 400
+
+        hits = geo.nearest(lat, lng, radius, limit)
+        return NEARBY.response(nearby_records(hits))
+
+api.add_resource(RestaurantsNearby, "/restaurants/nearby")
+
+class RestaurantLeaderboard(Resource):
+    @response_cache.cached(lambda: ['restaurants'])
+    def get(self):
+        # Classement bayésien en mémoire : ?limit= et, au choix, ?city= ou ?category=
+        args = request.args
+        try:
+            limit = parse_limit(args.get('limit'), default=10)
+            ranking = leaderboard.top(limit, city=args.get('city'), category=args.get('category'))
+        except (LeaderboardError, PaginationError) as e:
+            return {'message': str(e)}, 400
+        return LEADERBOARD.response(leaderboard_records(ranking))
+
+api.add_resource(RestaurantLeaderboard, "/leaderboard")
+
+# Favoris d'un restaurant, du plus récent au plus ancien (index favorites(restaurant_id, created_at)).
+FAVORITED_BY_SORT = '-created_at'
+FAVORITED_BY_ORDER = KeysetOrder(Favorite.created_at, Favorite.id, descending=True)
+FAVORITED_BY_FIRST_PAGE = 20
+
 class RestaurantsById(Resource):
+    @response_cache.cached(lambda id: [f'restaurant:{id}', 'restaurant-details'])
     def get(self, id):
-        restaurant = db.session.get(Restaurant, id)
+        try:
+            options, serialize = serializer_for('restaurant', request.args, RESTAURANT_TO_DICT, None)
+        except SchemaError as e:
+            return {'message': str(e)}, 400
+
+        # Tout le graphe sérialisé par to_dict() est chargé en un nombre fixe de requêtes.
+        restaurant = db.session.get(Restaurant, id, options=options)
         if not restaurant:
             return {'message': f"Restaurant {id} non trouvé"}, 404
+
+        if serialize is not None:
+            # Sélection explicite (?fields= / ?include=) : pas de mise en forme supplémentaire.
+            return serialize(restaurant), 200
             
-        # ✅ Changement 7: to_dict() sans argument. La sérialisation complète inclut les menus, 
-        # les critiques et les favoris.
+        # ✅ Changement 7: to_dict() sans argument. La sérialisation complète inclut les menus
+        # et les critiques ; les favoris se limitent au compteur (favorite_count).
         restaurant_dict = restaurant.to_dict() 
         
-        # Logique pour formater 'favorited_by' (maintenue)
-        if 'favorites' in restaurant_dict:
-            # On assume que la sérialisation de Favorite inclut bien food_user en mode lite
-            restaurant_dict['favorited_by'] = [fav.get('food_user', {}).get('username') 
-                                                   for fav in restaurant_dict['favorites'] 
-                                                   if fav.get('food_user')]
-            del restaurant_dict['favorites']
+        # 'favorited_by' : première page seulement (les plus récents), la suite
+        # via GET /restaurants/<id>/favorited_by?cursor=<favorited_by_next_cursor>.
+        page, next_cursor = paginate(favorited_by_query(id), FAVORITED_BY_ORDER,
+                                     limit=FAVORITED_BY_FIRST_PAGE, sort_name=FAVORITED_BY_SORT)
+        restaurant_dict['favorited_by'] = [row.username for row in page]
+        restaurant_dict['favorited_by_next_cursor'] = next_cursor
             
         return restaurant_dict, 200
 
 api.add_resource(RestaurantsById, "/restaurants/<int:id>")
 
-@app.route('/menus')
+class RestaurantFavoritedBy(Resource):
+    @response_cache.cached(lambda id: [f'restaurant:{id}', 'restaurant-details'])
+    def get(self, id):
+        # Pagination keyset : ?limit=&cursor= ; ?food_user_id= pour savoir si un utilisateur l'a en favori.
+        args = request.args
+        query = favorited_by_query(id)
+        food_user_id = args.get('food_user_id')
+        if food_user_id not in (None, ''):
+            try:
+                query = query.filter(Favorite.food_user_id == int(food_user_id))
+            except ValueError:
+                return {'message': "Le paramètre 'food_user_id' doit être un entier"}, 400
+        try:
+            limit = parse_limit(args.get('limit'))
+            page, next_cursor = paginate(query, FAVORITED_BY_ORDER, args.get('cursor'), limit, FAVORITED_BY_SORT)
+        except PaginationError as e:
+            return {'message': str(e)}, 400
+
+        if not page and not args.get('cursor') and db.session.get(Restaurant, id) is None:
+            return {'message': f"Restaurant {id} non trouvé"}, 404
+
+        headers = {}
+        if next_cursor:
+            next_args = args.to_dict()
+            next_args['cursor'] = next_cursor
+            headers['X-Next-Cursor'] = next_cursor
+            headers['Link'] = f'<{url_for("restaurantfavoritedby", id=id, **next_args)}>; rel="next"'
+        return FAVORITED_BY.response(FAVORITED_BY.records(page), headers=headers)
+
+api.add_resource(RestaurantFavoritedBy, "/restaurants/<int:id>/favorited_by")
+
+class RestaurantMenus(Resource):
+    # Arbre compact des menus du restaurant (menus -> plats), lu en une requête.
+    @response_cache.cached(lambda id: [f'menu-tree:{id}', 'menu-trees'])
+    def get(self, id):
+        response = menu_tree_response(id)
+        if response is None:
+            return {'message': f"Restaurant {id} non trouvé"}, 404
+        return response
+
+api.add_resource(RestaurantMenus, "/restaurants/<int:id>/menus")
+
+@response_cache.cached(lambda: ['menus'], unless=wants_stream)
 def get_menus():
+    try:
+        options, serialize = serializer_for('menu', request.args, MENU_TO_DICT, Menu.to_dict)
+    except SchemaError as e:
+        return make_response({'message': str(e)}, 400)
+
     restaurant_id = request.args.get('restaurant_id')
-    query = Menu.query
+    query = Menu.query.options(*options)
     if restaurant_id:
         query = query.filter_by(restaurant_id=restaurant_id)
+
+    if wants_stream():
+        return stream_query(query, serialize)
         
     # ✅ Changement 8: to_dict() sans argument.
-    menus = [menu.to_dict() for menu in query.all()]
+    menus = [serialize(menu) for menu in query.all()]
     return jsonify(menus)
 
 
@@ -282,10 +527,15 @@ class FavoritesById(Resource):
 api.add_resource(FavoritesById, "/favorites/<int:id>")
 
 class Dishes(Resource):
+    @response_cache.cached(lambda: ['dishes'], unless=wants_stream)
     def get(self):
         try:
+            options, serialize = serializer_for('dish', request.args, DISH_TO_DICT, Dish.to_dict)
+            query = Dish.query.options(*options)
+            if wants_stream():
+                return stream_query(query, serialize)
             # ✅ Changement 10: to_dict() sans argument.
-            dishes = [dish.to_dict() for dish in Dish.query.all()]
+            dishes = [serialize(dish) for dish in query.all()]
             return dishes, 200
         except Exception as e:
             return {'message': str(e)}, 400
@@ -304,6 +554,33 @@ class Dishes(Resource):
 
 api.add_resource(Dishes, "/dishes")
 
+class Search(Resource):
+    def get(self):
+        # Recherche plein texte : ?q=tofu&type=restaurants|dishes&limit=&cursor=
+        args = request.args
+        kind = args.get('type', 'restaurants')
+        try:
+            limit = parse_limit(args.get('limit'))
+            offset = decode_cursor(args['cursor'], f'search:{kind}')[0] if args.get('cursor') else 0
+            results, has_more = search.search(kind, args.get('q'), limit, offset)
+        except (PaginationError, search.SearchError) as e:
+            return {'message': str(e)}, 400
+
+        if kind == 'restaurants':
+            items = [restaurant.restaurant_lite_dict() for restaurant in results]
+        else:
+            items = [dish.dish_lite_dict() for dish in results]
+
+        headers = {}
+        if has_more:
+            next_args = args.to_dict()
+            next_args['cursor'] = encode_cursor(f'search:{kind}', [offset + limit])
+            headers['X-Next-Cursor'] = next_args['cursor']
+            headers['Link'] = f'<{url_for("search", **next_args)}>; rel="next"'
+        return items, 200, headers
+
+api.add_resource(Search, "/search")
+
 class Login(Resource): 
     # 🌟 CLASSE CORRIGÉE POUR L'ERREUR DE CONNEXION 🌟
     def post(self): 
@@ -317,18 +594,26 @@ class Login(Resource):
                 # 💡 CORRECTION 2: Utiliser 401 Unauthorized (Non Autorisé) au lieu de 403
                 return {'message': 'Nom d\'utilisateur et mot de passe requis'}, 401
 
-            user = FoodUser.query.filter(
+            user = FoodUser.query.options(*FOOD_USER_TO_DICT).filter(
                 (FoodUser.username == login_id) | 
                 (FoodUser.email == login_id) 
             ).first()
 
             if user and user.authenticate(password):
                 session['food_user_id'] = user.id
+                try:
+                    # Mise à niveau transparente du facteur de coût bcrypt.
+                    if user.rehash_if_needed(password):
+                        db.session.commit()
+                except HashingOverloaded:
+                    db.session.rollback()  # on réessaiera à la prochaine connexion
                 # ✅ Changement 12: to_dict() sans argument.
                 return user.to_dict(), 200
             else:
                 # 💡 CORRECTION 3: Utiliser 401 Unauthorized au lieu de 403
                 return {'message': 'Identifiants Invalides'}, 401
+        except HashingOverloaded as e:
+            return overloaded(e)
         except Exception as e:
             return {'message': str(e)}, 400
     # ----------------------------------------------------
@@ -351,10 +636,11 @@ class CheckSession(Resource):
         if food_user_id is None:
             return {"message": "Non Autorisé"}, 401
             
-        # 3. Si l'ID existe, tenter de charger l'utilisateur. 
-        if user := db.session.get(FoodUser, food_user_id):
+        # 3. Si l'ID existe, charger l'identité de l'utilisateur (cache en mémoire,
+        # sinon une requête légère). Le profil complet reste sur /food_users/<id>.
+        if identity := session_users.load(food_user_id):
             # L'utilisateur est trouvé et la session est valide
-            return user.to_dict(), 200
+            return identity, 200
         else:
             # L'ID était dans la session mais l'utilisateur n'existe plus (ex: supprimé)
             # On nettoie la session et on renvoie 401.
@@ -364,7 +650,6 @@ class CheckSession(Resource):
 api.add_resource(CheckSession, '/check_session')
 
 # Google OAuth route (Personnalisée avec un token envoyé par le client)
-@app.route('/login/google', methods=["POST"])
 def google_login():
     data = request.json 
     access_token = data.get('access_token')
@@ -373,15 +658,13 @@ def google_login():
         return make_response({"message": "Token d'accès manquant"}, 400)
 
     # Récupération des informations utilisateur auprès de Google
-    req = requests.get(
-        f"https://www.googleapis.com/oauth2/v1/userinfo?access_token={access_token}",
-        headers={"Content-Type": "application/json"}
-    )
-    
-    if req.status_code != 200:
-        return make_response({"message": "Échec de la vérification du token Google"}, 400)
-
-    res = req.json()
+    # (session HTTP partagée, délais stricts, cache et disjoncteur : voir google_auth.py)
+    try:
+        res = google_verifier.verify(access_token)
+    except TokenRejected as e:
+        return make_response({"message": str(e)}, 400)
+    except VerifierUnavailable as e:
+        return make_response({"message": str(e)}, 503, {'Retry-After': '5'})
     
     if res.get("verified_email"):
         email = res["email"]
@@ -409,10 +692,49 @@ def google_login():
     return make_response({"message": "Email non vérifié par Google"}, 400)
 
 # Gestionnaire d'erreurs
-@app.errorhandler(404)
 def handle_404(error):
     return make_response({'message': 'La ressource demandée n\'a pas été trouvée'}, 404)
 
 
+@click.command('seed', context_settings={'ignore_unknown_options': True, 'help_option_names': []})
+@click.argument('args', nargs=-1, type=click.UNPROCESSED)
+@with_appcontext
+def seed_command(args):
+    """Remplit la base (mêmes options que python seed.py ; --help pour les voir)."""
+    # Faker et le client Yelp ne sont importés que pour cette commande.
+    import seed
+    seed.main(list(args), current_app._get_current_object())
+
+
+def create_app(overrides=None):
+    """Application complète : base (config.make_app), sous-systèmes, routes et API."""
+    app = make_app(overrides)
+
+    job_queue.init_app(app)
+    aggregates.init_app(app)
+    search.init_app(app)
+    geo.init_app(app)
+    leaderboard.init_app(app)
+    recommender.init_app(app)
+    index_advisor.init_app(app)
+    response_cache.init_app(app)
+    wire_formats.init_app(app)
+    password_hasher.init_app(app)
+    session_users.init_app(app)
+    google_verifier.init_app(app)
+    request_profiler.init_app(app)
+
+    app.add_url_rule('/menus', view_func=get_menus)
+    app.add_url_rule('/login/google', view_func=google_login, methods=["POST"])
+    app.register_error_handler(404, handle_404)
+    api.init_app(app)
+    app.cli.add_command(seed_command)
+    return app
+
+
+# `FLASK_APP=app.py`, `from app import app` (run.py, serve.py, benchmarks).
+app = create_app()
+
+
 if __name__ == '__main__':
     app.run(port=5000, debug=True)
\ No newline at end of file
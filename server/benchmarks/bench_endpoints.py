@@ -0,0 +1,392 @@
+# benchmarks/bench_endpoints.py
+# Banc d'essai des endpoints de app.py à plusieurs tailles de jeu de données.
+#
+#   cd server && python benchmarks/bench_endpoints.py --scales small,medium
+#   python benchmarks/bench_endpoints.py --scales small --save-baseline
+#   python benchmarks/bench_endpoints.py --scales small --fail-on-regression
+#
+# Pour chaque taille, une base synthétique est générée une fois (seed.py
+# --synthetic, mise en cache dans --data-dir) puis copiée : les écritures du
+# banc (connexions, favoris) ne modifient pas la base de référence. Chaque
+# taille tourne dans un processus séparé (DATABASE_URL pointant vers la copie)
+# afin que le pic de mémoire (RSS) mesuré lui soit propre.
+#
+# Deux pilotes : le client de test Flask (séquentiel, nombre exact de requêtes
+# SQL par appel) et un pilote HTTP multi-thread contre un serveur werkzeug
+# local. Pour chaque cas : latences p50/p95/p99, débit, requêtes SQL par appel,
+# erreurs (statut inattendu) et RSS maximal du processus. Les résultats sont
+# comparés à une référence enregistrée (--baseline).
+import argparse
+import json
+import math
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+DEFAULT_BASELINE = os.path.join(SERVER_DIR, 'benchmarks', 'baseline.json')
+
+SCALES = {
+    'small': {'restaurants': 300, 'dishes': 200, 'users': 500, 'reviews': 10000, 'favorites': 2000},
+    'medium': {'restaurants': 2000, 'dishes': 500, 'users': 10000, 'reviews': 200000, 'favorites': 40000},
+    'large': {'restaurants': 10000, 'dishes': 500, 'users': 50000, 'reviews': 1000000, 'favorites': 200000},
+}
+BENCH_PASSWORD = 'password'
+
+
+class Case:
+    """
+    Appel mesuré : `path` et `body` sont des gabarits remplis à chaque requête
+    ({restaurant_id}, {food_user_id}, {username}, {favorite_restaurant}).
+    `scales` limite les listes non paginées aux petites tailles.
+    """
+
+    def __init__(self, name, method, path, body=None, auth=False, expect=(200,), requests=200, scales=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.auth = auth
+        self.expect = expect
+        self.requests = requests
+        self.scales = scales
+        # Les restaurants candidats aux favoris ne sont consommés que par les cas qui en ont besoin.
+        self.needs_favorite = '{favorite_restaurant}' in json.dumps(body)
+
+
+CASES = (
+    Case('Restaurants', 'GET', '/restaurants'),
+    Case('Restaurants?sort=-rating', 'GET', '/restaurants?sort=-rating&limit=20'),
+    Case('RestaurantsNearby', 'GET', '/restaurants/nearby?lat=47.6062&lng=-122.3321&limit=20'),
+    Case('Leaderboard', 'GET', '/leaderboard?limit=20'),
+    Case('RestaurantsById', 'GET', '/restaurants/{restaurant_id}', requests=100),
+    Case('Reviews?restaurant_id', 'GET', '/reviews?restaurant_id={restaurant_id}'),
+    Case('Reviews', 'GET', '/reviews', requests=10, scales=('small',)),
+    Case('get_menus?restaurant_id', 'GET', '/menus?restaurant_id={restaurant_id}'),
+    Case('RestaurantMenus', 'GET', '/restaurants/{restaurant_id}/menus'),
+    Case('RestaurantFavoritedBy', 'GET', '/restaurants/{restaurant_id}/favorited_by'),
+    Case('get_menus', 'GET', '/menus', requests=10, scales=('small',)),
+    Case('Dishes', 'GET', '/dishes', requests=100),
+    Case('FoodUsers', 'GET', '/food_users', requests=10, scales=('small',)),
+    Case('FoodUsersById', 'GET', '/food_users/{food_user_id}'),
+    Case('FoodUserRecommendations', 'GET', '/food_users/{food_user_id}/recommendations'),
+    Case('Login', 'POST', '/login', body={'username': '{username}', 'password': BENCH_PASSWORD}, requests=20),
+    Case('CheckSession', 'GET', '/check_session', auth=True, requests=500),
+    Case('Favorites', 'POST', '/favorites', body={'restaurant_id': '{favorite_restaurant}'}, auth=True,
+         expect=(201,), requests=50),
+)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def peak_rss_mb():
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+# ------------------ CÔTÉ PROCESSUS DE MESURE ------------------
+
+class Fixtures:
+    """Identifiants tirés au hasard (graine fixe) pour remplir les gabarits."""
+
+    def __init__(self, db, seed):
+        from sqlalchemy import func, select
+        from restaurant import Restaurant
+        from food_user import FoodUser
+        from favorite import Favorite
+
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.max_restaurant = db.session.scalar(select(func.max(Restaurant.id))) or 1
+        self.max_user = db.session.scalar(select(func.max(FoodUser.id))) or 1
+        self.usernames = dict(db.session.execute(select(FoodUser.id, FoodUser.username).where(FoodUser.id <= 65)).all())
+        # Restaurants encore absents des favoris de chaque utilisateur de test.
+        self.candidates = {}
+        for user_id in self.usernames:
+            taken = set(db.session.scalars(select(Favorite.restaurant_id).where(Favorite.food_user_id == user_id)))
+            free = [r for r in range(1, self.max_restaurant + 1) if r not in taken]
+            self.rng.shuffle(free)
+            self.candidates[user_id] = iter(free)
+        db.session.remove()
+
+    def values(self, user_id, favorite=False):
+        with self.lock:
+            return {
+                'restaurant_id': self.rng.randint(1, self.max_restaurant),
+                'food_user_id': self.rng.randint(1, self.max_user),
+                'username': self.usernames[user_id],
+                'favorite_restaurant': next(self.candidates[user_id], 1) if favorite else None,
+            }
+
+
+def _render(template, values):
+    if isinstance(template, dict):
+        return {key: _render(value, values) for key, value in template.items()}
+    if not isinstance(template, str):
+        return template
+    if template.startswith('{') and template.endswith('}') and template[1:-1] in values:
+        return values[template[1:-1]]  # valeur brute (un entier reste un entier dans le JSON)
+    return template.format(**values)
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, 'before_cursor_execute', self._increment)
+
+    def _increment(self, *args):
+        with self._lock:
+            self.count += 1
+
+
+def _summary(case, latencies, errors, wall, queries):
+    latencies.sort()
+    n = len(latencies)
+    return {
+        'case': case.name,
+        'requests': n,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'throughput': round(n / wall, 1) if wall else 0.0,
+        'queries_per_request': round(queries / n, 2) if n else 0.0,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def drive_test_client(app, case, fixtures, counter, factor):
+    client = app.test_client()
+    user_id = next(iter(fixtures.usernames))
+    if case.auth:
+        client.post('/login', json={'username': fixtures.usernames[user_id], 'password': BENCH_PASSWORD})
+    latencies, errors, queries = [], 0, 0
+    total = max(1, int(case.requests * factor))
+    started = time.perf_counter()
+    for _ in range(total):
+        values = fixtures.values(user_id, case.needs_favorite)
+        path, body = _render(case.path, values), _render(case.body, values)
+        before = counter.count
+        start = time.perf_counter()
+        response = client.open(path, method=case.method, json=body)
+        response.get_data()
+        latencies.append(time.perf_counter() - start)
+        queries += counter.count - before
+        errors += response.status_code not in case.expect
+    return _summary(case, latencies, errors, time.perf_counter() - started, queries)
+
+
+def drive_http(base_url, case, fixtures, counter, factor, threads):
+    import requests
+
+    total = max(threads, int(case.requests * factor))
+    # Le premier utilisateur est réservé au pilote client de test.
+    user_ids = list(fixtures.usernames)[1:threads + 1]
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def worker(index):
+        user_id = user_ids[index % len(user_ids)]
+        http = requests.Session()
+        if case.auth:
+            http.post(f'{base_url}/login', json={'username': fixtures.usernames[user_id], 'password': BENCH_PASSWORD})
+        local, failed = [], 0
+        for _ in range(total // threads):
+            values = fixtures.values(user_id, case.needs_favorite)
+            path, body = _render(case.path, values), _render(case.body, values)
+            start = time.perf_counter()
+            response = http.request(case.method, base_url + path, json=body)
+            local.append(time.perf_counter() - start)
+            failed += response.status_code not in case.expect
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    before = counter.count
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, range(threads)))
+    wall = time.perf_counter() - started
+    # Inclut les connexions préalables des cas authentifiés (une par thread).
+    return _summary(case, latencies, errors[0], wall, counter.count - before)
+
+
+def run_scale(scale, modes, threads, factor, seed, no_cache):
+    """Exécuté dans le sous-processus : DATABASE_URL désigne déjà la copie de travail."""
+    from werkzeug.serving import make_server
+    from app import app, db
+    from cache import response_cache
+
+    if no_cache:
+        response_cache.backend = None  # mesure à froid : chaque appel touche la base
+
+    with app.app_context():
+        fixtures = Fixtures(db, seed)
+        counter = QueryCounter(db.engine)
+
+    results = []
+    cases = [case for case in CASES if case.scales is None or scale in case.scales]
+    if 'client' in modes:
+        for case in cases:
+            results.append({'scale': scale, 'mode': 'client', **drive_test_client(app, case, fixtures, counter, factor)})
+
+    if 'http' in modes:
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+        try:
+            for case in cases:
+                summary = drive_http(base_url, case, fixtures, counter, factor, threads)
+                results.append({'scale': scale, 'mode': f'http x{threads}', **summary})
+        finally:
+            server.shutdown()
+    return results
+
+
+# ------------------ CÔTÉ ORCHESTRATEUR ------------------
+
+def ensure_dataset(scale, data_dir, seed):
+    """Base de référence de la taille demandée, générée au premier besoin."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f'{scale}-{seed}.db')
+    if os.path.exists(path):
+        return path
+    counts = SCALES[scale]
+    print(f"Génération du jeu de données '{scale}' ({counts['reviews']} critiques)...", flush=True)
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{path}', DATABASE_PROFILE='bulk')
+    command = [
+        sys.executable, 'seed.py', '--synthetic', '--seed', str(seed), '--password', BENCH_PASSWORD,
+        *(arg for key, value in counts.items() for arg in (f'--{key}', str(value))),
+    ]
+    subprocess.run(command, cwd=SERVER_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+    return path
+
+
+def run_in_subprocess(scale, dataset, args):
+    work_dir = tempfile.mkdtemp(prefix=f'bench-{scale}-')
+    try:
+        work_db = os.path.join(work_dir, 'app.db')
+        shutil.copyfile(dataset, work_db)
+        env = dict(os.environ, DATABASE_URL=f'sqlite:///{work_db}')
+        command = [
+            sys.executable, os.path.abspath(__file__), '--run-scale', scale, '--modes', args.modes,
+            '--threads', str(args.threads), '--factor', str(args.factor), '--seed', str(args.seed),
+        ] + (['--no-cache'] if args.no_cache else [])
+        output = subprocess.run(command, cwd=SERVER_DIR, env=env, check=True, capture_output=True, text=True).stdout
+        return json.loads(output.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _key(result):
+    return f"{result['scale']}|{result['mode']}|{result['case']}"
+
+
+def compare(results, baseline, tolerance):
+    """Écarts par rapport à la référence ; renvoie la liste des régressions."""
+    regressions = []
+    for result in results:
+        base = baseline.get(_key(result))
+        if base is None:
+            continue
+        checks = (
+            ('p95_ms', result['p95_ms'] > base['p95_ms'] * (1 + tolerance)),
+            ('throughput', result['throughput'] < base['throughput'] / (1 + tolerance)),
+            ('queries_per_request', result['queries_per_request'] > base['queries_per_request']),
+            ('errors', result['errors'] > base['errors']),
+        )
+        for metric, regressed in checks:
+            if regressed:
+                regressions.append((_key(result), metric, base[metric], result[metric]))
+    return regressions
+
+
+def print_table(results, baseline):
+    header = (f"{'taille':<7} {'pilote':<9} {'cas':<26} {'n':>5} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'req/s':>9} {'sql/req':>8} {'RSS Mo':>7}  vs réf. p95")
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        base = baseline.get(_key(r))
+        delta = f"{(r['p95_ms'] / base['p95_ms'] - 1) * 100:+.0f}%" if base and base['p95_ms'] else ''
+        print(f"{r['scale']:<7} {r['mode']:<9} {r['case']:<26} {r['requests']:>5} {r['errors']:>4} "
+              f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['throughput']:>9.1f} "
+              f"{r['queries_per_request']:>8.2f} {r['peak_rss_mb']:>7.0f}  {delta}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai des endpoints à plusieurs tailles de données.")
+    parser.add_argument('--scales', default='small', help=f"Liste séparée par des virgules parmi {', '.join(SCALES)}.")
+    parser.add_argument('--modes', default='client,http', help="client, http ou les deux.")
+    parser.add_argument('--threads', type=int, default=8, help="Threads du pilote HTTP.")
+    parser.add_argument('--factor', type=float, default=1.0, help="Multiplie le nombre de requêtes de chaque cas.")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-cache', action='store_true', help="Désactive le cache de réponses.")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'belony-bench'))
+    parser.add_argument('--output', help="Écrit les résultats (JSON) dans ce fichier.")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="Enregistre les résultats comme référence.")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Écart toléré (p95, débit) avant régression.")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--run-scale', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    modes = set(args.modes.split(','))
+    if args.run_scale:
+        results = run_scale(args.run_scale, modes, args.threads, args.factor, args.seed, args.no_cache)
+        print(json.dumps(results))
+        return
+
+    results = []
+    for scale in filter(None, args.scales.split(',')):
+        if scale not in SCALES:
+            parser.error(f"taille inconnue '{scale}'")
+        dataset = ensure_dataset(scale, args.data_dir, args.seed)
+        print(f"Mesure de la taille '{scale}'...", flush=True)
+        results += run_in_subprocess(scale, dataset, args)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({_key(r): r for r in results}, f, indent=2, sort_keys=True)
+        print(f"\nRéférence enregistrée dans {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    for key, metric, before, after in regressions:
+        print(f"RÉGRESSION {key} : {metric} {before} -> {after}")
+    if baseline and not regressions:
+        print("\nAucune régression par rapport à la référence.")
+    if args.fail_on_regression and regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
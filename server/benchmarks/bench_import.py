@@ -0,0 +1,94 @@
+# benchmarks/bench_import.py
+# Coût d'import de l'application (python -X importtime -c "import app").
+#
+#   cd server && python benchmarks/bench_import.py
+#   python benchmarks/bench_import.py --repeat 9 --budget-ms 600 --top 20
+#
+# Chaque mesure tourne dans un processus neuf (caches .pyc déjà chauds : une
+# première exécution non comptée les crée). Le temps retenu est le cumul de
+# l'import du module mesuré, hors démarrage de l'interpréteur et modules de
+# site ; la médiane des passages est comparée au budget (--budget-ms, ou la
+# variable IMPORT_BUDGET_MS). Les modules réservés à la ligne de commande ou
+# aux scripts (Alembic, Faker, requests, numpy...) ne doivent pas être importés
+# au démarrage : leur présence est une erreur, comme un dépassement du budget.
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BUDGET_MS = 800
+# Importés à la demande : flask db, seed.py, client Google, backends optionnels.
+FORBIDDEN = ('alembic', 'flask_migrate', 'faker', 'requests', 'numpy', 'scipy')
+
+
+def parse_importtime(stderr):
+    """{module: (propre en µs, cumulé en µs)} d'une sortie -X importtime."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # en-tête
+        name = parts[2].strip()
+        modules[name] = (int(parts[0]), int(parts[1]))
+    return modules
+
+
+def measure(module):
+    env = dict(os.environ)
+    # Comme sous gunicorn / serve.py : pas de commande `flask` (donc pas de Flask-Migrate).
+    env.pop('FLASK_RUN_FROM_CLI', None)
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SERVER_DIR, env=env, capture_output=True, text=True,
+    )
+    if process.returncode:
+        sys.exit(f"échec de l'import de {module} :\n{process.stderr[-2000:]}")
+    return parse_importtime(process.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps d'import de l'application, comparé à un budget.")
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float,
+                        default=float(os.environ.get('IMPORT_BUDGET_MS', DEFAULT_BUDGET_MS)))
+    parser.add_argument('--top', type=int, default=15, help="Modules les plus coûteux affichés.")
+    args = parser.parse_args()
+
+    measure(args.module)  # compile les .pyc : non compté
+    runs = [measure(args.module) for _ in range(args.repeat)]
+    totals = [run[args.module][1] / 1000 for run in runs]
+    median = statistics.median(totals)
+
+    # Coût propre médian de chaque module, hors interpréteur et site.
+    startup = set(measure('sys'))
+    names = set().union(*runs) - startup
+    costs = sorted(
+        ((statistics.median(run.get(name, (0, 0))[0] for run in runs) / 1000, name) for name in names),
+        reverse=True,
+    )
+    print(f"{'module':<48} {'propre':>10}")
+    for cost, name in costs[:args.top]:
+        print(f"{name:<48} {cost:>8.1f}ms")
+    print(f"\nimport {args.module} : médiane {median:.1f} ms "
+          f"(min {min(totals):.1f}, max {max(totals):.1f}, {args.repeat} passages), budget {args.budget_ms:.0f} ms")
+
+    failed = False
+    forbidden = sorted({name.split('.')[0] for name in names} & set(FORBIDDEN))
+    if forbidden:
+        print(f"ÉCHEC : modules importés au démarrage : {', '.join(forbidden)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"ÉCHEC : budget dépassé de {median - args.budget_ms:.1f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
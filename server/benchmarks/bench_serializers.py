@@ -0,0 +1,89 @@
+# benchmarks/bench_serializers.py
+# Compare le chemin ORM actuel (restaurant_lite_dict(), Review.to_dict() puis
+# json.dumps) au read model de read_models.py (colonnes + enregistrements à
+# __slots__ + encodeur compilé) sur la base configurée.
+#
+#   cd server && python benchmarks/bench_serializers.py --repeat 20
+#
+# Pour chaque variante : durée médiane, débit en lignes/s et pic d'allocation
+# mémoire (tracemalloc) d'un passage complet.
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db  # noqa: E402
+from restaurant import Restaurant  # noqa: E402
+from review import Review  # noqa: E402
+from loading import REVIEW_TO_DICT  # noqa: E402
+from read_models import RESTAURANT_LITE, REVIEW, review_query  # noqa: E402
+
+
+def orm_restaurants():
+    return json.dumps([r.restaurant_lite_dict() for r in Restaurant.query.all()])
+
+
+def read_model_restaurants():
+    return RESTAURANT_LITE.encode_list(RESTAURANT_LITE.records(RESTAURANT_LITE.select().all()))
+
+
+def orm_reviews():
+    return json.dumps([r.to_dict() for r in Review.query.options(*REVIEW_TO_DICT).all()])
+
+
+def read_model_reviews():
+    return REVIEW.encode_list(REVIEW.records(review_query().all()))
+
+
+CASES = [
+    ('restaurants', 'orm + restaurant_lite_dict', orm_restaurants),
+    ('restaurants', 'read model', read_model_restaurants),
+    ('reviews', 'orm + Review.to_dict', orm_reviews),
+    ('reviews', 'read model', read_model_reviews),
+]
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        db.session.remove()  # identity map vide à chaque passage
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    db.session.remove()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ORM vs read model sur les listes.")
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    with app.app_context():
+        counts = {'restaurants': Restaurant.query.count(), 'reviews': Review.query.count()}
+        print(f"{'liste':<12} {'variante':<28} {'médiane':>10} {'lignes/s':>12} {'pic mémoire':>12}")
+        baseline = {}
+        for table, label, fn in CASES:
+            median, peak = measure(fn, args.repeat)
+            rows = counts[table]
+            speedup = ''
+            if table in baseline:
+                base_median, base_peak = baseline[table]
+                speedup = f"  x{base_median / median:.1f} plus rapide, {base_peak / max(peak, 1):.1f}x moins d'allocations"
+            else:
+                baseline[table] = (median, peak)
+            print(f"{table:<12} {label:<28} {median * 1000:>8.1f}ms {rows / median:>12,.0f} {peak / 1024:>10,.0f}Ko{speedup}")
+
+
+if __name__ == '__main__':
+    main()
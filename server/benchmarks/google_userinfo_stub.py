@@ -0,0 +1,85 @@
+# benchmarks/google_userinfo_stub.py
+# Serveur local imitant l'endpoint userinfo de Google, pour les tests et les
+# tirs de charge de /login/google sans dépendre du réseau.
+#
+#   python benchmarks/google_userinfo_stub.py --port 8765 --delay-ms 40
+#   GOOGLE_USERINFO_URL=http://127.0.0.1:8765/oauth2/v1/userinfo
+#
+# Jetons acceptés : "stub-<n>" (utilisateur n, e-mail vérifié) et
+# "unverified-<n>" (e-mail non vérifié). Tout autre jeton reçoit un 401, comme
+# chez Google. --error-rate simule des 503 pour exercer le disjoncteur.
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def profile_for(token):
+    kind, _, number = token.rpartition('-')
+    if kind not in ('stub', 'unverified') or not number.isdigit():
+        return None
+    return {
+        'id': f'stub{number}',
+        'email': f'stub.user{number}@example.com',
+        'verified_email': kind == 'stub',
+        'name': f'stub_user_{number}',
+    }
+
+
+class UserInfoHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive : le pool côté API est réutilisé
+    delay = 0.0
+    error_rate = 0.0
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.delay:
+            time.sleep(self.delay)
+        if self.error_rate and random.random() < self.error_rate:
+            return self._send(503, {'error': 'backendError'})
+
+        token = ''
+        authorization = self.headers.get('Authorization', '')
+        if authorization.startswith('Bearer '):
+            token = authorization[len('Bearer '):]
+        else:
+            token = parse_qs(urlparse(self.path).query).get('access_token', [''])[0]
+
+        profile = profile_for(token)
+        if profile is None:
+            return self._send(401, {'error': {'code': 401, 'message': 'Invalid Credentials'}})
+        return self._send(200, profile)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Substitut local de l'endpoint userinfo de Google.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    UserInfoHandler.delay = args.delay_ms / 1000
+    UserInfoHandler.error_rate = args.error_rate
+    server = ThreadingHTTPServer((args.host, args.port), UserInfoHandler)
+    print(f"userinfo de substitution sur http://{args.host}:{args.port}/oauth2/v1/userinfo")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,386 @@
+# cache.py
+# Cache des réponses des endpoints de lecture (/restaurants, /restaurants/<id>,
+# /menus, /dishes) avec ETag fort et réponses 304 sur If-None-Match. Les
+# entrées contiennent le JSON d'origine ; les variantes compressées ou en
+# MessagePack (negotiation.py) sont conservées à part, sous leur propre ETag.
+#
+# Invalidation par étiquettes versionnées : chaque entrée mémorise la version
+# des étiquettes dont elle dépend (ex. "restaurants", "restaurant:12"). Au
+# commit d'une session, les modèles modifiés font incrémenter les versions de
+# leurs étiquettes ; les entrées concernées deviennent périmées sans qu'il soit
+# nécessaire de les retrouver. Le même mécanisme fonctionne avec n'importe quel
+# backend offrant get / set / incr (LRU en mémoire par défaut, Redis ou un
+# substitut local via RESPONSE_CACHE_BACKEND).
+#
+# Les versions ne doivent jamais être évincées : une étiquette revenue à 0
+# redonnerait raison à une entrée plus ancienne stockée sous la version 0. Avec
+# le LRU, elles sont donc tenues à part (TagVersions, un dict non borné : une
+# entrée par étiquette) ; un backend partagé (Redis) les garde lui-même.
+# Sous serve.py, les workers gardent chacun leur LRU mais lisent des versions
+# communes (SharedTagVersions) : une écriture traitée par un worker périme les
+# entrées de tous.
+import hashlib
+import importlib
+import os
+import struct
+import threading
+import zlib
+from functools import wraps
+
+from flask import current_app, request
+from flask_restful import unpack
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from config import api
+from restaurant import Restaurant
+from review import Review
+from menu import Menu
+from menu_dish import MenuDish
+from dish import Dish
+from favorite import Favorite
+from food_user import FoodUser
+from lru import LRUCache
+from negotiation import wire_formats
+
+# En-têtes de la réponse d'origine rejoués lors d'un hit.
+REPLAYED_HEADERS = ('Content-Type', 'Link', 'X-Next-Cursor')
+
+
+# ------------------ BACKENDS ------------------
+
+class CacheBackend:
+    """Interface minimale d'un backend de cache."""
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def incr(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LRUBackend(LRUCache, CacheBackend):
+    """Backend par défaut : LRU en mémoire du processus (lru.py)."""
+
+    local = True
+
+
+class RedisBackend(CacheBackend):
+    """
+    Backend partagé entre processus. Nécessite le paquet `redis` (dépendance
+    optionnelle) ; l'URL peut pointer vers un serveur local de substitution.
+    """
+
+    def __init__(self, url='redis://localhost:6379/0', prefix='response-cache:'):
+        import pickle
+        import redis
+
+        self._pickle = pickle
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key):
+        raw = self._client.get(self._prefix + key)
+        if raw is None:
+            return None
+        if raw.isdigit():
+            return int(raw)
+        return self._pickle.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self._prefix + key, self._pickle.dumps(value), ex=ttl)
+
+    def incr(self, key):
+        return self._client.incr(self._prefix + key)
+
+    def clear(self):
+        for key in self._client.scan_iter(self._prefix + '*'):
+            self._client.delete(key)
+
+
+def _load_backend(app):
+    name = app.config.get('RESPONSE_CACHE_BACKEND', 'lru')
+    if name == 'lru':
+        return LRUBackend(app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+    if name == 'redis':
+        return RedisBackend(app.config.get('RESPONSE_CACHE_URL', 'redis://localhost:6379/0'))
+    # Chemin "module:Classe" vers un backend personnalisé.
+    module_name, _, class_name = name.partition(':')
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    return backend_class(**app.config.get('RESPONSE_CACHE_OPTIONS', {}))
+
+
+# ------------------ VERSIONS DES ÉTIQUETTES ------------------
+
+class TagVersions:
+    """Versions des étiquettes du processus, hors du LRU des réponses (jamais évincées)."""
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, tags):
+        return {tag: self._versions.get(tag, 0) for tag in tags}
+
+    def incr(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+
+class SharedTagVersions:
+    """
+    Versions partagées par les processus créés ensuite par fork (workers de
+    serve.py) : compteurs de 64 bits dans un fichier anonyme projeté en mémoire
+    partagée, une case par empreinte d'étiquette. Deux étiquettes de même
+    empreinte s'invalident l'une l'autre (invalidation en trop, jamais en
+    moins). Les incréments prennent un verrou POSIX (lockf), libéré par le
+    système si le processus meurt ; les lectures n'en prennent pas.
+    """
+
+    def __init__(self, slots=65536):
+        import mmap
+        import tempfile
+
+        self.slots = slots
+        self._file = tempfile.TemporaryFile()
+        self._file.truncate(slots * 8)
+        self._memory = mmap.mmap(self._file.fileno(), slots * 8)
+        # lockf n'exclut que les autres processus : les fils d'un même worker passent par ce verrou.
+        self._lock = threading.Lock()
+
+    def _offset(self, tag):
+        return zlib.crc32(tag.encode()) % self.slots * 8
+
+    def get(self, tags):
+        return {tag: struct.unpack_from('q', self._memory, self._offset(tag))[0] for tag in tags}
+
+    def incr(self, tags):
+        offsets = sorted({self._offset(tag) for tag in tags})
+        if not offsets:
+            return
+        import fcntl
+
+        with self._lock:
+            fcntl.lockf(self._file, fcntl.LOCK_EX)
+            try:
+                for offset in offsets:
+                    struct.pack_into('q', self._memory, offset, struct.unpack_from('q', self._memory, offset)[0] + 1)
+            finally:
+                fcntl.lockf(self._file, fcntl.LOCK_UN)
+
+
+class BackendTagVersions:
+    """Versions conservées dans le backend (partagé entre processus, sans éviction LRU)."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get(self, tags):
+        return {tag: self.backend.get(f'tag:{tag}') or 0 for tag in tags}
+
+    def incr(self, tags):
+        for tag in tags:
+            self.backend.incr(f'tag:{tag}')
+
+
+# ------------------ CACHE DE RÉPONSES ------------------
+
+class ResponseCache:
+    def __init__(self):
+        self.backend = None
+        self.versions = None
+        self.ttl = None
+
+    def init_app(self, app):
+        environ = os.environ
+        app.config.setdefault('RESPONSE_CACHE_ENABLED',
+                              environ.get('RESPONSE_CACHE_ENABLED', '1').lower() not in ('0', 'false'))
+        app.config.setdefault('RESPONSE_CACHE_TTL', 300)
+        # Backend partagé (serve.py avec plusieurs workers) : RESPONSE_CACHE_BACKEND=redis.
+        for key in ('RESPONSE_CACHE_BACKEND', 'RESPONSE_CACHE_URL'):
+            if key in environ:
+                app.config.setdefault(key, environ[key])
+        if app.config['RESPONSE_CACHE_ENABLED']:
+            self.backend = _load_backend(app)
+            self.versions = TagVersions() if getattr(self.backend, 'local', False) else BackendTagVersions(self.backend)
+            self.ttl = app.config['RESPONSE_CACHE_TTL']
+
+    def _tag_versions(self, tags):
+        return self.versions.get(tags)
+
+    def invalidate(self, tags):
+        if self.backend is None:
+            return
+        self.versions.incr(tags)
+
+    def share_versions(self):
+        """
+        Versions communes aux processus créés ensuite par fork (serve.py) ;
+        sans effet avec un backend partagé. Renvoie True si le cache reste
+        local au processus (entrées non partagées, versions partagées).
+        """
+        if not isinstance(self.versions, TagVersions):
+            return False
+        # Les entrées existantes portent des versions de l'ancien registre.
+        self.backend.clear()
+        self.versions = SharedTagVersions()
+        return True
+
+    def clear(self):
+        # Les versions sont conservées : une entrée recréée ne peut pas
+        # reprendre la version d'une entrée plus ancienne.
+        if self.backend is not None:
+            self.backend.clear()
+
+    @staticmethod
+    def _key():
+        args = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+        return f'response:{request.path}?{args}'
+
+    def lookup(self, tags):
+        entry = self.backend.get(self._key())
+        if entry is None or entry['tags'] != self._tag_versions(tags):
+            return None
+        return entry
+
+    def store(self, versions, response):
+        # Les versions sont lues avant de calculer la réponse (voir cached()) :
+        # une écriture concurrente rendra l'entrée immédiatement périmée.
+        entry = {
+            'body': response.get_data(),
+            'status': response.status_code,
+            'headers': [(name, response.headers[name]) for name in REPLAYED_HEADERS if name in response.headers],
+            'etag': hashlib.sha256(response.get_data()).hexdigest()[:32],
+            'tags': versions,
+        }
+        self.backend.set(self._key(), entry, ttl=self.ttl)
+        return entry
+
+    def _respond(self, entry):
+        response = current_app.response_class(entry['body'], status=entry['status'], headers=entry['headers'])
+        response.set_etag(entry['etag'])
+        # Variante négociée (MessagePack, compression) avant la comparaison de
+        # l'ETag : son corps encodé est conservé dans le même backend.
+        wire_formats.apply(response, cache=self.backend, ttl=self.ttl)
+        # Le navigateur doit revalider (If-None-Match) avant de réutiliser sa copie.
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+    def cached(self, tags, unless=None):
+        """
+        Décorateur pour les vues GET. `tags` reçoit les arguments de l'URL et
+        renvoie les étiquettes dont dépend la réponse. `unless` (optionnel) permet
+        de contourner le cache pour certaines requêtes.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.backend is None or request.method != 'GET' or (unless and unless()):
+                    return view(*args, **kwargs)
+
+                entry_tags = tags(**kwargs)
+                entry = self.lookup(entry_tags)
+                if entry is not None:
+                    return self._respond(entry)
+
+                versions = self._tag_versions(entry_tags)
+                result = view(*args, **kwargs)
+                if isinstance(result, current_app.response_class):
+                    response = result
+                else:
+                    data, code, headers = unpack(result)
+                    response = api.make_response(data, code, headers=headers)
+                # Les réponses en flux (streaming.py) ne sont pas mises en cache.
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                return self._respond(self.store(versions, response))
+            return wrapper
+        return decorator
+
+
+response_cache = ResponseCache()
+
+
+# ------------------ INVALIDATION PILOTÉE PAR LES ÉCRITURES ------------------
+# Étiquettes posées par les vues :
+#   "restaurants"           liste GET /restaurants (inclut les agrégats des critiques)
+#   "restaurant:<id>"       détail GET /restaurants/<id>
+#   "restaurant-details"    tous les détails (plats, menus et utilisateurs y sont imbriqués)
+#   "menus" / "dishes"      GET /menus et GET /dishes
+#   "menu-tree:<id>"        arbre GET /restaurants/<id>/menus
+#   "menu-trees"            tous les arbres (un plat peut figurer dans plusieurs restaurants)
+
+def _value(obj, key):
+    history = inspect(obj).attrs[key].history
+    values = list(history.deleted) + list(history.unchanged) + list(history.added)
+    return values or [getattr(obj, key)]
+
+
+def _menu_restaurants(session, menu_ids):
+    # Restaurants des menus touchés par un lien menu/plat (identity map d'abord).
+    restaurant_ids = set()
+    for menu_id in menu_ids:
+        menu = session.get(Menu, menu_id) if menu_id is not None else None
+        if menu is not None:
+            restaurant_ids.add(menu.restaurant_id)
+    return restaurant_ids
+
+
+def tags_for_change(obj, operation, session=None):
+    """Étiquettes à invalider lorsqu'un objet est inséré, modifié ou supprimé."""
+    if isinstance(obj, Restaurant):
+        if operation == 'insert':
+            return {'restaurants'}
+        return {'restaurants', f'restaurant:{obj.id}', 'menus'}
+    if isinstance(obj, Review):
+        # Les agrégats (review_count, average_rating) figurent aussi dans les menus.
+        return {'restaurants', 'menus', *(f'restaurant:{rid}' for rid in _value(obj, 'restaurant_id'))}
+    if isinstance(obj, Favorite):
+        return {f'restaurant:{rid}' for rid in _value(obj, 'restaurant_id')}
+    if isinstance(obj, Menu):
+        trees = {f'menu-tree:{rid}' for rid in _value(obj, 'restaurant_id')}
+        if operation == 'insert':
+            return {'menus', *trees, *(f'restaurant:{rid}' for rid in _value(obj, 'restaurant_id'))}
+        # Le nom du menu apparaît dans les plats de tous les restaurants qui le partagent.
+        return {'menus', 'dishes', 'restaurant-details', *trees}
+    if isinstance(obj, Dish):
+        if operation == 'insert':
+            return {'dishes'}
+        return {'dishes', 'menus', 'restaurant-details', 'menu-trees'}
+    if isinstance(obj, MenuDish):
+        if session is None:
+            trees = {'menu-trees'}
+        else:
+            trees = {f'menu-tree:{rid}' for rid in _menu_restaurants(session, _value(obj, 'menu_id'))}
+        return {'dishes', 'menus', 'restaurant-details', *trees}
+    if isinstance(obj, FoodUser) and operation != 'insert':
+        # Les noms d'utilisateurs figurent dans les critiques et favoris des détails.
+        return {'restaurant-details'}
+    return set()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_tags(session, flush_context):
+    pending = session.info.setdefault('response_cache_tags', set())
+    for operation, objects in (('insert', session.new), ('delete', session.deleted), ('update', session.dirty)):
+        for obj in objects:
+            if operation == 'update' and not session.is_modified(obj):
+                continue
+            pending |= tags_for_change(obj, operation, session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    response_cache.invalidate(session.info.pop('response_cache_tags', ()))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('response_cache_tags', None)
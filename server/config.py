@@ -4,35 +4,68 @@ import os
 # Remote library imports
 from flask import Flask
 from flask_cors import CORS
-from flask_migrate import Migrate
 from flask_restful import Api
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import MetaData
 from flask_bcrypt import Bcrypt
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+import database
+import profiling
 
-# Instantiate app, set attributes
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'  # SQLite database
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.json.compact = False
-app.secret_key = os.environ.get('SECRET_KEY')
+# Extensions : créées sans application, liées par make_app(). Les modèles et
+# les modules n'importent que celles-ci, jamais une application.
 
 # Define metadata, instantiate db
 metadata = MetaData(naming_convention={
     "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
 })
 db = SQLAlchemy(metadata=metadata)
-migrate = Migrate(app, db)
-db.init_app(app)
 
-bcrypt = Bcrypt(app)
+bcrypt = Bcrypt()
 
-# Instantiate REST API
-api = Api(app)
+# Instantiate REST API (les ressources sont déclarées dans app.py)
+api = Api()
+# Encodage JSON des ressources, compté dans le temps "ser" de profiling.py
+api.representation('application/json')(profiling.output_json)
 
-# Instantiate CORS
-CORS(app, supports_credentials=True)  # Enable CORS with support for credentials
+
+def make_app(overrides=None):
+    """
+    Application de base : configuration, base de données, bcrypt et CORS.
+    app.create_app() y ajoute l'API ; seed.py l'utilise telle quelle.
+    """
+    # python-dotenv n'est nécessaire qu'ici, à la création de l'application.
+    from dotenv import load_dotenv
+
+    # Load environment variables
+    load_dotenv()
+
+    # Instantiate app, set attributes
+    app = Flask(__name__)
+    app.json = profiling.ProfiledJSONProvider(app)
+    # URL, pool et pragmas SQLite : voir database.py (DATABASE_URL, DATABASE_PROFILE, ...)
+    database.DatabaseProfile.from_env().apply(app)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.secret_key = os.environ.get('SECRET_KEY')
+    if overrides:
+        app.config.update(overrides)
+
+    db.init_app(app)
+    database.init_app(app)
+    bcrypt.init_app(app)
+
+    # Instantiate CORS
+    # Enable CORS with support for credentials; pagination headers readable by the client
+    CORS(app, supports_credentials=True, expose_headers=['X-Next-Cursor', 'Link'])
+
+    # Flask-Migrate importe Alembic (près de la moitié du temps de démarrage) :
+    # il n'est enregistré que pour la ligne de commande `flask` (flask db ...).
+    if app.config.get('MIGRATIONS', os.environ.get('FLASK_RUN_FROM_CLI') == 'true'):
+        init_migrations(app)
+    return app
+
+
+def init_migrations(app):
+    from flask_migrate import Migrate
+
+    Migrate(app, db, directory=database.MIGRATIONS_DIRECTORY)
@@ -0,0 +1,312 @@
+# database.py
+# Profils de base de données configurés par l'environnement.
+#
+# config.py fixait sqlite:///app.db avec les options par défaut du moteur :
+# journal "rollback" (les lecteurs attendent la fin des écritures) et aucun
+# délai d'attente sur les verrous ("database is locked" dès deux écrivains).
+#
+#   DATABASE_URL       URL SQLAlchemy (défaut sqlite:///app.db, relative au
+#                      dossier instance/ comme avant) ; postgres:// est accepté.
+#   DATABASE_PROFILE   default | durable | bulk : préréglages des pragmas SQLite
+#                      (bulk sert aux chargements massifs de seed.py).
+#   SQLITE_<PRAGMA>    surcharge d'un pragma (SQLITE_BUSY_TIMEOUT=10000, ...) ;
+#                      SQLITE_PRAGMAS="foreign_keys=ON;..." en ajoute d'autres.
+#   DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_TIMEOUT,
+#   DB_POOL_PRE_PING   dimensionnement du pool de connexions.
+#   DB_STATEMENT_TIMEOUT  (ms) délai maximal d'une requête côté PostgreSQL.
+#
+# Les pragmas SQLite sont appliqués à chaque nouvelle connexion du pool. Avec
+# un autre moteur (PostgreSQL local par exemple), seuls les réglages du pool
+# s'appliquent : le reste du code fonctionne sans modification.
+import logging
+import os
+import re
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATABASE_URL = 'sqlite:///app.db'
+MIGRATIONS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+_REVISION = re.compile(r"^revision\s*=\s*['\"]([^'\"]+)['\"]", re.MULTILINE)
+_DOWN_REVISION = re.compile(r"^down_revision\s*=\s*(.+)$", re.MULTILINE)
+
+# Ordre d'application : journal_mode d'abord (il change le comportement des suivants).
+SQLITE_PROFILES = {
+    'default': {
+        'journal_mode': 'WAL',          # lecteurs et écrivain concurrents
+        'synchronous': 'NORMAL',        # sûr en WAL, fsync au checkpoint seulement
+        'busy_timeout': 5000,           # ms d'attente d'un verrou avant "database is locked"
+        'cache_size': -65536,           # 64 Mio de pages en cache par connexion
+        'mmap_size': 268435456,         # 256 Mio de lecture via mmap
+        'temp_store': 'MEMORY',
+    },
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'busy_timeout': 10000,
+        'cache_size': -65536,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+    },
+    'bulk': {
+        # Chargements massifs : la base peut être reconstruite en cas de panne.
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'busy_timeout': 30000,
+        'cache_size': -262144,
+        'mmap_size': 1073741824,
+        'temp_store': 'MEMORY',
+    },
+}
+
+POOL_DEFAULTS = {
+    'pool_size': 5,
+    'max_overflow': 10,
+    'pool_recycle': 1800,
+    'pool_timeout': 30,
+}
+
+
+class DatabaseConfigError(ValueError):
+    """Variable d'environnement de base de données invalide."""
+
+
+def _env_int(environ, name, default):
+    value = environ.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise DatabaseConfigError(f"{name} doit être un entier (reçu {value!r})")
+
+
+def _env_bool(environ, name, default):
+    value = environ.get(name)
+    if value in (None, ''):
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def normalize_url(url):
+    # Les hébergeurs fournissent souvent postgres://, refusé par SQLAlchemy 2.
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+class DatabaseProfile:
+    def __init__(self, url=DEFAULT_DATABASE_URL, name='default', pragmas=None, pool=None,
+                 pool_pre_ping=None, statement_timeout=None):
+        self.url = normalize_url(url)
+        self.name = name
+        self.pragmas = dict(pragmas if pragmas is not None else SQLITE_PROFILES[name])
+        self.pool = dict(POOL_DEFAULTS, **(pool or {}))
+        # Inutile en SQLite (fichier local), utile derrière un réseau.
+        self.pool_pre_ping = (not self.is_sqlite) if pool_pre_ping is None else pool_pre_ping
+        self.statement_timeout = statement_timeout
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        name = environ.get('DATABASE_PROFILE', 'default')
+        if name not in SQLITE_PROFILES:
+            raise DatabaseConfigError(
+                f"DATABASE_PROFILE inconnu '{name}' (valeurs possibles : {', '.join(SQLITE_PROFILES)})"
+            )
+        pragmas = dict(SQLITE_PROFILES[name])
+        for pragma, default in SQLITE_PROFILES[name].items():
+            variable = f'SQLITE_{pragma.upper()}'
+            if isinstance(default, int):
+                pragmas[pragma] = _env_int(environ, variable, default)
+            else:
+                pragmas[pragma] = environ.get(variable) or default
+        for item in filter(None, (p.strip() for p in environ.get('SQLITE_PRAGMAS', '').split(';'))):
+            pragma, sep, value = item.partition('=')
+            if not sep or not pragma.strip().isidentifier():
+                raise DatabaseConfigError(f"SQLITE_PRAGMAS : entrée invalide {item!r} (attendu nom=valeur)")
+            pragmas[pragma.strip().lower()] = value.strip()
+
+        pool = {
+            'pool_size': _env_int(environ, 'DB_POOL_SIZE', POOL_DEFAULTS['pool_size']),
+            'max_overflow': _env_int(environ, 'DB_MAX_OVERFLOW', POOL_DEFAULTS['max_overflow']),
+            'pool_recycle': _env_int(environ, 'DB_POOL_RECYCLE', POOL_DEFAULTS['pool_recycle']),
+            'pool_timeout': _env_int(environ, 'DB_POOL_TIMEOUT', POOL_DEFAULTS['pool_timeout']),
+        }
+        pre_ping = environ.get('DB_POOL_PRE_PING')
+        return cls(
+            environ.get('DATABASE_URL') or DEFAULT_DATABASE_URL,
+            name,
+            pragmas,
+            pool,
+            None if pre_ping in (None, '') else _env_bool(environ, 'DB_POOL_PRE_PING', False),
+            _env_int(environ, 'DB_STATEMENT_TIMEOUT', None),
+        )
+
+    @property
+    def is_sqlite(self):
+        return make_url(self.url).get_backend_name() == 'sqlite'
+
+    @property
+    def is_memory(self):
+        database = make_url(self.url).database
+        return self.is_sqlite and database in (None, '', ':memory:')
+
+    def engine_options(self):
+        options = {'pool_pre_ping': self.pool_pre_ping}
+        if not self.is_memory:
+            # Une base SQLite en mémoire utilise un pool à connexion unique.
+            options.update(self.pool)
+        if self.statement_timeout and make_url(self.url).get_backend_name() == 'postgresql':
+            options['connect_args'] = {'options': f'-c statement_timeout={self.statement_timeout}'}
+        return options
+
+    def apply(self, app):
+        """Renseigne l'URL et les options du moteur avant db.init_app(app)."""
+        app.config['SQLALCHEMY_DATABASE_URI'] = self.url
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = self.engine_options()
+        app.extensions['database_profile'] = self
+
+    def install(self, engine):
+        """Applique les pragmas à chaque connexion SQLite ouverte par `engine`."""
+        if engine.dialect.name != 'sqlite':
+            return
+        statements = [f'PRAGMA {pragma} = {value}' for pragma, value in self.pragmas.items()]
+
+        @event.listens_for(engine, 'connect')
+        def _set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for statement in statements:
+                    cursor.execute(statement)
+            finally:
+                cursor.close()
+
+    def report(self, engine):
+        """Réglages effectivement en vigueur, lus sur une connexion du pool."""
+        pool = engine.pool
+        lines = [
+            ('url', engine.url.render_as_string(hide_password=True)),
+            ('profil', self.name),
+            ('pool', type(pool).__name__),
+        ]
+        if hasattr(pool, 'size'):
+            lines += [
+                ('pool_size', pool.size()),
+                ('max_overflow', getattr(pool, '_max_overflow', None)),
+                ('pool_timeout', getattr(pool, '_timeout', None)),
+            ]
+        lines += [('pool_recycle', pool._recycle), ('pool_pre_ping', pool._pre_ping)]
+
+        with engine.connect() as connection:
+            if engine.dialect.name == 'sqlite':
+                for pragma in self.pragmas:
+                    value = connection.exec_driver_sql(f'PRAGMA {pragma}').scalar()
+                    lines.append((pragma, value))
+            else:
+                version = engine.dialect.server_version_info
+                lines.append(('server_version', '.'.join(str(v) for v in version or ())))
+        return lines
+
+
+def init_app(app):
+    """À appeler après db.init_app(app) : installe les pragmas et la commande CLI."""
+    profile = app.extensions['database_profile']
+    with app.app_context():
+        profile.install(app.extensions['sqlalchemy'].engine)
+    app.cli.add_command(database_cli)
+
+
+def startup_report(app):
+    profile = app.extensions['database_profile']
+    with app.app_context():
+        lines = profile.report(app.extensions['sqlalchemy'].engine)
+    for key, value in lines:
+        logger.info("base de données : %s = %s", key, value)
+    return lines
+
+
+class SchemaOutdated(RuntimeError):
+    """La base n'est pas à la révision de tête des migrations."""
+
+
+def migration_heads(directory=MIGRATIONS_DIRECTORY):
+    """
+    Révisions de tête des scripts de migration, lues dans leurs en-têtes
+    (revision / down_revision) sans importer Alembic.
+    """
+    revisions, parents = set(), set()
+    versions = os.path.join(directory, 'versions')
+    for filename in os.listdir(versions):
+        if not filename.endswith('.py'):
+            continue
+        with open(os.path.join(versions, filename), encoding='utf-8') as f:
+            source = f.read()
+        revision = _REVISION.search(source)
+        if revision is None:
+            continue
+        revisions.add(revision.group(1))
+        down = _DOWN_REVISION.search(source)
+        if down is not None:
+            parents.update(re.findall(r"['\"]([^'\"]+)['\"]", down.group(1)))
+    return revisions - parents
+
+
+def schema_status(app):
+    """(révisions de la base, révisions de tête des migrations) : deux ensembles."""
+    with app.app_context():
+        engine = app.extensions['sqlalchemy'].engine
+        with engine.connect() as connection:
+            if inspect(connection).has_table('alembic_version'):
+                current = set(connection.exec_driver_sql('SELECT version_num FROM alembic_version').scalars())
+            else:
+                current = set()
+    return current, migration_heads()
+
+
+def check_schema(app):
+    """
+    Vérifie, sans rien créer, que la base est à jour ; lève SchemaOutdated
+    sinon. Remplace le db.create_all() exécuté à chaque démarrage.
+    """
+    current, heads = schema_status(app)
+    if current != heads:
+        found = ', '.join(sorted(current)) or 'base vide'
+        raise SchemaOutdated(
+            f"Schéma de la base à la révision {found}, migrations à {', '.join(sorted(heads))} : "
+            f"lancez `flask db upgrade`."
+        )
+    return current
+
+
+def stamp_head(connection):
+    """
+    Marque la base comme étant à la révision de tête des migrations (équivalent
+    de `flask db stamp head`). Pour un schéma créé par db.create_all(), qui
+    correspond aux modèles donc à la tête : seed.py.
+    """
+    connection.execute(text(
+        'CREATE TABLE IF NOT EXISTS alembic_version ('
+        'version_num VARCHAR(32) NOT NULL, '
+        'CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num))'
+    ))
+    connection.execute(text('DELETE FROM alembic_version'))
+    # Paramètres liés par SQLAlchemy : le style du pilote (?, %s...) n'importe pas.
+    insert = text('INSERT INTO alembic_version (version_num) VALUES (:version_num)')
+    for revision in sorted(migration_heads()):
+        connection.execute(insert, {'version_num': revision})
+
+
+database_cli = AppGroup('database', help="Profil et réglages de la base de données.")
+
+
+@database_cli.command('report')
+def report_command():
+    """Affiche les réglages effectifs du moteur et des pragmas SQLite."""
+    for key, value in startup_report(current_app):
+        click.echo(f"{key:<16} {value}")
@@ -2,6 +2,7 @@
 # REMOVED: from sqlalchemy_serializer import SerializerMixin
 from sqlalchemy.orm import validates
 from config import db
+from profiling import serializer
 
 class Dish(db.Model):
     __tablename__ = 'dishes'
@@ -20,6 +21,7 @@ class Dish(db.Model):
 
     # ------------------ SERIALIZATION MANUELLE (LÉGÈRE) ------------------
 
+    @serializer
     def dish_lite_dict(self):
         """
         Version légère de la sérialisation, utilisée pour l'inclusion 
@@ -34,6 +36,7 @@ class Dish(db.Model):
         
     # ------------------ SERIALIZATION MANUELLE (COMPLÈTE) ------------------
 
+    @serializer
     def to_dict(self):
         """
         Sérialisation complète du plat, incluant ses liens d'association (MenuDish).
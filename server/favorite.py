@@ -1,5 +1,6 @@
 # favorite.py
 from config import db
+from profiling import serializer
 from datetime import datetime
 # Note: Assurez-vous d'importer les autres modèles (FoodUser et Restaurant) 
 # si vous les utilisez pour les méthodes lite_dict dans un fichier séparé.
@@ -14,6 +15,9 @@ class Favorite(db.Model):
     # Contrainte pour garantir qu'un utilisateur ne peut avoir qu'un seul favori par restaurant
     __table_args__ = (
         db.UniqueConstraint('food_user_id', 'restaurant_id', name='_user_restaurant_uc'),
+        # food_user_id est couvert par la contrainte ci-dessus, pas restaurant_id.
+        # (restaurant_id, created_at) sert aussi la pagination de favorited_by.
+        db.Index('ix_favorites_restaurant_id_created_at', 'restaurant_id', 'created_at'),
     )
     
     created_at = db.Column(db.DateTime, server_default=db.func.now())
@@ -28,6 +32,7 @@ class Favorite(db.Model):
         return f"<Favorite {self.id}>"
 
     # ------------------ SERIALIZATION MANUELLE ------------------
+    @serializer
     def to_dict(self):
         """
         Sérialise l'objet Favorite en un dictionnaire, 
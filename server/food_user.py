@@ -7,7 +7,9 @@ from sqlalchemy.orm import validates
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.ext.hybrid import hybrid_property
 
-from config import db, bcrypt
+from config import db
+from profiling import serializer
+from hashing import password_hasher
 
 # UserMixin a été supprimé car vous n'utilisez pas Flask-Login
 class FoodUser(db.Model): # REMOVED: SerializerMixin
@@ -37,6 +39,7 @@ class FoodUser(db.Model): # REMOVED: SerializerMixin
 
     # ------------------ SERIALIZATION MANUELLE (LÉGÈRE) ------------------
 
+    @serializer
     def food_user_lite_dict(self):
         """
         Version légère de la sérialisation, utilisée pour l'inclusion dans 
@@ -51,6 +54,7 @@ class FoodUser(db.Model): # REMOVED: SerializerMixin
 
     # ------------------ SERIALIZATION MANUELLE (COMPLÈTE) ------------------
 
+    @serializer
     def to_dict(self):
         """
         Sérialisation complète du FoodUser pour l'API (e.g., /users/<id>).
@@ -96,12 +100,23 @@ class FoodUser(db.Model): # REMOVED: SerializerMixin
 
     @password_hash.setter
     def password_hash(self, new_password):
+        # Le hachage s'exécute dans le pool de hashing.py (peut lever HashingOverloaded).
         if new_password:
-            self._password_hash = bcrypt.generate_password_hash(new_password).decode('utf-8')
+            self._password_hash = password_hasher.generate(new_password)
         else:
             self._password_hash = None
 
     def authenticate(self, password_to_check):
         if not self._password_hash:
             return False
-        return bcrypt.check_password_hash(self._password_hash, password_to_check)
+        return password_hasher.check(self._password_hash, password_to_check)
+
+    def rehash_if_needed(self, password):
+        """
+        À appeler après une authentification réussie : recalcule le hachage si
+        son facteur de coût diffère de la cible actuelle. Renvoie True si modifié.
+        """
+        if not self._password_hash or not password_hasher.needs_rehash(self._password_hash):
+            return False
+        self.password_hash = password
+        return True
@@ -0,0 +1,189 @@
+# geo.py
+# Recherche géographique des restaurants ("autour de moi").
+#
+# Sous SQLite, les coordonnées (latitude, longitude) des restaurants sont
+# indexées dans une table virtuelle R*Tree (restaurants_rtree), tenue à jour
+# par des triggers SQL comme l'index plein texte de search.py : les écritures
+# faites hors de l'ORM (seed, migrations, sqlite3) sont aussi indexées.
+#
+# Les k plus proches voisins sont cherchés dans une boîte englobante qui
+# s'agrandit (doublement du rayon) jusqu'à contenir k restaurants dans le
+# cercle correspondant, ou jusqu'au rayon demandé : seules les entrées de
+# l'arbre recoupant la boîte sont lues. Les distances exactes (haversine) sont
+# calculées en Python sur ces seuls candidats.
+#
+# Sur un autre moteur, la boîte est filtrée par l'index B-tree
+# ix_restaurants_latitude_longitude.
+import math
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, select, text
+
+from config import db
+from restaurant import Restaurant
+
+RTREE_TABLE = 'restaurants_rtree'
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+INITIAL_RADIUS_KM = 1.0
+
+
+class GeoError(ValueError):
+    """Paramètre de recherche géographique invalide."""
+
+
+_HAS_POSITION = "new.latitude IS NOT NULL AND new.longitude IS NOT NULL"
+
+RTREE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {RTREE_TABLE} USING rtree(id, min_lat, max_lat, min_lng, max_lng)",
+    f"CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_ai AFTER INSERT ON restaurants WHEN {_HAS_POSITION} BEGIN "
+    f"INSERT INTO {RTREE_TABLE} VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude); END",
+    f"CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_ad AFTER DELETE ON restaurants BEGIN "
+    f"DELETE FROM {RTREE_TABLE} WHERE id = old.id; END",
+    # Seules les coordonnées déclenchent la mise à jour (pas les compteurs).
+    f"CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_au AFTER UPDATE OF latitude, longitude ON restaurants BEGIN "
+    f"DELETE FROM {RTREE_TABLE} WHERE id = old.id; "
+    f"INSERT INTO {RTREE_TABLE} SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude "
+    f"WHERE {_HAS_POSITION}; END",
+]
+
+
+def install_geo_index(connection):
+    """Crée la table R*Tree et ses triggers (idempotent) puis la remplit."""
+    if connection.dialect.name != 'sqlite':
+        return
+    for statement in RTREE_DDL:
+        connection.exec_driver_sql(statement)
+    connection.exec_driver_sql(f"DELETE FROM {RTREE_TABLE}")
+    connection.exec_driver_sql(
+        f"INSERT INTO {RTREE_TABLE} SELECT id, latitude, latitude, longitude, longitude "
+        f"FROM restaurants WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+    )
+
+
+def drop_geo_index(connection):
+    if connection.dialect.name != 'sqlite':
+        return
+    connection.exec_driver_sql(f"DROP TABLE IF EXISTS {RTREE_TABLE}")
+
+
+# db.create_all() / db.drop_all() (run.py, seed.py) gèrent aussi l'index.
+@event.listens_for(db.metadata, 'after_create')
+def _after_create(target, connection, **kw):
+    install_geo_index(connection)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _before_drop(target, connection, **kw):
+    drop_geo_index(connection)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi, dlambda = phi2 - phi1, math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lng, radius_km):
+    """(min_lat, max_lat, min_lng, max_lng) contenant le cercle ; longitudes None si tout le tour."""
+    dlat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    cos_lat = min(math.cos(math.radians(min_lat)), math.cos(math.radians(max_lat)))
+    if cos_lat <= 1e-9:
+        return min_lat, max_lat, None, None
+    dlng = radius_km / (KM_PER_DEGREE * cos_lat)
+    if dlng >= 180 or lng - dlng < -180 or lng + dlng > 180:
+        # Boîte à cheval sur l'antiméridien : on ne filtre que sur la latitude.
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, lng - dlng, lng + dlng
+
+
+def _candidates(box):
+    """Ids et coordonnées des restaurants situés dans la boîte."""
+    min_lat, max_lat, min_lng, max_lng = box
+    if db.session.get_bind().dialect.name == 'sqlite':
+        sql = (
+            f"SELECT r.id, r.latitude, r.longitude FROM {RTREE_TABLE} AS t "
+            f"JOIN restaurants AS r ON r.id = t.id "
+            f"WHERE t.max_lat >= :min_lat AND t.min_lat <= :max_lat"
+        )
+        params = {'min_lat': min_lat, 'max_lat': max_lat}
+        if min_lng is not None:
+            sql += " AND t.max_lng >= :min_lng AND t.min_lng <= :max_lng"
+            params.update(min_lng=min_lng, max_lng=max_lng)
+        return db.session.execute(text(sql), params).all()
+
+    query = select(Restaurant.id, Restaurant.latitude, Restaurant.longitude).where(
+        Restaurant.latitude.between(min_lat, max_lat), Restaurant.longitude.isnot(None)
+    )
+    if min_lng is not None:
+        query = query.where(Restaurant.longitude.between(min_lng, max_lng))
+    return db.session.execute(query).all()
+
+
+def nearest(lat, lng, radius_km, limit):
+    """
+    Les `limit` restaurants les plus proches de (lat, lng) à moins de
+    `radius_km` : liste [(id, distance_km)] triée par distance croissante.
+    """
+    step = min(INITIAL_RADIUS_KM, radius_km)
+    while True:
+        hits = []
+        for restaurant_id, r_lat, r_lng in _candidates(bounding_box(lat, lng, step)):
+            distance = haversine_km(lat, lng, r_lat, r_lng)
+            if distance <= step:
+                hits.append((distance, restaurant_id))
+        # Tout restaurant à moins de `step` est dans la boîte : si elle en contient
+        # au moins `limit`, les plus proches sont parmi eux.
+        if len(hits) >= limit or step >= radius_km:
+            hits.sort()
+            return [(restaurant_id, distance) for distance, restaurant_id in hits[:limit]]
+        step = min(step * 2, radius_km)
+
+
+def parse_position(args, default_radius, max_radius):
+    """(lat, lng, radius_km) lus dans la requête, validés."""
+    values = {}
+    for name, low, high in (('lat', -90, 90), ('lng', -180, 180)):
+        raw = args.get(name)
+        if raw in (None, ''):
+            raise GeoError(f"Le paramètre '{name}' est obligatoire")
+        try:
+            value = float(raw)
+        except ValueError:
+            raise GeoError(f"Le paramètre '{name}' doit être un nombre")
+        if not low <= value <= high:
+            raise GeoError(f"Le paramètre '{name}' doit être compris entre {low} et {high}")
+        values[name] = value
+
+    raw = args.get('radius')
+    if raw in (None, ''):
+        radius = default_radius
+    else:
+        try:
+            radius = float(raw)
+        except ValueError:
+            raise GeoError("Le paramètre 'radius' (km) doit être un nombre")
+        if not radius > 0:
+            raise GeoError("Le paramètre 'radius' (km) doit être supérieur à 0")
+    return values['lat'], values['lng'], min(radius, max_radius)
+
+
+geo_cli = AppGroup('geo', help="Index géographique des restaurants.")
+
+
+@geo_cli.command('rebuild')
+def rebuild_command():
+    """Recrée la table R*Tree et ses triggers, puis réindexe tous les restaurants."""
+    with db.engine.begin() as connection:
+        install_geo_index(connection)
+    count = db.session.scalar(
+        select(db.func.count()).where(Restaurant.latitude.isnot(None), Restaurant.longitude.isnot(None))
+    )
+    click.echo(f"Index géographique reconstruit ({count} restaurants localisés).")
+
+
+def init_app(app):
+    app.cli.add_command(geo_cli)
@@ -0,0 +1,215 @@
+# google_auth.py
+# Vérification des jetons d'accès Google pour /login/google.
+#
+# Chaque connexion interrogeait l'endpoint userinfo de Google avec un
+# requests.get isolé : nouvelle connexion TLS à chaque appel, aucun délai
+# maximal (un Google lent bloque le worker indéfiniment) et aucune mémoire des
+# jetons déjà vérifiés. Ici :
+#   - une requests.Session partagée réutilise les connexions (pool urllib3)
+#     avec des délais stricts de connexion / lecture ;
+#   - les jetons vérifiés sont gardés en cache (TTL court, clé = empreinte
+#     SHA-256 du jeton, jamais le jeton lui-même) ;
+#   - un disjoncteur coupe les appels après plusieurs échecs consécutifs de
+#     Google (erreurs réseau, délais, 5xx) : l'API répond 503 immédiatement
+#     jusqu'à la fin de la période de repos, puis laisse passer un essai.
+#
+# Le backend est interchangeable : GOOGLE_USERINFO_URL peut pointer vers un
+# serveur local de substitution (benchmarks/google_userinfo_stub.py) et
+# GOOGLE_VERIFIER_BACKEND accepte un chemin "module:Classe".
+import hashlib
+import importlib
+import logging
+import os
+import threading
+import time
+
+from lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_USERINFO_URL = 'https://www.googleapis.com/oauth2/v1/userinfo'
+
+
+class TokenRejected(Exception):
+    """Le jeton est refusé par Google (invalide, expiré, révoqué) : 400."""
+
+
+class VerifierUnavailable(Exception):
+    """Google est injoignable ou le disjoncteur est ouvert : 503."""
+
+
+# ------------------ BACKENDS ------------------
+
+class HTTPUserInfoBackend:
+    """
+    Interroge un endpoint userinfo compatible Google via une session HTTP
+    partagée. Les échecs réseau ne sont pas rejoués ici : le disjoncteur
+    décide des nouvelles tentatives.
+    """
+
+    def __init__(self, url=GOOGLE_USERINFO_URL, connect_timeout=2.0, read_timeout=3.0, pool_size=10):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._requests = requests
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+    def fetch(self, access_token):
+        try:
+            # Le jeton passe dans l'en-tête plutôt que dans l'URL (journaux, proxys).
+            response = self._session.get(
+                self.url,
+                headers={'Authorization': f'Bearer {access_token}', 'Accept': 'application/json'},
+                timeout=self.timeout,
+            )
+        except self._requests.RequestException as e:
+            raise VerifierUnavailable(f"Google injoignable : {e.__class__.__name__}")
+        if response.status_code >= 500 or response.status_code == 429:
+            raise VerifierUnavailable(f"Google indisponible (HTTP {response.status_code})")
+        if response.status_code != 200:
+            raise TokenRejected("Échec de la vérification du token Google")
+        try:
+            return response.json()
+        except ValueError:
+            raise VerifierUnavailable("Réponse de Google illisible")
+
+
+def _load_backend(app):
+    config = app.config
+    name = config.get('GOOGLE_VERIFIER_BACKEND', 'http')
+    if name == 'http':
+        return HTTPUserInfoBackend(
+            config.get('GOOGLE_USERINFO_URL') or os.environ.get('GOOGLE_USERINFO_URL', GOOGLE_USERINFO_URL),
+            config.get('GOOGLE_CONNECT_TIMEOUT', 2.0),
+            config.get('GOOGLE_READ_TIMEOUT', 3.0),
+            config.get('GOOGLE_POOL_SIZE', 10),
+        )
+    # Chemin "module:Classe" vers un backend personnalisé (méthode fetch(access_token)).
+    module_name, _, class_name = name.partition(':')
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    return backend_class(**config.get('GOOGLE_VERIFIER_OPTIONS', {}))
+
+
+# ------------------ DISJONCTEUR ------------------
+
+class CircuitBreaker:
+    """
+    Fermé : les appels passent. Après `failure_threshold` échecs consécutifs,
+    ouvert pendant `reset_timeout` secondes : les appels sont refusés. Ensuite
+    un seul appel d'essai passe (semi-ouvert) ; son succès referme le circuit.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("Disjoncteur Google ouvert après %s échec(s)", self._failures)
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+# ------------------ VÉRIFICATEUR ------------------
+
+class GoogleTokenVerifier:
+    def __init__(self):
+        self.backend = None
+        self.breaker = CircuitBreaker()
+        self.ttl = 300
+        self._cache = LRUCache(10000)
+        self._app = None
+
+    def init_app(self, app):
+        config = app.config
+        self.ttl = config.get('GOOGLE_TOKEN_CACHE_TTL', 300)
+        self._cache = LRUCache(config.get('GOOGLE_TOKEN_CACHE_MAX_ENTRIES', 10000))
+        self.breaker = CircuitBreaker(
+            config.get('GOOGLE_BREAKER_THRESHOLD', 5),
+            config.get('GOOGLE_BREAKER_RESET', 30),
+        )
+        self._app = app
+
+    def set_backend(self, backend):
+        """Remplace le backend (serveur de substitution, tests de charge)."""
+        self.backend = backend
+        self._cache.clear()
+
+    def _backend(self):
+        if self.backend is None:
+            # Créé au premier appel : la session HTTP n'est ouverte que si
+            # quelqu'un se connecte avec Google.
+            self.backend = _load_backend(self._app)
+        return self.backend
+
+    @staticmethod
+    def _key(access_token):
+        return hashlib.sha256(access_token.encode('utf-8')).hexdigest()
+
+    def verify(self, access_token):
+        """
+        Profil userinfo associé au jeton. Lève TokenRejected si Google refuse
+        le jeton, VerifierUnavailable si Google ne répond pas correctement.
+        """
+        key = self._key(access_token)
+        profile = self._cache.get(key)
+        if profile is not None:
+            return profile
+
+        if not self.breaker.allow():
+            raise VerifierUnavailable("Connexion Google temporairement indisponible, réessayez plus tard")
+        try:
+            profile = self._backend().fetch(access_token)
+        except TokenRejected:
+            # Google a répondu : le service fonctionne.
+            self.breaker.record_success()
+            raise
+        except VerifierUnavailable:
+            self.breaker.record_failure()
+            raise
+        except Exception as e:
+            # Backend personnalisé défaillant : traité comme une panne.
+            self.breaker.record_failure()
+            raise VerifierUnavailable(f"Vérification Google impossible : {e.__class__.__name__}") from e
+        self.breaker.record_success()
+        self._cache.set(key, profile, ttl=self.ttl)
+        return profile
+
+
+google_verifier = GoogleTokenVerifier()
@@ -0,0 +1,134 @@
+# hashing.py
+# Hachage bcrypt hors du thread de la requête.
+#
+# bcrypt est volontairement coûteux en CPU : exécuté en ligne dans Login.post,
+# FoodUsers.post ou FoodUsersById.patch, une rafale de connexions occupe tous
+# les workers. Les hachages passent donc par un pool de threads borné (la
+# bibliothèque bcrypt relâche le GIL pendant le calcul) avec une limite de
+# travaux en attente : au-delà, HashingOverloaded est levée et l'API répond 503
+# au lieu d'empiler les requêtes.
+#
+# Le facteur de coût est configurable (PASSWORD_HASH_ROUNDS, ou le
+# BCRYPT_LOG_ROUNDS de Flask-Bcrypt s'il est fixé) ou calibré au
+# démarrage pour viser PASSWORD_HASH_TARGET_MS par hachage, sans descendre
+# sous PASSWORD_HASH_MIN_ROUNDS (12, le coût historique) : un hôte rapide ne
+# doit jamais affaiblir les hachages. Les hachages stockés avec un coût
+# inférieur sont recalculés à la connexion suivante ; un coût supérieur est
+# conservé.
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from flask import current_app, has_app_context
+
+from config import bcrypt
+
+logger = logging.getLogger(__name__)
+
+
+class HashingOverloaded(Exception):
+    """Trop de hachages en attente : la requête doit être rejetée (503)."""
+
+
+def hash_rounds(password_hash):
+    """Facteur de coût d'un hachage bcrypt ($2b$12$...), None s'il est illisible."""
+    try:
+        prefix, algorithm, cost = password_hash.split('$', 3)[:3]
+        return int(cost) if prefix == '' and algorithm.startswith('2') else None
+    except (AttributeError, ValueError):
+        return None
+
+
+# Coût des hachages existants (défaut de Flask-Bcrypt) : plancher de la calibration.
+MIN_ROUNDS = 12
+
+
+def calibrate_rounds(target_ms, min_rounds=MIN_ROUNDS, max_rounds=15, sample_rounds=8):
+    """
+    Plus grand facteur de coût dont la durée estimée reste sous target_ms.
+    Un seul hachage de mesure est calculé : chaque +1 double la durée.
+    """
+    start = time.perf_counter()
+    bcrypt.generate_password_hash('calibration', sample_rounds)
+    sample_ms = max((time.perf_counter() - start) * 1000, 0.001)
+    rounds = sample_rounds + math.floor(math.log2(target_ms / sample_ms))
+    return max(min_rounds, min(max_rounds, rounds)), sample_ms
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.rounds = None
+        self._executor = None
+        self._slots = None
+        self.timeout = None
+
+    def init_app(self, app):
+        config = app.config
+        workers = config.get('PASSWORD_HASH_WORKERS') or os.cpu_count() or 2
+        max_pending = config.get('PASSWORD_HASH_MAX_PENDING') or workers * 4
+        self.timeout = config.get('PASSWORD_HASH_TIMEOUT', 10)
+
+        self.rounds = config.get('PASSWORD_HASH_ROUNDS', config.get('BCRYPT_LOG_ROUNDS'))
+        if self.rounds is None:
+            target_ms = config.get('PASSWORD_HASH_TARGET_MS', 250)
+            self.rounds, sample_ms = calibrate_rounds(
+                target_ms,
+                max(config.get('PASSWORD_HASH_MIN_ROUNDS', MIN_ROUNDS), MIN_ROUNDS),
+                config.get('PASSWORD_HASH_MAX_ROUNDS', 15),
+            )
+            logger.info(
+                "bcrypt calibré : %s rounds (cible %s ms, mesure %.1f ms à 8 rounds)",
+                self.rounds, target_ms, sample_ms,
+            )
+        # Réglage public de Flask-Bcrypt, lu par _rounds() hors de cette application.
+        config['BCRYPT_LOG_ROUNDS'] = self.rounds
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        # Travaux en cours + en file : au-delà, on refuse plutôt que d'attendre.
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _rounds(self):
+        if self.rounds is not None:
+            return self.rounds
+        # Hors application initialisée (seed.py, scripts) : configuration de Flask-Bcrypt.
+        if has_app_context():
+            return current_app.config.get('BCRYPT_LOG_ROUNDS', MIN_ROUNDS)
+        return MIN_ROUNDS
+
+    def _run(self, fn, *args):
+        if self._executor is None:
+            # Hors application (seed.py, scripts) : exécution directe.
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingOverloaded("Service de connexion surchargé, réessayez dans un instant")
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HashingOverloaded("Service de connexion surchargé, réessayez dans un instant")
+
+    def generate(self, password):
+        return self._run(bcrypt.generate_password_hash, password, self._rounds()).decode('utf-8')
+
+    def check(self, password_hash, password):
+        try:
+            return self._run(bcrypt.check_password_hash, password_hash, password)
+        except ValueError:
+            # Valeur stockée qui n'est pas un hachage bcrypt valide.
+            return False
+
+    def needs_rehash(self, password_hash):
+        # Seulement vers un coût plus élevé : jamais d'affaiblissement à la connexion.
+        current = hash_rounds(password_hash)
+        return current is None or current < self._rounds()
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,175 @@
+# index_advisor.py
+# Conseiller d'index : rejoue les requêtes de lecture de chaque ressource via
+# le client de test, capture le SQL réellement émis (requête principale et
+# chargements des relations) et passe chaque instruction dans EXPLAIN QUERY
+# PLAN (EXPLAIN sous PostgreSQL). Les parcours complets de table ("SCAN
+# reviews", "Seq Scan on reviews") sont signalés, ainsi que les tris en table
+# temporaire faute d'index adapté.
+#
+#   flask indexes advise                 rapport par endpoint
+#   flask indexes advise --fail-on-scan  code de sortie 1 si un parcours inattendu subsiste
+#   flask indexes advise --path "/reviews?restaurant_id=3"
+#
+# Les listes complètes (/reviews, /dishes...) parcourent légitimement leur
+# table principale : ces parcours sont marqués "attendu" et n'échouent pas.
+# Il en va de même des tables filles chargées par selectinload pour ces
+# listes (menu_dishes pour /menus, favorites et reviews pour /food_users...) :
+# la liste IN couvre alors presque toute la table et, statistiques ANALYZE à
+# l'appui, SQLite préfère un parcours à l'index pourtant présent. Les mêmes
+# chargements filtrés (?restaurant_id=, /food_users/<id>) doivent, eux,
+# passer par l'index.
+import re
+import sys
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, select
+
+from config import db
+from cache import response_cache
+from restaurant import Restaurant
+from food_user import FoodUser
+from dish import Dish
+
+# (chemin, tables dont le parcours complet est attendu)
+PROBES = (
+    ('/restaurants', {'restaurants'}),
+    ('/restaurants?sort=-rating&limit=20', set()),
+    ('/restaurants?sort=name&limit=20', set()),
+    ('/restaurants/{restaurant_id}', set()),
+    ('/reviews', {'reviews'}),
+    ('/reviews?restaurant_id={restaurant_id}', set()),
+    ('/menus', {'menus', 'menu_dishes'}),
+    ('/menus?restaurant_id={restaurant_id}', set()),
+    ('/restaurants/{restaurant_id}/menus', set()),
+    ('/restaurants/{restaurant_id}/favorited_by', set()),
+    ('/dishes', {'dishes', 'menu_dishes'}),
+    ('/food_users', {'food_users', 'favorites', 'reviews'}),
+    ('/food_users/{food_user_id}', set()),
+    ('/search?q={dish_word}&type=dishes', set()),
+    ('/search?q={restaurant_word}', set()),
+)
+
+_SQLITE_SCAN = re.compile(r'^SCAN (\w+)$')
+_POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+class Finding:
+    def __init__(self, kind, table, detail, statement, expected=False):
+        self.kind = kind          # 'scan' ou 'temp-sort'
+        self.table = table
+        self.detail = detail
+        self.statement = statement
+        self.expected = expected
+
+
+def _sample_values():
+    first_word = lambda name: (name or 'a').split()[0]  # noqa: E731
+    return {
+        'restaurant_id': db.session.scalar(select(Restaurant.id).order_by(Restaurant.id).limit(1)) or 1,
+        'food_user_id': db.session.scalar(select(FoodUser.id).order_by(FoodUser.id).limit(1)) or 1,
+        'restaurant_word': first_word(db.session.scalar(select(Restaurant.name).limit(1))),
+        'dish_word': first_word(db.session.scalar(select(Dish.name).limit(1))),
+    }
+
+
+def capture_statements(client, path):
+    """Instructions SELECT (et leurs paramètres) émises pendant GET `path`."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            statements.append((statement, parameters))
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        # Un hit du cache de réponses n'émettrait aucune requête.
+        response_cache.clear()
+        # Contexte neuf : session SQLAlchemy (et identity map) vide pour chaque sonde.
+        with current_app.app_context():
+            response = client.get(path)
+            response.get_data()
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return response.status_code, statements
+
+
+def explain(connection, statement, parameters):
+    """Liste des trouvailles (Finding) pour une instruction."""
+    findings = []
+    if connection.dialect.name == 'sqlite':
+        for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters):
+            detail = row[-1]
+            match = _SQLITE_SCAN.match(detail)
+            if match:
+                findings.append(Finding('scan', match.group(1), detail, statement))
+            elif detail.startswith('USE TEMP B-TREE FOR ORDER BY'):
+                findings.append(Finding('temp-sort', None, detail, statement))
+    else:
+        for (line,) in connection.exec_driver_sql('EXPLAIN ' + statement, parameters):
+            match = _POSTGRES_SCAN.search(line)
+            if match:
+                findings.append(Finding('scan', match.group(1), line.strip(), statement))
+    return findings
+
+
+def advise(paths=None):
+    """Rapport [(chemin, statut, nombre de requêtes, trouvailles)] pour les sondes."""
+    values = _sample_values()
+    probes = [(template.format(**values), expected) for template, expected in PROBES]
+    probes += [(path, set()) for path in paths or ()]
+
+    client = current_app.test_client()
+    report = []
+    for path, expected in probes:
+        status, statements = capture_statements(client, path)
+        findings, seen = [], set()
+        with db.engine.connect() as connection:
+            for statement, parameters in statements:
+                for finding in explain(connection, statement, parameters):
+                    key = (finding.kind, finding.table, statement)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    finding.expected = finding.kind == 'scan' and finding.table in expected
+                    findings.append(finding)
+        report.append((path, status, len(statements), findings))
+    return report
+
+
+def _shorten(statement, width=110):
+    flat = ' '.join(statement.split())
+    return flat if len(flat) <= width else flat[:width - 3] + '...'
+
+
+indexes_cli = AppGroup('indexes', help="Analyse des plans de requêtes et des index.")
+
+
+@indexes_cli.command('advise')
+@click.option('--path', 'paths', multiple=True, help="Chemin GET supplémentaire à analyser.")
+@click.option('--fail-on-scan', is_flag=True, help="Code de sortie 1 en cas de parcours de table inattendu.")
+def advise_command(paths, fail_on_scan):
+    """Rejoue les lectures de chaque ressource et signale les parcours de table."""
+    unexpected = 0
+    for path, status, count, findings in advise(paths):
+        click.echo(f"{path}  [HTTP {status}, {count} requête(s)]")
+        if not findings:
+            click.echo("    ok : toutes les tables sont lues par index")
+        for finding in findings:
+            if finding.kind == 'scan':
+                label = 'attendu' if finding.expected else 'PARCOURS'
+                unexpected += not finding.expected
+            else:
+                label = 'tri'
+            click.echo(f"    {label:<8} {finding.detail}")
+            if not finding.expected:
+                click.echo(f"             {_shorten(finding.statement)}")
+    click.echo(f"\n{unexpected} parcours de table inattendu(s).")
+    if fail_on_scan and unexpected:
+        sys.exit(1)
+
+
+def init_app(app):
+    app.cli.add_command(indexes_cli)
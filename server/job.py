@@ -0,0 +1,56 @@
+# job.py
+from config import db
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class Job(db.Model):
+    """Tâche de fond durable, exécutée par jobs.py."""
+
+    __tablename__ = 'jobs'
+
+    __table_args__ = (
+        # Tâches prêtes : WHERE status = 'pending' AND run_at <= ? ORDER BY run_at, id
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+        # Une seule tâche en attente par clé de déduplication (les suivantes sont fusionnées).
+        db.Index(
+            'ix_jobs_dedup_key_pending', 'dedup_key', unique=True,
+            sqlite_where=db.text("status = 'pending'"),
+            postgresql_where=db.text("status = 'pending'"),
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    dedup_key = db.Column(db.String(200), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    locked_by = db.Column(db.String(100), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<Job {self.id}: {self.name} ({self.status})>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "payload": self.payload,
+            "dedup_key": self.dedup_key,
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "run_at": self.run_at.isoformat() if self.run_at else None,
+            "last_error": self.last_error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -0,0 +1,398 @@
+# jobs.py
+# File de tâches de fond durable, stockée dans la table jobs (job.py).
+#
+# Une tâche est un nom de gestionnaire (enregistré par @job_queue.handler) et
+# des arguments JSON. enqueue(..., session=session), appelé depuis une ressource
+# ou un écouteur de session (after_flush), insère la tâche dans la transaction
+# en cours : elle n'existe que si le commit réussit, et les workers sont
+# réveillés après le commit. Sans session, la tâche est insérée et validée tout
+# de suite.
+#
+# Une clé de déduplication fusionne les demandes identiques : tant qu'une tâche
+# de même clé est en attente, les suivantes ne sont pas insérées (index unique
+# partiel sur les tâches 'pending'). Une tâche déjà en cours n'empêche pas d'en
+# planifier une nouvelle, qui verra les écritures postérieures.
+#
+# Chaque processus qui sert des requêtes démarre JOBS_WORKERS fils (0 : aucun,
+# les tâches sont alors exécutées par `flask jobs work`). Un worker réserve une
+# tâche par un UPDATE ... RETURNING atomique (sûr entre processus), l'exécute
+# dans un contexte d'application, puis la marque 'done'. En cas d'erreur, elle
+# est replanifiée avec un délai exponentiel (JOBS_RETRY_BACKOFF x 2^(n-1)
+# secondes) jusqu'à max_attempts, puis marquée 'failed' (`flask jobs retry`).
+# Une tâche 'running' depuis plus de JOBS_LOCK_TIMEOUT secondes (processus
+# arrêté en cours d'exécution) est remise en attente.
+import importlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import and_, event, exists, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
+from sqlalchemy.orm import Session, aliased
+
+from config import db
+from job import DONE, FAILED, PENDING, RUNNING, Job
+
+logger = logging.getLogger(__name__)
+
+_ERROR_MAX_LENGTH = 4000
+
+
+class JobError(RuntimeError):
+    """Tâche inexécutable (gestionnaire inconnu)."""
+
+
+def _now():
+    # Même référence que CURRENT_TIMESTAMP de SQLite : UTC sans fuseau.
+    return datetime.utcnow()
+
+
+def _insert_statement(dialect_name, values):
+    table = Job.__table__
+    if values.get('dedup_key') is None:
+        return insert(table).values(values)
+    if dialect_name in ('sqlite', 'postgresql'):
+        # Dialecte importé à la demande : celui de PostgreSQL coûte ~50 ms au démarrage.
+        dialect = importlib.import_module(f'sqlalchemy.dialects.{dialect_name}')
+        return (
+            dialect.insert(table).values(values)
+            .on_conflict_do_nothing(index_elements=['dedup_key'], index_where=table.c.status == PENDING)
+        )
+    # Autres moteurs : INSERT ... SELECT conditionnel (sans garantie sous concurrence).
+    pending = select(table.c.id).where(table.c.dedup_key == values['dedup_key'], table.c.status == PENDING)
+    columns = list(values)
+    return insert(table).from_select(
+        columns, select(*[db.literal(values[c]) for c in columns]).where(~exists(pending))
+    )
+
+
+class JobQueue:
+    def __init__(self):
+        self.workers = 2
+        self.poll_interval = 1.0
+        self.lock_timeout = 600
+        self.retry_backoff = 5
+        self.max_attempts = 5
+        self.retention_days = 7
+        self._app = None
+        self._handlers = {}
+        self._threads = []
+        self._pid = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        config = app.config
+        self._app = app
+        self.workers = config.get('JOBS_WORKERS', self.workers)
+        self.poll_interval = config.get('JOBS_POLL_INTERVAL', self.poll_interval)
+        self.lock_timeout = config.get('JOBS_LOCK_TIMEOUT', self.lock_timeout)
+        self.retry_backoff = config.get('JOBS_RETRY_BACKOFF', self.retry_backoff)
+        self.max_attempts = config.get('JOBS_MAX_ATTEMPTS', self.max_attempts)
+        self.retention_days = config.get('JOBS_RETENTION_DAYS', self.retention_days)
+        # Les workers démarrent avec la première requête servie par le processus
+        # (pas pendant `flask db upgrade` ni les autres commandes).
+        app.before_request(self.start)
+        app.cli.add_command(jobs_cli)
+
+    # ------------------ ENREGISTREMENT ET ENVOI ------------------
+
+    def handler(self, name):
+        """Décorateur : enregistre `function(**payload)` comme gestionnaire de la tâche `name`."""
+        def decorator(function):
+            self._handlers[name] = function
+            return function
+        return decorator
+
+    def enqueue(self, name, payload=None, key=None, delay=0, max_attempts=None, session=None):
+        """
+        Planifie une tâche ; renvoie son id, ou None si une tâche de même clé
+        est déjà en attente.
+        """
+        values = {
+            'name': name,
+            'payload': payload or {},
+            'dedup_key': key,
+            'status': PENDING,
+            'attempts': 0,
+            'max_attempts': max_attempts or self.max_attempts,
+            'run_at': _now() + timedelta(seconds=delay),
+        }
+        if session is not None:
+            connection = session.connection()
+            result = connection.execute(_insert_statement(connection.dialect.name, values))
+            session.info['jobs_enqueued'] = True
+        else:
+            with db.engine.begin() as connection:
+                result = connection.execute(_insert_statement(connection.dialect.name, values))
+            self.wake()
+        if not result.rowcount:
+            return None
+        try:
+            return result.inserted_primary_key[0]
+        except InvalidRequestError:
+            # INSERT ... SELECT (autres moteurs) : pas d'identifiant renvoyé.
+            return None
+
+    def wake(self):
+        self._wake.set()
+
+    # ------------------ EXÉCUTION ------------------
+
+    def claim(self, worker):
+        """Réserve la prochaine tâche prête ; None s'il n'y en a pas."""
+        table = Job.__table__
+        now = _now()
+        ready = (
+            select(table.c.id)
+            .where(table.c.status == PENDING, table.c.run_at <= now)
+            .order_by(table.c.run_at, table.c.id)
+            .limit(1)
+        )
+        # Lecture d'abord : un worker inactif ne prend pas le verrou d'écriture de SQLite.
+        with db.engine.connect() as connection:
+            if connection.execute(ready).first() is None:
+                return None
+        statement = (
+            update(table)
+            .where(table.c.id == ready.scalar_subquery(), table.c.status == PENDING)
+            .values(status=RUNNING, attempts=table.c.attempts + 1, locked_at=now, locked_by=worker)
+            .returning(table.c.id, table.c.name, table.c.payload, table.c.attempts, table.c.max_attempts)
+        )
+        with db.engine.begin() as connection:
+            return connection.execute(statement).first()
+
+    def run_one(self, worker):
+        """Exécute une tâche prête ; renvoie False s'il n'y en avait aucune."""
+        job = self.claim(worker)
+        if job is None:
+            return False
+        try:
+            handler = self._handlers.get(job.name)
+            if handler is None:
+                raise JobError(f"Aucun gestionnaire pour la tâche {job.name!r}")
+            with self._app.app_context():
+                handler(**job.payload)
+        except Exception as e:
+            logger.warning("tâche %s (%s) : échec de la tentative %s/%s : %s",
+                           job.id, job.name, job.attempts, job.max_attempts, e)
+            self._fail(job, ''.join(traceback.format_exception(e))[-_ERROR_MAX_LENGTH:])
+        else:
+            self._finish(job.id, DONE)
+        return True
+
+    def _finish(self, job_id, status, error=None):
+        table = Job.__table__
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(table).where(table.c.id == job_id)
+                .values(status=status, locked_at=None, finished_at=_now(), last_error=error)
+            )
+
+    def _fail(self, job, error):
+        if job.attempts >= job.max_attempts:
+            self._finish(job.id, FAILED, error)
+            return
+        table = Job.__table__
+        delay = self.retry_backoff * 2 ** (job.attempts - 1)
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(
+                    update(table).where(table.c.id == job.id)
+                    .values(status=PENDING, locked_at=None, locked_by=None, last_error=error,
+                            run_at=_now() + timedelta(seconds=delay))
+                )
+        except IntegrityError:
+            # Une tâche de même clé a été planifiée entre-temps : elle refera le travail.
+            self._finish(job.id, FAILED, error + "\n(nouvel essai confié à la tâche en attente de même clé)")
+
+    def requeue_stale(self):
+        """Remet en attente les tâches réservées par un worker disparu ; renvoie leur nombre."""
+        table = Job.__table__
+        other = aliased(Job)
+        cutoff = _now() - timedelta(seconds=self.lock_timeout)
+        stale = and_(table.c.status == RUNNING, table.c.locked_at < cutoff)
+        # Une seule tâche en attente par clé : la plus récente des tâches abandonnées de même clé.
+        superseded = exists().where(other.dedup_key == table.c.dedup_key, or_(
+            other.status == PENDING,
+            and_(other.status == RUNNING, other.locked_at < cutoff, other.id > table.c.id),
+        ))
+        with db.engine.begin() as connection:
+            requeued = connection.execute(
+                update(table).where(stale, table.c.attempts < table.c.max_attempts, ~superseded)
+                .values(status=PENDING, locked_at=None, locked_by=None, last_error="Délai de verrouillage dépassé")
+            ).rowcount
+            connection.execute(
+                update(table).where(stale)
+                .values(status=FAILED, locked_at=None, finished_at=_now(), last_error="Délai de verrouillage dépassé")
+            )
+        return requeued
+
+    def maintain(self):
+        """Récupère les tâches abandonnées et planifie la purge quotidienne des tâches terminées."""
+        self.requeue_stale()
+        self.enqueue('jobs.purge', key='jobs.purge', delay=24 * 3600)
+
+    def work(self, worker, drain=False, maintenance=False):
+        """
+        Boucle d'un worker ; avec drain=True, s'arrête quand plus aucune tâche
+        n'est prête. Avec maintenance=True, appelle aussi maintain() chaque minute.
+        """
+        last_maintenance = None
+        while True:
+            try:
+                with self._app.app_context():
+                    if self.run_one(worker):
+                        continue
+                    if drain:
+                        return
+                    if maintenance and (last_maintenance is None or time.monotonic() - last_maintenance >= 60):
+                        last_maintenance = time.monotonic()
+                        self.maintain()
+            except Exception:
+                logger.exception("tâches : erreur du worker %s", worker)
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def start(self):
+        # Après un fork, les fils du parent n'existent plus : on les relance.
+        if not self.workers or self._pid == os.getpid():
+            return
+        if not self._app.config.get('BACKGROUND_THREADS', True):
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._threads = []
+            for number in range(self.workers):
+                worker = f'{socket.gethostname()}:{self._pid}:{number}'
+                thread = threading.Thread(target=self.work, args=(worker,), kwargs={'maintenance': number == 0},
+                                          name=f'jobs-{number}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    # ------------------ MAINTENANCE ------------------
+
+    def purge(self, days=None):
+        """Supprime les tâches terminées depuis plus de `days` jours ; renvoie leur nombre."""
+        table = Job.__table__
+        cutoff = _now() - timedelta(days=self.retention_days if days is None else days)
+        with db.engine.begin() as connection:
+            return connection.execute(
+                table.delete().where(table.c.status == DONE, table.c.finished_at < cutoff)
+            ).rowcount
+
+    def retry(self, job_ids=None):
+        """
+        Remet en attente les tâches échouées (toutes, ou celles de `job_ids`).
+        Pour une clé de déduplication, seule la plus récente est relancée, et
+        aucune si une tâche de même clé est déjà en attente.
+        """
+        table = Job.__table__
+        other = aliased(Job)
+        newer_failed = and_(other.status == FAILED, other.id > table.c.id)
+        if job_ids:
+            newer_failed = and_(newer_failed, other.id.in_(job_ids))
+        superseded = exists().where(other.dedup_key == table.c.dedup_key, or_(other.status == PENDING, newer_failed))
+        statement = update(table).where(table.c.status == FAILED, ~superseded)
+        if job_ids:
+            statement = statement.where(table.c.id.in_(job_ids))
+        with db.engine.begin() as connection:
+            count = connection.execute(
+                statement.values(status=PENDING, attempts=0, run_at=_now(), finished_at=None)
+            ).rowcount
+        self.wake()
+        return count
+
+
+job_queue = JobQueue()
+
+
+@job_queue.handler('jobs.purge')
+def purge_job(days=None):
+    job_queue.purge(days)
+
+
+# ------------------ ENVOI APRÈS COMMIT ------------------
+
+@event.listens_for(Session, 'after_commit')
+def _wake_on_commit(session):
+    if session.info.pop('jobs_enqueued', False):
+        job_queue.wake()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('jobs_enqueued', None)
+
+
+jobs_cli = AppGroup('jobs', help="File de tâches de fond.")
+
+
+@jobs_cli.command('stats')
+def stats_command():
+    """Nombre de tâches par nom et par état."""
+    rows = db.session.execute(
+        select(Job.name, Job.status, func.count()).group_by(Job.name, Job.status).order_by(Job.name, Job.status)
+    ).all()
+    if not rows:
+        click.echo("Aucune tâche.")
+    for name, status, count in rows:
+        click.echo(f"{name:<28} {status:<8} {count:>8}")
+
+
+@jobs_cli.command('list')
+@click.option('--status', type=click.Choice([PENDING, RUNNING, DONE, FAILED]))
+@click.option('--limit', default=20, show_default=True)
+def list_command(status, limit):
+    """Dernières tâches (erreurs incluses)."""
+    query = select(Job).order_by(Job.id.desc()).limit(limit)
+    if status:
+        query = query.where(Job.status == status)
+    for job in db.session.scalars(query):
+        click.echo(f"#{job.id:<6} {job.name:<28} {job.status:<8} essais {job.attempts}/{job.max_attempts} "
+                   f"clé {job.dedup_key or '-'} {json.dumps(job.payload)}")
+        if job.last_error and job.status != DONE:
+            click.echo('        ' + job.last_error.strip().splitlines()[-1])
+
+
+@jobs_cli.command('enqueue')
+@click.argument('name')
+@click.option('--payload', default='{}', help="Arguments JSON du gestionnaire.")
+@click.option('--key', default=None, help="Clé de déduplication.")
+@click.option('--delay', default=0, show_default=True, help="Délai en secondes.")
+def enqueue_command(name, payload, key, delay):
+    """Planifie une tâche (ex. aggregates.rebuild, search.rebuild)."""
+    if name not in job_queue._handlers:
+        raise click.BadParameter(f"tâches connues : {', '.join(sorted(job_queue._handlers))}", param_hint='NAME')
+    job_id = job_queue.enqueue(name, json.loads(payload), key=key, delay=delay)
+    click.echo(f"Tâche #{job_id} planifiée." if job_id else "Une tâche de même clé est déjà en attente.")
+
+
+@jobs_cli.command('work')
+@click.option('--drain', is_flag=True, help="S'arrête quand plus aucune tâche n'est prête.")
+def work_command(drain):
+    """Exécute les tâches au premier plan (processus dédié, ou JOBS_WORKERS=0)."""
+    job_queue.work(f'{socket.gethostname()}:{os.getpid()}:cli', drain=drain, maintenance=not drain)
+
+
+@jobs_cli.command('retry')
+@click.argument('job_ids', nargs=-1, type=int)
+def retry_command(job_ids):
+    """Remet en attente les tâches échouées (toutes, ou celles indiquées)."""
+    click.echo(f"{job_queue.retry(job_ids)} tâche(s) remise(s) en attente.")
+
+
+@jobs_cli.command('purge')
+@click.option('--days', type=int, default=None, help="Rétention (défaut : JOBS_RETENTION_DAYS).")
+def purge_command(days):
+    """Supprime les tâches terminées anciennes."""
+    click.echo(f"{job_queue.purge(days)} tâche(s) supprimée(s).")
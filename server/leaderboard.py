@@ -0,0 +1,309 @@
+# leaderboard.py
+# Classement des restaurants les mieux notés (GET /leaderboard), global ou par
+# ville / catégorie.
+#
+# Le score est une moyenne bayésienne des notes des critiques :
+#
+#   score = (C * m + somme des notes) / (C + nombre de notes)
+#
+# où m est la note moyenne de toutes les critiques et C le poids de l'a priori
+# (LEADERBOARD_PRIOR_WEIGHT, par défaut le nombre moyen de notes par
+# restaurant noté) : un restaurant avec deux critiques à 5 étoiles ne passe pas
+# devant un restaurant à 4,8 sur trois cents critiques. Les sommes et nombres
+# de notes sont les agrégats maintenus par aggregates.py.
+#
+# Chaque processus garde, par portée ("all", "city:<ville>",
+# "category:<catégorie>"), une liste triée par score (bisect) : le top N est une
+# lecture des N premiers éléments. Les critiques et restaurants modifiés sont
+# repositionnés après chaque commit. Un fil de fond écrit périodiquement les
+# scores modifiés dans restaurants.bayesian_score (LEADERBOARD_PERSIST_INTERVAL,
+# utilisé par GET /restaurants?sort=-score) et recharge tout le classement
+# (LEADERBOARD_REFRESH_INTERVAL) : l'a priori est recalibré et les écritures
+# des autres processus sont prises en compte.
+import bisect
+import logging
+import threading
+import time
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, event, inspect, select, update
+from sqlalchemy.orm import Session
+
+from cache import response_cache
+from config import db
+from jobs import job_queue
+from restaurant import Restaurant
+from review import Review
+
+logger = logging.getLogger(__name__)
+
+ALL = 'all'
+
+
+class LeaderboardError(ValueError):
+    """Paramètre de classement invalide."""
+
+
+def scope_key(kind, value=None):
+    if kind == ALL:
+        return ALL
+    return f'{kind}:{value.strip().lower()}'
+
+
+def _scopes(city, category):
+    scopes = [ALL]
+    if city:
+        scopes.append(scope_key('city', city))
+    if category:
+        scopes.append(scope_key('category', category))
+    return scopes
+
+
+def _rated(table):
+    return (table.c.star_1_count + table.c.star_2_count + table.c.star_3_count
+            + table.c.star_4_count + table.c.star_5_count)
+
+
+def _fetch(connection, ids=None):
+    """(id, city, category, rating_sum, rated, bayesian_score) des restaurants."""
+    table = Restaurant.__table__
+    query = select(table.c.id, table.c.city, table.c.category, table.c.rating_sum, _rated(table),
+                   table.c.bayesian_score)
+    if ids is not None:
+        query = query.where(table.c.id.in_(ids))
+    return connection.execute(query).all()
+
+
+class Prior:
+    def __init__(self, mean, weight):
+        self.mean = mean
+        self.weight = weight
+
+    @classmethod
+    def from_rows(cls, rows, weight=None, mean=None):
+        rated = [(rating_sum, count) for _, _, _, rating_sum, count, _ in rows if count]
+        total_sum = sum(rating_sum for rating_sum, _ in rated)
+        total_count = sum(count for _, count in rated)
+        if mean is None:
+            mean = total_sum / total_count if total_count else 0.0
+        if weight is None:
+            weight = max(total_count / len(rated), 1.0) if rated else 1.0
+        return cls(mean, weight)
+
+    def score(self, rating_sum, rated):
+        return (self.weight * self.mean + (rating_sum or 0)) / (self.weight + (rated or 0))
+
+
+class Leaderboard:
+    def __init__(self):
+        self.min_reviews = 1
+        self.prior_weight = None
+        self.prior_mean = None
+        self.persist_interval = 60
+        self.refresh_interval = 900
+        self.prior = None
+        self._app = None
+        self._boards = {}      # portée -> liste triée de (-score, id)
+        self._entries = {}     # id -> (score, portées)
+        self._dirty = {}       # id -> score à persister (None : retiré du classement)
+        self._loaded = False
+        self._lock = threading.RLock()
+        self._thread = None
+
+    def init_app(self, app):
+        config = app.config
+        self._app = app
+        self.min_reviews = config.get('LEADERBOARD_MIN_REVIEWS', self.min_reviews)
+        self.prior_weight = config.get('LEADERBOARD_PRIOR_WEIGHT', self.prior_weight)
+        self.prior_mean = config.get('LEADERBOARD_PRIOR_MEAN', self.prior_mean)
+        self.persist_interval = config.get('LEADERBOARD_PERSIST_INTERVAL', self.persist_interval)
+        self.refresh_interval = config.get('LEADERBOARD_REFRESH_INTERVAL', self.refresh_interval)
+        app.cli.add_command(leaderboard_cli)
+
+    # ------------------ STRUCTURE TRIÉE ------------------
+
+    def _remove(self, restaurant_id):
+        entry = self._entries.pop(restaurant_id, None)
+        if entry is None:
+            return
+        score, scopes = entry
+        for scope in scopes:
+            board = self._boards[scope]
+            index = bisect.bisect_left(board, (-score, restaurant_id))
+            if index < len(board) and board[index] == (-score, restaurant_id):
+                del board[index]
+            if not board and scope != ALL:
+                del self._boards[scope]
+
+    def _place(self, row):
+        restaurant_id, city, category, rating_sum, rated, persisted = row
+        self._remove(restaurant_id)
+        if (rated or 0) < self.min_reviews:
+            score = None
+        else:
+            score = self.prior.score(rating_sum, rated)
+            scopes = _scopes(city, category)
+            for scope in scopes:
+                bisect.insort(self._boards.setdefault(scope, []), (-score, restaurant_id))
+            self._entries[restaurant_id] = (score, scopes)
+        if score != persisted:
+            self._dirty[restaurant_id] = score
+
+    def load(self):
+        """Recalcule tout le classement (et l'a priori) à partir des agrégats."""
+        with db.engine.connect() as connection:
+            rows = _fetch(connection)
+        with self._lock:
+            self.prior = Prior.from_rows(rows, self.prior_weight, self.prior_mean)
+            self._boards, self._entries, self._dirty = {ALL: []}, {}, {}
+            for row in rows:
+                self._place(row)
+            self._loaded = True
+        self.start_thread()
+        return len(self._entries)
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+
+    def update(self, restaurant_ids):
+        """Repositionne les restaurants dont les critiques ou la ville / catégorie ont changé."""
+        if not self._loaded or not restaurant_ids:
+            return
+        with db.engine.connect() as connection:
+            rows = {row[0]: row for row in _fetch(connection, list(restaurant_ids))}
+        with self._lock:
+            for restaurant_id in restaurant_ids:
+                if restaurant_id in rows:
+                    self._place(rows[restaurant_id])
+                elif restaurant_id in self._entries:
+                    self._remove(restaurant_id)
+
+    def top(self, limit, city=None, category=None):
+        """[(rang, id, score)] des `limit` premiers de la portée."""
+        if city and category:
+            raise LeaderboardError("Un seul filtre à la fois : 'city' ou 'category'")
+        if city:
+            scope = scope_key('city', city)
+        elif category:
+            scope = scope_key('category', category)
+        else:
+            scope = ALL
+        self.ensure_loaded()
+        with self._lock:
+            board = self._boards.get(scope, ())
+            return [(rank, restaurant_id, -neg_score)
+                    for rank, (neg_score, restaurant_id) in enumerate(board[:limit], start=1)]
+
+    # ------------------ PERSISTANCE ------------------
+
+    def persist(self):
+        """Écrit les scores modifiés dans restaurants.bayesian_score ; renvoie leur nombre."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return 0
+        table = Restaurant.__table__
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam('restaurant_id'))
+            .values(bayesian_score=bindparam('score'))
+        )
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(statement, [
+                    {'restaurant_id': restaurant_id, 'score': score} for restaurant_id, score in dirty.items()
+                ])
+        except Exception:
+            with self._lock:
+                # Nouvel essai au prochain passage (les valeurs plus récentes l'emportent).
+                self._dirty = {**dirty, **self._dirty}
+            raise
+        # UPDATE hors session : les écouteurs de cache.py ne le voient pas
+        # (tri ?sort=-score de la liste, bayesian_score du détail).
+        response_cache.invalidate({'restaurants', *(f'restaurant:{restaurant_id}' for restaurant_id in dirty)})
+        return len(dirty)
+
+    def start_thread(self):
+        # Démarré au premier chargement, dans le processus qui sert les requêtes
+        # (serve.py le relance dans chaque worker après le fork).
+        if self._app is None or not self._app.config.get('BACKGROUND_THREADS', True):
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='leaderboard', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        last_refresh = time.monotonic()
+        while True:
+            time.sleep(self.persist_interval)
+            try:
+                with self._app.app_context():
+                    if time.monotonic() - last_refresh >= self.refresh_interval:
+                        self.load()
+                        last_refresh = time.monotonic()
+                    self.persist()
+            except Exception:
+                logger.exception("classement : échec de la persistance périodique")
+
+
+leaderboard = Leaderboard()
+
+
+def rebuild_scores():
+    """Recalcule et écrit bayesian_score pour tous les restaurants (seed, CLI)."""
+    board = Leaderboard()
+    board.min_reviews = leaderboard.min_reviews
+    board.prior_weight = leaderboard.prior_weight
+    board.prior_mean = leaderboard.prior_mean
+    count = board.load()
+    board.persist()
+    return count, board.prior
+
+
+@job_queue.handler('leaderboard.rebuild')
+def rebuild_job():
+    rebuild_scores()
+
+
+# ------------------ SUIVI DES ÉCRITURES ------------------
+
+@event.listens_for(Session, 'after_flush')
+def _collect_restaurants(session, flush_context):
+    pending = session.info.setdefault('leaderboard_restaurants', set())
+    for objects in (session.new, session.deleted, session.dirty):
+        for obj in objects:
+            if isinstance(obj, Review):
+                # Ancien et nouveau restaurant si la critique a été déplacée.
+                history = inspect(obj).attrs.restaurant_id.history
+                pending.update(history.deleted, history.unchanged, history.added, (obj.restaurant_id,))
+            elif isinstance(obj, Restaurant):
+                pending.add(obj.id)
+    pending.discard(None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _update_on_commit(session):
+    restaurant_ids = session.info.pop('leaderboard_restaurants', None)
+    if restaurant_ids:
+        leaderboard.update(restaurant_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('leaderboard_restaurants', None)
+
+
+leaderboard_cli = AppGroup('leaderboard', help="Classement bayésien des restaurants.")
+
+
+@leaderboard_cli.command('rebuild')
+def rebuild_command():
+    """Recalcule les scores bayésiens de tous les restaurants et les enregistre."""
+    count, prior = rebuild_scores()
+    click.echo(f"Classement recalculé : {count} restaurants classés "
+               f"(moyenne a priori {prior.mean:.3f}, poids {prior.weight:.1f}).")
@@ -0,0 +1,66 @@
+# loading.py
+# Stratégies de chargement déclarées pour chaque sérialiseur to_dict().
+#
+# Chaque to_dict() parcourt des relations ; sans option, chaque accès déclenche
+# un lazy load (problème N+1). Les arbres ci-dessous décrivent exactement ce que
+# parcourt le sérialiseur correspondant, afin que la requête racine charge tout
+# le graphe en un nombre fixe de requêtes SQL (une par niveau de selectinload),
+# quel que soit le nombre de critiques, de menus ou de plats.
+#
+# Si vous modifiez un to_dict(), mettez à jour l'arbre correspondant ici.
+from sqlalchemy.orm import joinedload, selectinload
+
+from restaurant import Restaurant
+from food_user import FoodUser
+from menu import Menu
+from dish import Dish
+from menu_dish import MenuDish
+from review import Review
+from favorite import Favorite
+
+# ------------------ RELATIONS MANY-TO-ONE (un seul objet) ------------------
+# joinedload : l'objet lié est ramené dans la même requête par un JOIN.
+
+# MenuDish.to_dict() -> dish_lite_dict() + menu_lite_dict()
+MENU_DISH_TO_DICT = (
+    joinedload(MenuDish.dish),
+    joinedload(MenuDish.menu),
+)
+
+# Review.to_dict() -> food_user_lite_dict() + restaurant_lite_dict()
+REVIEW_TO_DICT = (
+    joinedload(Review.food_user),
+    joinedload(Review.restaurant),
+)
+
+# Favorite.to_dict() -> restaurant_lite_dict() + food_user_lite_dict()
+FAVORITE_TO_DICT = (
+    joinedload(Favorite.restaurant),
+    joinedload(Favorite.food_user),
+)
+
+# ------------------ COLLECTIONS (one-to-many) ------------------
+# selectinload : une requête "WHERE parent_id IN (...)" par niveau.
+
+# Dish.to_dict() -> menu_dishes[].to_dict()
+DISH_TO_DICT = (
+    selectinload(Dish.menu_dishes).options(*MENU_DISH_TO_DICT),
+)
+
+# Menu.to_dict() -> restaurant_lite_dict() + dishes[].to_dict() (via menu_dishes)
+MENU_TO_DICT = (
+    joinedload(Menu.restaurant),
+    selectinload(Menu.menu_dishes).joinedload(MenuDish.dish).options(*DISH_TO_DICT),
+)
+
+# Restaurant.to_dict() -> reviews[], menus[] (favoris : compteur dénormalisé)
+RESTAURANT_TO_DICT = (
+    selectinload(Restaurant.reviews).options(*REVIEW_TO_DICT),
+    selectinload(Restaurant.menus).options(*MENU_TO_DICT),
+)
+
+# FoodUser.to_dict() -> restaurants (proxy sur favorites) + reviews[]
+FOOD_USER_TO_DICT = (
+    selectinload(FoodUser.favorites).joinedload(Favorite.restaurant),
+    selectinload(FoodUser.reviews).options(*REVIEW_TO_DICT),
+)
@@ -0,0 +1,47 @@
+# lru.py
+# Cache LRU en mémoire du processus, borné en nombre d'entrées, avec durée de
+# vie optionnelle par entrée. Utilisé par le cache de réponses (cache.py) et
+# par le cache des jetons Google (google_auth.py).
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Cache en mémoire du processus, borné en nombre d'entrées (éviction LRU)."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def incr(self, key):
+        with self._lock:
+            value, expires_at = self._data.get(key, (0, None))
+            self._data[key] = (value + 1, expires_at)
+            self._data.move_to_end(key)
+            return value + 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
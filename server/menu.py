@@ -3,6 +3,7 @@
 from sqlalchemy.orm import validates
 from sqlalchemy.ext.associationproxy import association_proxy
 from config import db
+from profiling import serializer
 # L'importation de MenuDish est correcte si MenuDish est défini séparément
 # Si MenuDish n'est pas importé ici, assurez-vous qu'il l'est dans app.py
 # ou que la relation est définie en utilisant une chaîne de caractères ('MenuDish').
@@ -11,6 +12,11 @@ from config import db
 class Menu(db.Model):
     __tablename__ = 'menus'
 
+    # Index de la clé étrangère (GET /menus?restaurant_id= et Restaurant.menus).
+    __table_args__ = (
+        db.Index('ix_menus_restaurant_id', 'restaurant_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     
@@ -29,6 +35,7 @@ class Menu(db.Model):
 
     # ------------------ SERIALIZATION MANUELLE (LÉGÈRE) ------------------
 
+    @serializer
     def menu_lite_dict(self):
         """
         Version légère de la sérialisation, utilisée pour l'inclusion 
@@ -42,6 +49,7 @@ class Menu(db.Model):
 
     # ------------------ SERIALIZATION MANUELLE (COMPLÈTE) ------------------
 
+    @serializer
     def to_dict(self):
         """
         Sérialisation complète du menu, incluant les plats associés.
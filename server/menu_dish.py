@@ -1,6 +1,7 @@
 # menu_dish.py
 # REMOVED: from sqlalchemy_serializer import SerializerMixin
 from config import db
+from profiling import serializer
 
 class MenuDish(db.Model):
     __tablename__ = 'menu_dishes'
@@ -12,6 +13,8 @@ class MenuDish(db.Model):
     # Contrainte pour garantir qu'un plat n'est pas ajouté deux fois au même menu
     __table_args__ = (
         db.UniqueConstraint('dish_id', 'menu_id', name='_dish_menu_uc'),
+        # dish_id est couvert par la contrainte ci-dessus, pas menu_id (Menu.menu_dishes).
+        db.Index('ix_menu_dishes_menu_id', 'menu_id'),
     )
 
     # Relationships
@@ -23,6 +26,7 @@ class MenuDish(db.Model):
 
     # ------------------ SERIALIZATION MANUELLE ------------------
 
+    @serializer
     def to_dict(self):
         """
         Sérialise l'objet d'association MenuDish, incluant ses objets liés 
@@ -45,6 +45,15 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+def include_name(name, type_, parent_names):
+    # Les tables virtuelles FTS5 et R*Tree (et leurs tables internes) sont
+    # gérées par search.py et geo.py : l'autogénération ne doit pas proposer
+    # de les supprimer.
+    if type_ == "table" and name and ("_fts" in name or "_rtree" in name):
+        return False
+    return True
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
@@ -100,6 +109,7 @@ def run_migrations_online():
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
+            include_name=include_name,
             **conf_args
         )
 
@@ -0,0 +1,35 @@
+"""Ville, catégorie et score bayésien des restaurants
+
+Revision ID: 2b6e4d9f7c31
+Revises: 9f3d7c2b8a14
+Create Date: 2026-10-18 18:21:07.115839
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b6e4d9f7c31'
+down_revision = '9f3d7c2b8a14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('restaurants', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('city', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('category', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('bayesian_score', sa.Float(), nullable=True))
+        batch_op.create_index('ix_restaurants_bayesian_score_id', ['bayesian_score', 'id'], unique=False)
+    # Les scores sont calculés par `flask leaderboard rebuild` (ou au premier
+    # chargement du classement, puis écrits par sa persistance périodique).
+
+
+def downgrade():
+    op.drop_index('ix_restaurants_bayesian_score_id', table_name='restaurants')
+    # ALTER TABLE ... DROP COLUMN natif (SQLite >= 3.35) : la recréation de la
+    # table en mode batch supprimerait les triggers FTS et R*Tree de restaurants.
+    op.drop_column('restaurants', 'bayesian_score')
+    op.drop_column('restaurants', 'category')
+    op.drop_column('restaurants', 'city')
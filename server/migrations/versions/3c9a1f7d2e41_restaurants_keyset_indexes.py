@@ -0,0 +1,28 @@
+"""Index keyset pour la pagination des restaurants
+
+Revision ID: 3c9a1f7d2e41
+Revises: b4987ab6f25f
+Create Date: 2026-10-18 09:12:04.118230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9a1f7d2e41'
+down_revision = 'b4987ab6f25f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('restaurants', schema=None) as batch_op:
+        batch_op.create_index('ix_restaurants_rating_id', ['rating', 'id'], unique=False)
+        batch_op.create_index('ix_restaurants_name_id', ['name', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('restaurants', schema=None) as batch_op:
+        batch_op.drop_index('ix_restaurants_name_id')
+        batch_op.drop_index('ix_restaurants_rating_id')
@@ -0,0 +1,41 @@
+"""Compteur de favoris sur restaurants, index favorites(restaurant_id, created_at)
+
+Revision ID: 5a8c2f61d9e3
+Revises: e7b3a90c15d4
+Create Date: 2026-10-18 16:12:40.318254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a8c2f61d9e3'
+down_revision = 'e7b3a90c15d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('restaurants', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('favorite_count', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute("""
+        UPDATE restaurants SET
+            favorite_count = (SELECT count(*) FROM favorites WHERE favorites.restaurant_id = restaurants.id)
+    """)
+
+    # Le nouvel index commence par restaurant_id : il remplace l'index simple.
+    with op.batch_alter_table('favorites', schema=None) as batch_op:
+        batch_op.create_index('ix_favorites_restaurant_id_created_at', ['restaurant_id', 'created_at'], unique=False)
+        batch_op.drop_index('ix_favorites_restaurant_id')
+
+
+def downgrade():
+    with op.batch_alter_table('favorites', schema=None) as batch_op:
+        batch_op.create_index('ix_favorites_restaurant_id', ['restaurant_id'], unique=False)
+        batch_op.drop_index('ix_favorites_restaurant_id_created_at')
+
+    # ALTER TABLE ... DROP COLUMN natif (SQLite >= 3.35) : la recréation de la
+    # table en mode batch supprimerait les triggers FTS de restaurants.
+    op.drop_column('restaurants', 'favorite_count')
@@ -0,0 +1,26 @@
+"""Index sur lower(name) pour le filtre name_prefix
+
+Revision ID: 7e2f9c4b1a63
+Revises: 6c1e8a4f2d57
+Create Date: 2026-10-18 21:05:47.902113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e2f9c4b1a63'
+down_revision = '6c1e8a4f2d57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Index d'expression créé directement (sans batch : les triggers FTS et
+    # R*Tree de restaurants doivent être conservés).
+    op.create_index('ix_restaurants_name_lower', 'restaurants', [sa.text('lower(name)')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_restaurants_name_lower', table_name='restaurants')
@@ -0,0 +1,51 @@
+"""Agrégats des critiques sur restaurants
+
+Revision ID: 8d2e6b0a4f17
+Revises: 3c9a1f7d2e41
+Create Date: 2026-10-18 10:03:51.502317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2e6b0a4f17'
+down_revision = '3c9a1f7d2e41'
+branch_labels = None
+depends_on = None
+
+AGGREGATE_COLUMNS = (
+    ('review_count', sa.Integer()),
+    ('rating_sum', sa.Float()),
+    ('star_1_count', sa.Integer()),
+    ('star_2_count', sa.Integer()),
+    ('star_3_count', sa.Integer()),
+    ('star_4_count', sa.Integer()),
+    ('star_5_count', sa.Integer()),
+)
+
+
+def upgrade():
+    with op.batch_alter_table('restaurants', schema=None) as batch_op:
+        for name, type_ in AGGREGATE_COLUMNS:
+            batch_op.add_column(sa.Column(name, type_, server_default='0', nullable=False))
+
+    # Remplissage initial à partir des critiques existantes
+    # (même découpage des étoiles que aggregates.star_bucket()).
+    op.execute("""
+        UPDATE restaurants SET
+            review_count = (SELECT count(*) FROM reviews WHERE reviews.restaurant_id = restaurants.id),
+            rating_sum = (SELECT coalesce(sum(rating), 0) FROM reviews WHERE reviews.restaurant_id = restaurants.id),
+            star_1_count = (SELECT count(*) FROM reviews WHERE reviews.restaurant_id = restaurants.id AND rating < 1.5),
+            star_2_count = (SELECT count(*) FROM reviews WHERE reviews.restaurant_id = restaurants.id AND rating >= 1.5 AND rating < 2.5),
+            star_3_count = (SELECT count(*) FROM reviews WHERE reviews.restaurant_id = restaurants.id AND rating >= 2.5 AND rating < 3.5),
+            star_4_count = (SELECT count(*) FROM reviews WHERE reviews.restaurant_id = restaurants.id AND rating >= 3.5 AND rating < 4.5),
+            star_5_count = (SELECT count(*) FROM reviews WHERE reviews.restaurant_id = restaurants.id AND rating >= 4.5)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('restaurants', schema=None) as batch_op:
+        for name, _ in reversed(AGGREGATE_COLUMNS):
+            batch_op.drop_column(name)
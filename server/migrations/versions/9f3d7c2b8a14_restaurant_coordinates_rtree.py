@@ -0,0 +1,60 @@
+"""Coordonnées des restaurants et index géographique R*Tree
+
+Revision ID: 9f3d7c2b8a14
+Revises: 5a8c2f61d9e3
+Create Date: 2026-10-18 17:05:12.774031
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9f3d7c2b8a14'
+down_revision = '5a8c2f61d9e3'
+branch_labels = None
+depends_on = None
+
+# Doit rester aligné avec geo.RTREE_DDL.
+RTREE_TABLE = 'restaurants_rtree'
+HAS_POSITION = "new.latitude IS NOT NULL AND new.longitude IS NOT NULL"
+
+
+def upgrade():
+    with op.batch_alter_table('restaurants', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+        batch_op.create_index('ix_restaurants_latitude_longitude', ['latitude', 'longitude'], unique=False)
+
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    # Les coordonnées sont renseignées ensuite (seed.py --backfill-coordinates) :
+    # les triggers alimentent l'index au fil des mises à jour.
+    op.execute(f"CREATE VIRTUAL TABLE {RTREE_TABLE} USING rtree(id, min_lat, max_lat, min_lng, max_lng)")
+    op.execute(
+        f"CREATE TRIGGER {RTREE_TABLE}_ai AFTER INSERT ON restaurants WHEN {HAS_POSITION} BEGIN "
+        f"INSERT INTO {RTREE_TABLE} VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {RTREE_TABLE}_ad AFTER DELETE ON restaurants BEGIN "
+        f"DELETE FROM {RTREE_TABLE} WHERE id = old.id; END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {RTREE_TABLE}_au AFTER UPDATE OF latitude, longitude ON restaurants BEGIN "
+        f"DELETE FROM {RTREE_TABLE} WHERE id = old.id; "
+        f"INSERT INTO {RTREE_TABLE} SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude "
+        f"WHERE {HAS_POSITION}; END"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {RTREE_TABLE}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {RTREE_TABLE}")
+
+    op.drop_index('ix_restaurants_latitude_longitude', table_name='restaurants')
+    # ALTER TABLE ... DROP COLUMN natif (SQLite >= 3.35) : la recréation de la
+    # table en mode batch supprimerait les triggers FTS de restaurants.
+    op.drop_column('restaurants', 'longitude')
+    op.drop_column('restaurants', 'latitude')
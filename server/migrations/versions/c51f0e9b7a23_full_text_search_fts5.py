@@ -0,0 +1,58 @@
+"""Index de recherche plein texte FTS5 (restaurants, plats)
+
+Revision ID: c51f0e9b7a23
+Revises: 8d2e6b0a4f17
+Create Date: 2026-10-18 11:27:36.940512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c51f0e9b7a23'
+down_revision = '8d2e6b0a4f17'
+branch_labels = None
+depends_on = None
+
+# table -> (table FTS, colonnes indexées) ; doit rester aligné avec search.FTS_INDEXES
+FTS_INDEXES = {
+    'restaurants': ('restaurants_fts', ('name', 'address')),
+    'dishes': ('dishes_fts', ('name', 'description')),
+}
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table, (fts_table, columns) in FTS_INDEXES.items():
+        cols = ', '.join(columns)
+        new_cols = ', '.join(f'new.{c}' for c in columns)
+        old_cols = ', '.join(f'old.{c}' for c in columns)
+        op.execute(
+            f"CREATE VIRTUAL TABLE {fts_table} USING fts5("
+            f"{cols}, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts_table}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts_table}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts_table}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+            f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+            f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+        )
+        op.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for fts_table, _ in FTS_INDEXES.values():
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {fts_table}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {fts_table}")
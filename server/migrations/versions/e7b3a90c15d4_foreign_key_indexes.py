@@ -0,0 +1,39 @@
+"""Index sur les clés étrangères (critiques, menus, menu_dishes, favoris)
+
+Revision ID: e7b3a90c15d4
+Revises: c51f0e9b7a23
+Create Date: 2026-10-18 14:03:52.604117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b3a90c15d4'
+down_revision = 'c51f0e9b7a23'
+branch_labels = None
+depends_on = None
+
+# favorites.food_user_id et menu_dishes.dish_id sont déjà couverts par les
+# contraintes d'unicité (_user_restaurant_uc, _dish_menu_uc) dont ils sont la
+# première colonne.
+FOREIGN_KEY_INDEXES = (
+    ('reviews', 'restaurant_id'),
+    ('reviews', 'food_user_id'),
+    ('menus', 'restaurant_id'),
+    ('menu_dishes', 'menu_id'),
+    ('favorites', 'restaurant_id'),
+)
+
+
+def upgrade():
+    for table, column in FOREIGN_KEY_INDEXES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(f'ix_{table}_{column}', [column], unique=False)
+
+
+def downgrade():
+    for table, column in reversed(FOREIGN_KEY_INDEXES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table}_{column}')
@@ -0,0 +1,215 @@
+# negotiation.py
+# Format et encodage des réponses, négociés par requête.
+#
+# JSON compact par défaut (JSON_PRETTY=True rétablit l'indentation, pour le
+# développement). Les clients qui préfèrent MessagePack (Accept:
+# application/msgpack) le reçoivent à la place du JSON si le paquet `msgpack`
+# est installé. Au-delà de COMPRESSION_MIN_SIZE octets, le corps est compressé
+# selon Accept-Encoding : brotli (paquet `brotli`), zstd (paquet `zstandard`)
+# ou gzip (bibliothèque standard). msgpack, brotli et zstandard figurent dans
+# le Pipfile et requirements.txt ; absents, le codage correspondant n'est pas
+# proposé, et un client qui n'accepte que MessagePack reçoit 406. Les réponses
+# concernées portent `Vary: Accept, Accept-Encoding`.
+#
+# Les réponses du cache (cache.py) sont encodées avant la comparaison de
+# l'ETag : chaque variante a son ETag (suffixe "-br", "-msgpack", ...) et son
+# corps encodé est conservé dans le backend du cache sous une clé dérivée de
+# cet ETag. Une entrée du cache n'est donc compressée qu'une fois par
+# variante, à un niveau plus élevé que les réponses dynamiques
+# (COMPRESSION_CACHED_LEVELS). Les réponses en flux ne sont pas compressées.
+import importlib
+import json
+import logging
+
+from flask import make_response, request
+
+logger = logging.getLogger(__name__)
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+COMPRESSIBLE_MIMETYPES = {JSON_MIMETYPE, *MSGPACK_MIMETYPES, 'application/javascript', 'image/svg+xml'}
+
+# Ordre de préférence du serveur, à qualité égale côté client.
+DEFAULT_ENCODINGS = ('br', 'zstd', 'gzip')
+# Niveaux : réponses calculées à chaque requête, puis variantes mises en cache.
+DEFAULT_LEVELS = {'br': 4, 'zstd': 3, 'gzip': 6}
+DEFAULT_CACHED_LEVELS = {'br': 9, 'zstd': 12, 'gzip': 9}
+
+
+# ------------------ CODECS ------------------
+
+def _gzip(level):
+    import gzip
+
+    # mtime=0 : même entrée, mêmes octets (corps mis en cache, ETag stable).
+    return lambda data: gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _brotli(level):
+    import brotli
+
+    return lambda data: brotli.compress(data, quality=level)
+
+
+def _zstd(level):
+    import zstandard
+
+    # Un ZstdCompressor ne doit pas être partagé entre fils : un par appel.
+    return lambda data: zstandard.ZstdCompressor(level=level).compress(data)
+
+
+CODECS = {'gzip': _gzip, 'br': _brotli, 'zstd': _zstd}
+
+
+def _optional(module_name):
+    try:
+        return importlib.import_module(module_name)
+    except ImportError:
+        return None
+
+
+class WireFormats:
+    def __init__(self):
+        self.compression = True
+        self.min_size = 1024
+        self.encodings = DEFAULT_ENCODINGS
+        self.levels = DEFAULT_LEVELS
+        self.cached_levels = DEFAULT_CACHED_LEVELS
+        self.msgpack_enabled = True
+        self._codecs = None
+        self._msgpack = None
+
+    def init_app(self, app):
+        config = app.config
+        pretty = config.setdefault('JSON_PRETTY', False)
+        # jsonify / make_response(dict) et représentations Flask-RESTful (indentées en debug sans 'indent').
+        app.json.compact = not pretty
+        config.setdefault('RESTFUL_JSON', {'indent': 2} if pretty else {'indent': None, 'separators': (',', ':')})
+
+        self.compression = config.get('COMPRESSION_ENABLED', self.compression)
+        self.min_size = config.get('COMPRESSION_MIN_SIZE', self.min_size)
+        self.encodings = tuple(config.get('COMPRESSION_ENCODINGS', self.encodings))
+        self.levels = {**DEFAULT_LEVELS, **config.get('COMPRESSION_LEVELS', {})}
+        self.cached_levels = {**DEFAULT_CACHED_LEVELS, **config.get('COMPRESSION_CACHED_LEVELS', {})}
+        self.msgpack_enabled = config.get('MSGPACK_ENABLED', self.msgpack_enabled)
+        self._codecs = None
+        self._msgpack = None
+        app.before_request(self._not_acceptable)
+        app.after_request(self._after_request)
+
+    # --- disponibilité (imports à la première requête, pas au démarrage) ---
+
+    def codecs(self):
+        """{codage: (compresseur dynamique, compresseur des variantes en cache)} disponibles."""
+        if self._codecs is None:
+            codecs = {}
+            for name in self.encodings:
+                try:
+                    codecs[name] = (CODECS[name](self.levels[name]), CODECS[name](self.cached_levels[name]))
+                except ImportError:
+                    logger.info("compression %s indisponible (paquet absent)", name)
+            self._codecs = codecs
+        return self._codecs
+
+    def msgpack(self):
+        if self._msgpack is None:
+            self._msgpack = (self.msgpack_enabled and _optional('msgpack')) or False
+        return self._msgpack or None
+
+    # --- négociation ---
+
+    def variant(self, mimetype, size):
+        """
+        (type de contenu, codage) à produire pour la requête courante à partir
+        d'un corps `mimetype` de `size` octets ; (mimetype, None) : inchangé.
+        """
+        if mimetype == JSON_MIMETYPE and self.msgpack() is not None:
+            best = request.accept_mimetypes.best_match((JSON_MIMETYPE, *MSGPACK_MIMETYPES))
+            if best in MSGPACK_MIMETYPES:
+                mimetype = best
+        encoding = None
+        if self.compression and size >= self.min_size and self._compressible(mimetype):
+            encoding = request.accept_encodings.best_match(list(self.codecs()))
+        return mimetype, encoding
+
+    def vary(self, mimetype):
+        """En-têtes dont dépend la représentation d'un corps `mimetype`."""
+        headers = []
+        if mimetype in (JSON_MIMETYPE, *MSGPACK_MIMETYPES) and self.msgpack() is not None:
+            headers.append('Accept')
+        if self.compression and self._compressible(mimetype) and self.codecs():
+            headers.append('Accept-Encoding')
+        return headers
+
+    @staticmethod
+    def _compressible(mimetype):
+        return mimetype is not None and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES)
+
+    # --- encodage ---
+
+    def encode(self, body, source, target, encoding, cached=False):
+        if target != source:
+            body = self.msgpack().packb(json.loads(body), use_bin_type=True)
+        if encoding is not None:
+            body = self.codecs()[encoding][1 if cached else 0](body)
+        return body
+
+    def apply(self, response, cache=None, ttl=None):
+        """
+        Encode `response` (non diffusée en flux) pour la requête courante. Avec
+        `cache` (backend de cache.py) et un ETag, le corps encodé y est
+        conservé : la variante n'est calculée qu'une fois.
+        """
+        source = response.mimetype
+        vary = self.vary(source)
+        if not vary:
+            return response
+        response.vary.update(vary)
+        if (response.is_streamed or response.direct_passthrough or response.status_code in (204, 304)
+                or 'Content-Encoding' in response.headers
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+
+        body = response.get_data()
+        target, encoding = self.variant(source, len(body))
+        if target == source and encoding is None:
+            return response
+
+        suffix = '.'.join(filter(None, ('msgpack' if target != source else None, encoding)))
+        etag, weak = response.get_etag()
+        if etag is not None:
+            etag = f'{etag}-{suffix}'
+        key = f'encoded:{etag}' if cache is not None and etag is not None and not weak else None
+        encoded = cache.get(key) if key is not None else None
+        if encoded is None:
+            encoded = self.encode(body, source, target, encoding, cached=key is not None)
+            if key is not None:
+                cache.set(key, encoded, ttl=ttl)
+
+        response.set_data(encoded)
+        if target != source:
+            response.mimetype = target
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        if etag is not None:
+            response.set_etag(etag, weak)
+        return response
+
+    def _not_acceptable(self):
+        # MessagePack exigé (JSON refusé) mais indisponible : 406 plutôt que du JSON.
+        accept = request.accept_mimetypes
+        if (self.msgpack() is None and not accept.quality(JSON_MIMETYPE)
+                and any(accept.quality(mimetype) for mimetype in MSGPACK_MIMETYPES)):
+            response = make_response({'message': "MessagePack indisponible : acceptez application/json"}, 406)
+            response.vary.add('Accept')
+            return response
+        return None
+
+    def _after_request(self, response):
+        # Les réponses du cache sont déjà encodées (Vary posé par apply()).
+        if 'Accept-Encoding' in response.vary or 'Accept' in response.vary:
+            return response
+        return self.apply(response)
+
+
+wire_formats = WireFormats()
@@ -0,0 +1,131 @@
+# pagination.py
+# Pagination par curseur (keyset) : au lieu d'un OFFSET qui oblige la base à
+# parcourir toutes les lignes précédentes, on reprend la lecture juste après la
+# dernière ligne renvoyée, en s'appuyant sur un index (colonne de tri, id).
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import DateTime, and_, or_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 100
+
+
+class PaginationError(ValueError):
+    """Paramètre de pagination (limit, cursor, sort) invalide."""
+
+
+def parse_limit(raw, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    if raw is None or raw == '':
+        return default
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        raise PaginationError("Le paramètre 'limit' doit être un entier")
+    if limit < 1:
+        raise PaginationError("Le paramètre 'limit' doit être supérieur à 0")
+    return min(limit, maximum)
+
+
+def _cursor_value(value):
+    # Les dates (tri par created_at) sont écrites au format ISO 8601.
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Valeur de curseur non sérialisable : {value!r}")
+
+
+def encode_cursor(sort, values):
+    """
+    Encode la position (clé de tri + valeurs de la dernière ligne) dans une
+    chaîne opaque utilisable dans une URL.
+    """
+    raw = json.dumps([sort, *values], separators=(',', ':'), default=_cursor_value).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """
+    Décode un curseur produit par encode_cursor() et vérifie qu'il a été émis
+    pour le même ordre de tri.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise PaginationError("Curseur invalide")
+    if not isinstance(data, list) or len(data) < 2 or data[0] != sort:
+        raise PaginationError("Le curseur ne correspond pas à l'ordre de tri demandé")
+    return data[1:]
+
+
+class KeysetOrder:
+    """
+    Ordre de tri paginable : une colonne principale (éventuellement nullable)
+    départagée par la clé primaire, dans le même sens pour que l'index
+    composite (colonne, id) puisse être parcouru dans un seul sens.
+    """
+
+    def __init__(self, column, tiebreaker, descending=False):
+        self.column = column
+        self.tiebreaker = tiebreaker
+        self.descending = descending
+
+    def order_by(self):
+        if self.column is self.tiebreaker:
+            return [self.tiebreaker.desc() if self.descending else self.tiebreaker.asc()]
+        # Les NULL sont toujours considérés comme les plus petites valeurs
+        # (comportement natif de SQLite, explicite pour PostgreSQL).
+        if self.descending:
+            return [self.column.desc().nulls_last(), self.tiebreaker.desc()]
+        return [self.column.asc().nulls_first(), self.tiebreaker.asc()]
+
+    def values(self, row):
+        if self.column is self.tiebreaker:
+            return [getattr(row, self.tiebreaker.key)]
+        return [getattr(row, self.column.key), getattr(row, self.tiebreaker.key)]
+
+    def after(self, values):
+        """Condition SQL sélectionnant les lignes situées après la position donnée."""
+        col, tie = self.column, self.tiebreaker
+        # Le curseur vient du client : forme vérifiée avant de construire le SQL.
+        if (len(values) != (1 if col is tie else 2)
+                or not isinstance(values[-1], int) or isinstance(values[-1], bool)
+                or not all(v is None or isinstance(v, (str, int, float)) for v in values)):
+            raise PaginationError("Curseur invalide")
+        if col is tie:
+            (last_id,) = values
+            return tie < last_id if self.descending else tie > last_id
+
+        last_value, last_id = values
+        if isinstance(last_value, str) and isinstance(col.type, DateTime):
+            try:
+                last_value = datetime.fromisoformat(last_value)
+            except ValueError:
+                raise PaginationError("Curseur invalide")
+        tie_after = tie < last_id if self.descending else tie > last_id
+        if last_value is None:
+            if self.descending:
+                # Les NULL sont en fin de parcours : on ne départage plus que par id.
+                return and_(col.is_(None), tie_after)
+            return or_(col.isnot(None), and_(col.is_(None), tie_after))
+        if self.descending:
+            return or_(col < last_value, col.is_(None), and_(col == last_value, tie_after))
+        return or_(col > last_value, and_(col == last_value, tie_after))
+
+
+def paginate(query, order, cursor=None, limit=DEFAULT_LIMIT, sort_name=None):
+    """
+    Applique la pagination keyset à une requête SQLAlchemy.
+    Renvoie (lignes, curseur_suivant) ; curseur_suivant vaut None sur la dernière page.
+    """
+    if cursor:
+        query = query.filter(order.after(decode_cursor(cursor, sort_name)))
+
+    # On lit une ligne de plus pour savoir s'il existe une page suivante.
+    rows = query.order_by(*order.order_by()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort_name, order.values(rows[-1]))
+    return rows, next_cursor
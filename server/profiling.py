@@ -0,0 +1,250 @@
+# profiling.py
+# Instrumentation par requête (optionnelle) : nombre de requêtes SQL, temps
+# passé en base, temps de sérialisation JSON et temps total, renvoyés dans
+# l'en-tête Server-Timing (visible dans l'onglet Réseau du navigateur) :
+#
+#   Server-Timing: db;dur=41.2;desc="57 SQL", ser;dur=8.9, app;dur=12.4, total;dur=62.5
+#
+# Les requêtes SQL de même forme (même texte une fois les listes IN (...)
+# repliées) exécutées au moins PROFILING_N_PLUS_ONE_THRESHOLD fois dans une
+# requête sont signalées comme N+1, avec la ligne du code applicatif qui les
+# déclenche (typiquement une chaîne de to_dict() qui charge les relations une
+# par une). Les requêtes lentes (PROFILING_SLOW_MS) sont écrites, avec une
+# probabilité PROFILING_SAMPLE_RATE, dans le journal structuré "profiling"
+# (une ligne JSON par requête, fichier optionnel PROFILING_LOG_FILE).
+#
+# Désactivée par défaut : PROFILING_ENABLED=1 (config ou environnement).
+import json
+import logging
+import os
+import random
+import re
+import time
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from flask import request, request_finished, request_started, request_tearing_down
+from flask.json.provider import DefaultJSONProvider
+from flask_restful.representations.json import output_json as restful_output_json
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('profiling')
+
+_SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)|\(\s*%\(\w+\)s(?:\s*,\s*%\(\w+\)s)+\s*\)')
+_SPACES = re.compile(r'\s+')
+
+_current = ContextVar('request_profile', default=None)
+
+
+def query_shape(statement):
+    """Texte normalisé d'une requête : listes IN (?, ?, ...) repliées, espaces réduits."""
+    return _SPACES.sub(' ', _IN_LIST.sub('(?...)', statement)).strip()
+
+
+def _origin():
+    """Première ligne de code applicatif (hors bibliothèques) dans la pile d'appel."""
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(_SERVER_DIR) and filename != __file__ and 'site-packages' not in filename:
+            return f'{os.path.basename(filename)}:{frame.lineno} in {frame.name}'
+    return None
+
+
+class RequestProfile:
+    def __init__(self, n_plus_one_threshold):
+        self.started = time.perf_counter()
+        self.threshold = n_plus_one_threshold
+        self.queries = 0
+        self.db_time = 0.0
+        self.ser_time = 0.0
+        self.ser_depth = 0
+        self.shapes = {}  # forme -> [nombre, durée cumulée, origine]
+        self.token = None
+
+    def record_query(self, statement, elapsed):
+        self.queries += 1
+        self.db_time += elapsed
+        shape = query_shape(statement)
+        entry = self.shapes.get(shape)
+        if entry is None:
+            self.shapes[shape] = [1, elapsed, None]
+            return
+        entry[0] += 1
+        entry[1] += elapsed
+        if entry[0] == self.threshold:
+            # La pile n'est inspectée qu'une fois, pour les formes répétées.
+            entry[2] = _origin()
+
+    def n_plus_one(self):
+        return [
+            {'shape': shape, 'count': count, 'db_ms': round(total * 1000, 2), 'origin': origin}
+            for shape, (count, total, origin) in self.shapes.items()
+            if count >= self.threshold
+        ]
+
+    def top_queries(self, limit=3):
+        ranked = sorted(self.shapes.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [{'shape': shape[:300], 'count': count, 'db_ms': round(total * 1000, 2)}
+                for shape, (count, total, _) in ranked]
+
+
+@contextmanager
+def measure_serialization():
+    """
+    Compte le bloc dans le temps de sérialisation de la requête en cours (sans
+    effet hors requête profilée). Les blocs imbriqués (to_dict() appelant des
+    *_lite_dict()) ne sont comptés qu'une fois, et les requêtes SQL émises
+    pendant le bloc (chargements paresseux) restent dans le temps "db".
+    """
+    profile = _current.get()
+    if profile is None or profile.ser_depth:
+        yield
+        return
+    profile.ser_depth += 1
+    start, db_before = time.perf_counter(), profile.db_time
+    try:
+        yield
+    finally:
+        profile.ser_depth -= 1
+        profile.ser_time += time.perf_counter() - start - (profile.db_time - db_before)
+
+
+def serializer(fn):
+    """
+    Décorateur des sérialiseurs (to_dict(), *_lite_dict(), sélections de
+    schemas.py) : leur durée compte dans "ser". Hors requête profilée, le
+    coût se limite à la lecture d'une ContextVar.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        if profile is None or profile.ser_depth:
+            return fn(*args, **kwargs)
+        with measure_serialization():
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+class ProfiledJSONProvider(DefaultJSONProvider):
+    """Encodeur JSON de l'application (jsonify, make_response(dict)) dont la durée compte dans "ser"."""
+
+    def dumps(self, obj, **kwargs):
+        with measure_serialization():
+            return super().dumps(obj, **kwargs)
+
+
+def output_json(data, code, headers=None):
+    """Représentation JSON de Flask-RESTful, mesurée comme ProfiledJSONProvider."""
+    with measure_serialization():
+        return restful_output_json(data, code, headers)
+
+
+# ------------------ ÉVÉNEMENTS SQLALCHEMY ------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault('profiling_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    stack = conn.info.get('profiling_started')
+    if profile is not None and stack:
+        profile.record_query(statement, time.perf_counter() - stack.pop())
+
+
+# ------------------ INTÉGRATION FLASK ------------------
+
+class RequestProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.slow_ms = 200
+        self.sample_rate = 1.0
+        self.threshold = 5
+
+    def init_app(self, app):
+        config = app.config
+        config.setdefault('PROFILING_ENABLED', os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true'))
+        if not config['PROFILING_ENABLED']:
+            return
+        self.enabled = True
+        self.slow_ms = config.get('PROFILING_SLOW_MS', 200)
+        self.sample_rate = config.get('PROFILING_SAMPLE_RATE', 1.0)
+        self.threshold = config.get('PROFILING_N_PLUS_ONE_THRESHOLD', 5)
+        if config.get('PROFILING_LOG_FILE'):
+            handler = logging.FileHandler(config['PROFILING_LOG_FILE'])
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+        # La sérialisation est mesurée par ses propres points d'entrée, sans rien
+        # modifier ici : @serializer (modèles, schemas.py), ProfiledJSONProvider
+        # et output_json (config.py), measure_serialization() (read models).
+        request_started.connect(self._start, app)
+        request_finished.connect(self._finish, app)
+        request_tearing_down.connect(self._teardown, app)
+
+    def _start(self, sender, **extra):
+        profile = RequestProfile(self.threshold)
+        profile.token = _current.set(profile)
+
+    def _finish(self, sender, response, **extra):
+        profile = _current.get()
+        if profile is None:
+            return
+        total = time.perf_counter() - profile.started
+        # Réponses en flux : le corps est produit après ce point et n'est pas compté.
+        app_time = max(total - profile.db_time - profile.ser_time, 0.0)
+        metrics = [
+            f'db;dur={profile.db_time * 1000:.2f};desc="{profile.queries} SQL"',
+            f'ser;dur={profile.ser_time * 1000:.2f}',
+            f'app;dur={app_time * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ]
+        suspects = profile.n_plus_one()
+        if suspects:
+            metrics.append(f'nplus1;desc="{len(suspects)} formes"')
+        response.headers['Server-Timing'] = ', '.join(metrics)
+        response.headers['Timing-Allow-Origin'] = '*'
+
+        if total * 1000 >= self.slow_ms and random.random() < self.sample_rate:
+            logger.warning(json.dumps({
+                'event': 'slow_request',
+                'method': request.method,
+                'path': request.full_path.rstrip('?'),
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'total_ms': round(total * 1000, 2),
+                'db_ms': round(profile.db_time * 1000, 2),
+                'ser_ms': round(profile.ser_time * 1000, 2),
+                'queries': profile.queries,
+                'n_plus_one': suspects,
+                'top_queries': profile.top_queries(),
+            }, ensure_ascii=False))
+        elif suspects:
+            logger.info(json.dumps({
+                'event': 'n_plus_one',
+                'path': request.full_path.rstrip('?'),
+                'endpoint': request.endpoint,
+                'n_plus_one': suspects,
+            }, ensure_ascii=False))
+
+    def _teardown(self, sender, **extra):
+        profile = _current.get()
+        if profile is not None and profile.token is not None:
+            try:
+                _current.reset(profile.token)
+            except ValueError:
+                # Jeton créé dans un autre contexte (ex. fin d'une réponse en flux).
+                _current.set(None)
+
+
+request_profiler = RequestProfiler()
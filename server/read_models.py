@@ -0,0 +1,374 @@
+# read_models.py
+# Chemin de lecture "read model" pour les listes (GET /restaurants, GET /reviews).
+#
+# Pour une liste, l'ORM instancie chaque objet (identity map, instrumentation
+# des attributs, @validates) uniquement pour recopier quelques colonnes dans un
+# dict, que le module json parcourt ensuite à nouveau. Ici on sélectionne
+# seulement les colonnes utiles, chaque ligne devient un enregistrement compact
+# à __slots__, et un encodeur compilé une fois par forme produit directement le
+# texte JSON (une concaténation de chaînes, sans dict intermédiaire).
+#
+# Le JSON produit contient les mêmes clés, dans le même ordre, que
+# restaurant_lite_dict() et Review.to_dict() ; seule la mise en forme est compacte.
+#
+# L'arbre des menus d'un restaurant (GET /restaurants/<id>/menus) suit le même
+# principe : une seule requête jointe restaurants -> menus -> menu_dishes ->
+# dishes, regroupée par menu à l'encodage.
+import json
+from json.encoder import encode_basestring_ascii
+
+from flask import current_app
+
+from config import db
+from profiling import measure_serialization
+from restaurant import Restaurant
+from review import Review
+from food_user import FoodUser
+from menu import Menu
+from menu_dish import MenuDish
+from dish import Dish
+from favorite import Favorite
+
+_json = json.JSONEncoder()
+
+
+# ------------------ ENCODAGE DES VALEURS ------------------
+
+def _int(value):
+    return 'null' if value is None else int.__repr__(value)
+
+
+def _float(value):
+    if value is None:
+        return 'null'
+    return _json.encode(float(value))
+
+
+def _str(value):
+    return 'null' if value is None else encode_basestring_ascii(value)
+
+
+def _datetime(value):
+    return 'null' if value is None else '"' + value.isoformat() + '"'
+
+
+def _any(value):
+    return _json.encode(value)
+
+
+def _average(rating_sum, rated):
+    # Même calcul que Restaurant.average_rating.
+    return 'null' if not rated else _float(round(rating_sum / rated, 2))
+
+
+_ENCODERS = {'int': _int, 'float': _float, 'str': _str, 'datetime': _datetime, 'any': _any}
+
+
+# ------------------ FORMES COMPILÉES ------------------
+
+class Field:
+    """
+    Champ JSON de la sortie : `expr` est une expression Python sur
+    l'enregistrement `r` (par défaut r.<clé>), `kind` choisit l'encodeur.
+    """
+
+    def __init__(self, key, kind, expr=None):
+        self.key = key
+        self.kind = kind
+        self.expr = expr or f'r.{key}'
+
+
+class Nested:
+    """Objet imbriqué, émis seulement si `present` (expression sur `r`) est vrai."""
+
+    def __init__(self, key, fields, present):
+        self.key = key
+        self.fields = fields
+        self.present = present
+
+
+def _object_source(fields):
+    parts = []
+    for i, field in enumerate(fields):
+        comma = ',' if i else ''
+        if isinstance(field, Nested):
+            inner = _object_source(field.fields)
+            parts.append(f"(({comma!r} + {json.dumps(field.key)!r} + ':' + {inner}) if {field.present} else '')")
+        else:
+            encoder = '_average' if field.kind == 'average' else f'_{field.kind}'
+            parts.append(f"{comma + json.dumps(field.key) + ':'!r} + {encoder}({field.expr})")
+    return "'{' + " + ' + '.join(parts) + " + '}'"
+
+
+class RecordShape:
+    """
+    Forme d'enregistrement : une classe à __slots__ construite à partir des
+    colonnes sélectionnées, et un encodeur JSON généré pour cette forme.
+    `extra` nomme des attributs calculés en Python (None par défaut).
+    """
+
+    def __init__(self, name, columns, fields, extra=()):
+        self.columns = columns
+        slots = tuple(label for label, _ in columns) + tuple(extra)
+        self.record_class = type(name, (), {'__slots__': slots})
+        namespace = {**{f'_{k}': v for k, v in _ENCODERS.items()}, '_average': _average}
+
+        args = ', '.join([label for label, _ in columns] + [f'{slot}=None' for slot in extra])
+        assigns = '\n'.join(f'    self.{slot} = {slot}' for slot in slots) or '    pass'
+        exec(f'def __init__(self, {args}):\n{assigns}', namespace)
+        self.record_class.__init__ = namespace['__init__']
+
+        exec(f'def encode(r):\n    return {_object_source(fields)}', namespace)
+        self.encode = namespace['encode']
+
+    def select(self):
+        """Requête (Query) ne sélectionnant que les colonnes de la forme."""
+        return db.session.query(*[column.label(label) for label, column in self.columns])
+
+    def records(self, rows):
+        make = self.record_class
+        return [make(*row) for row in rows]
+
+    def encode_list(self, records):
+        encode = self.encode
+        return '[' + ','.join([encode(r) for r in records]) + ']'
+
+    def response(self, records, status=200, headers=None):
+        with measure_serialization():
+            body = self.encode_list(records)
+        return current_app.response_class(body, status=status, headers=headers, mimetype='application/json')
+
+
+def _star_sum(model):
+    return model.star_1_count + model.star_2_count + model.star_3_count + model.star_4_count + model.star_5_count
+
+
+def _restaurant_columns(prefix=''):
+    return [
+        (f'{prefix}id', Restaurant.id),
+        (f'{prefix}name', Restaurant.name),
+        (f'{prefix}rating', Restaurant.rating),
+        (f'{prefix}image_url', Restaurant.image_url),
+        (f'{prefix}phone_number', Restaurant.phone_number),
+        (f'{prefix}address', Restaurant.address),
+        (f'{prefix}review_count', Restaurant.review_count),
+        (f'{prefix}rating_sum', Restaurant.rating_sum),
+        (f'{prefix}rated', _star_sum(Restaurant)),
+    ]
+
+
+def _restaurant_fields(prefix=''):
+    # Clés et ordre de Restaurant.restaurant_lite_dict()
+    return [
+        Field('id', 'int', f'r.{prefix}id'),
+        Field('name', 'str', f'r.{prefix}name'),
+        Field('rating', 'float', f'r.{prefix}rating'),
+        Field('image_url', 'str', f'r.{prefix}image_url'),
+        Field('phone_number', 'str', f'r.{prefix}phone_number'),
+        Field('address', 'str', f'r.{prefix}address'),
+        Field('review_count', 'int', f'(r.{prefix}review_count or 0)'),
+        Field('average_rating', 'average', f'r.{prefix}rating_sum, r.{prefix}rated'),
+    ]
+
+
+# bayesian_score est sélectionné pour la pagination (?sort=-score) mais n'est pas émis.
+RESTAURANT_LITE = RecordShape(
+    'RestaurantRecord',
+    _restaurant_columns() + [('bayesian_score', Restaurant.bayesian_score)],
+    _restaurant_fields(),
+)
+
+REVIEW = RecordShape(
+    'ReviewRecord',
+    [
+        ('id', Review.id),
+        ('content', Review.content),
+        ('rating', Review.rating),
+        ('review_date', Review.review_date),
+        ('food_user_id', Review.food_user_id),
+        ('restaurant_id', Review.restaurant_id),
+        ('fu_id', FoodUser.id),
+        ('fu_username', FoodUser.username),
+        ('fu_email', FoodUser.email),
+    ] + _restaurant_columns('r_'),
+    # Clés et ordre de Review.to_dict()
+    [
+        Field('id', 'int'),
+        Field('content', 'str'),
+        Field('rating', 'float'),
+        Field('review_date', 'datetime'),
+        Field('food_user_id', 'int'),
+        Field('restaurant_id', 'int'),
+        Nested('food_user', [
+            Field('id', 'int', 'r.fu_id'),
+            Field('username', 'str', 'r.fu_username'),
+            Field('email', 'str', 'r.fu_email'),
+        ], present='r.fu_id is not None'),
+        Nested('restaurant', _restaurant_fields('r_'), present='r.r_id is not None'),
+    ],
+)
+
+
+def review_query():
+    """Critiques avec leur utilisateur et leur restaurant, en une seule requête."""
+    return (
+        REVIEW.select()
+        .select_from(Review)
+        .outerjoin(FoodUser, Review.food_user_id == FoodUser.id)
+        .outerjoin(Restaurant, Review.restaurant_id == Restaurant.id)
+    )
+
+
+NEARBY = RecordShape(
+    'NearbyRecord',
+    _restaurant_columns() + [('latitude', Restaurant.latitude), ('longitude', Restaurant.longitude)],
+    _restaurant_fields() + [
+        Field('latitude', 'float'),
+        Field('longitude', 'float'),
+        Field('distance_km', 'float', 'round(r.distance_km, 3)'),
+    ],
+    extra=('distance_km',),
+)
+
+
+def nearby_records(hits):
+    """Enregistrements des restaurants [(id, distance_km)], dans l'ordre des distances."""
+    if not hits:
+        return []
+    distances = dict(hits)
+    rows = NEARBY.select().filter(Restaurant.id.in_(distances)).all()
+    records = {row.id: NEARBY.record_class(*row, distance_km=distances[row.id]) for row in rows}
+    return [records[restaurant_id] for restaurant_id, _ in hits if restaurant_id in records]
+
+
+LEADERBOARD = RecordShape(
+    'LeaderboardRecord',
+    _restaurant_columns() + [('city', Restaurant.city), ('category', Restaurant.category)],
+    [
+        Field('rank', 'int'),
+        Field('score', 'float', 'round(r.score, 4)'),
+    ] + _restaurant_fields() + [
+        Field('city', 'str'),
+        Field('category', 'str'),
+    ],
+    extra=('rank', 'score'),
+)
+
+
+def leaderboard_records(ranking):
+    """Enregistrements des restaurants du classement [(rang, id, score)], dans l'ordre."""
+    if not ranking:
+        return []
+    rows = {row.id: row for row in LEADERBOARD.select().filter(Restaurant.id.in_([i for _, i, _ in ranking])).all()}
+    make = LEADERBOARD.record_class
+    return [make(*rows[i], rank=rank, score=score) for rank, i, score in ranking if i in rows]
+
+
+RECOMMENDATION = RecordShape(
+    'RecommendationRecord',
+    _restaurant_columns(),
+    [Field('score', 'float', 'round(r.score, 4)')] + _restaurant_fields(),
+    extra=('score',),
+)
+
+
+def recommendation_records(ranking):
+    """Enregistrements des restaurants recommandés [(id, score)], dans l'ordre."""
+    if not ranking:
+        return []
+    rows = {row.id: row for row in RECOMMENDATION.select().filter(Restaurant.id.in_([i for i, _ in ranking])).all()}
+    make = RECOMMENDATION.record_class
+    return [make(*rows[i], score=score) for i, score in ranking if i in rows]
+
+
+FAVORITED_BY = RecordShape(
+    'FavoritedByRecord',
+    [
+        ('id', Favorite.id),
+        ('created_at', Favorite.created_at),
+        ('food_user_id', FoodUser.id),
+        ('username', FoodUser.username),
+    ],
+    [
+        Field('food_user_id', 'int'),
+        Field('username', 'str'),
+        Field('favorited_at', 'datetime', 'r.created_at'),
+    ],
+)
+
+
+def favorited_by_query(restaurant_id):
+    """Utilisateurs ayant mis le restaurant en favori (index favorites(restaurant_id, created_at))."""
+    return (
+        FAVORITED_BY.select()
+        .select_from(Favorite)
+        .join(FoodUser, Favorite.food_user_id == FoodUser.id)
+        .filter(Favorite.restaurant_id == restaurant_id)
+    )
+
+
+MENU_TREE = RecordShape(
+    'MenuTreeRecord',
+    [
+        ('restaurant_id', Restaurant.id),
+        ('menu_id', Menu.id),
+        ('menu_name', Menu.name),
+        ('dish_id', Dish.id),
+        ('dish_name', Dish.name),
+        ('dish_description', Dish.description),
+        ('dish_price', Dish.price),
+    ],
+    # Clés et ordre de Dish.dish_lite_dict()
+    [
+        Field('id', 'int', 'r.dish_id'),
+        Field('name', 'str', 'r.dish_name'),
+        Field('description', 'str', 'r.dish_description'),
+        Field('price', 'float', 'r.dish_price'),
+    ],
+)
+
+
+def menu_tree_query(restaurant_id):
+    """
+    Menus du restaurant et leurs plats, en une seule requête. La jointure part
+    du restaurant : une ligne sans menu distingue "aucun menu" de "restaurant
+    inexistant" (aucune ligne).
+    """
+    return (
+        MENU_TREE.select()
+        .select_from(Restaurant)
+        .outerjoin(Menu, Menu.restaurant_id == Restaurant.id)
+        .outerjoin(MenuDish, MenuDish.menu_id == Menu.id)
+        .outerjoin(Dish, MenuDish.dish_id == Dish.id)
+        .filter(Restaurant.id == restaurant_id)
+        .order_by(Menu.id, MenuDish.id)
+    )
+
+
+def encode_menu_tree(restaurant_id, records):
+    """{"restaurant_id": ..., "menus": [{"id", "name", "dishes": [...]}]} en JSON compact."""
+    encode = MENU_TREE.encode
+    menus, dishes, last = [], None, None
+    for r in records:
+        if r.menu_id is None:
+            continue
+        if r.menu_id != last:
+            last, dishes = r.menu_id, []
+            menus.append((r, dishes))
+        if r.dish_id is not None:
+            dishes.append(encode(r))
+    body = ','.join([
+        '{"id":' + _int(m.menu_id) + ',"name":' + _str(m.menu_name) + ',"dishes":[' + ','.join(d) + ']}'
+        for m, d in menus
+    ])
+    return '{"restaurant_id":' + _int(restaurant_id) + ',"menus":[' + body + ']}'
+
+
+def menu_tree_response(restaurant_id):
+    """Réponse JSON de l'arbre des menus, ou None si le restaurant n'existe pas."""
+    records = MENU_TREE.records(menu_tree_query(restaurant_id).all())
+    if not records:
+        return None
+    with measure_serialization():
+        body = encode_menu_tree(restaurant_id, records)
+    return current_app.response_class(body, status=200, mimetype='application/json')
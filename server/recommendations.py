@@ -0,0 +1,473 @@
+# recommendations.py
+# Recommandations de restaurants par filtrage collaboratif "item-item"
+# (GET /food_users/<id>/recommendations).
+#
+# Chaque utilisateur est une ligne d'une matrice creuse utilisateurs x
+# restaurants : un favori vaut RECOMMENDATIONS_FAVORITE_WEIGHT, une critique
+# RECOMMENDATIONS_REVIEW_WEIGHT x (note - 2,5) / 2,5 (les notes de 2,5 étoiles
+# ou moins ne sont pas un signal d'intérêt). La similarité de deux restaurants
+# est le cosinus de leurs colonnes ; on garde en mémoire, pour chaque
+# restaurant, ses k plus proches voisins (RECOMMENDATIONS_NEIGHBORS). Une
+# recommandation additionne les similarités des voisins des restaurants de
+# l'utilisateur : quelques dizaines d'opérations sur des dicts, sans SQL.
+#
+# Le calcul s'appuie sur NumPy / SciPy (produits de matrices creuses, déclarés
+# dans le Pipfile et requirements.txt), sur des dicts Python s'ils manquent
+# (RECOMMENDATIONS_BACKEND = auto | numpy | python). Il est incrémental : les produits scalaires entre
+# colonnes (X^T X) sont conservés, et l'ancienne puis la nouvelle ligne de
+# chaque utilisateur modifié y sont retranchée et ajoutée ; seuls les voisins
+# des restaurants touchés sont recalculés. Un fil de fond applique ces mises à
+# jour toutes les RECOMMENDATIONS_REFRESH_INTERVAL secondes : utilisateurs
+# modifiés par ce processus (après commit) et nouvelles lignes de favorites /
+# reviews écrites par les autres. Les suppressions faites ailleurs sont
+# rattrapées par la reconstruction complète (RECOMMENDATIONS_REBUILD_INTERVAL).
+#
+# La première construction n'a pas lieu dans le fil d'une requête : serve.py
+# la fait avant le fork ; sinon, la première demande la lance dans un fil de
+# fond et reçoit 503 (RecommendationsLoading) jusqu'à ce qu'elle se termine.
+import heapq
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from config import db
+from favorite import Favorite
+from review import Review
+
+logger = logging.getLogger(__name__)
+
+# Taille des listes IN (...) lors du rechargement d'utilisateurs.
+_CHUNK = 500
+_EPSILON = 1e-9
+
+
+class RecommendationsLoading(Exception):
+    """Première construction de la matrice en cours : la requête doit être réessayée (503)."""
+
+
+def review_weight(rating):
+    """Intérêt exprimé par une critique : 0 jusqu'à 2,5 étoiles, 1 à 5 étoiles."""
+    if rating is None:
+        return 0.0
+    return max(rating - 2.5, 0.0) / 2.5
+
+
+def load_rows(connection, user_ids=None, favorite_weight=1.0, review_factor=1.0):
+    """Lignes {utilisateur: {restaurant: poids}} (toutes, ou celles de `user_ids`)."""
+    favorites = select(Favorite.food_user_id, Favorite.restaurant_id)
+    reviews = select(Review.food_user_id, Review.restaurant_id, func.max(Review.rating)).group_by(
+        Review.food_user_id, Review.restaurant_id
+    )
+    if user_ids is None:
+        batches = [(favorites, reviews)]
+    else:
+        user_ids = sorted(user_ids)
+        batches = [
+            (favorites.where(Favorite.food_user_id.in_(chunk)), reviews.where(Review.food_user_id.in_(chunk)))
+            for chunk in (user_ids[i:i + _CHUNK] for i in range(0, len(user_ids), _CHUNK))
+        ]
+
+    rows = defaultdict(dict)
+    for favorites_query, reviews_query in batches:
+        for user_id, restaurant_id in connection.execute(favorites_query):
+            row = rows[user_id]
+            row[restaurant_id] = row.get(restaurant_id, 0.0) + favorite_weight
+        for user_id, restaurant_id, rating in connection.execute(reviews_query):
+            weight = review_factor * review_weight(rating)
+            if weight > 0:
+                row = rows[user_id]
+                row[restaurant_id] = row.get(restaurant_id, 0.0) + weight
+    return {user_id: row for user_id, row in rows.items() if row}
+
+
+# ------------------ NOYAUX DE CALCUL ------------------
+# reset(lignes) / apply([(ancienne, nouvelle)]) renvoient les restaurants dont
+# les voisins sont à recalculer ; neighbors(restaurants, k) les calcule.
+
+class PythonKernel:
+    """Produits scalaires X^T X dans des dicts : {i: {j: <i, j>}}, <i, i> = norme au carré."""
+
+    name = 'python'
+
+    def __init__(self):
+        self.dots = defaultdict(dict)
+
+    def reset(self, user_rows):
+        self.dots = defaultdict(dict)
+        return self.apply([({}, row) for row in user_rows.values()])
+
+    def apply(self, changes):
+        dots = self.dots
+        touched = set()
+        for old, new in changes:
+            for row, sign in ((old, -1.0), (new, 1.0)):
+                items = list(row.items())
+                for i, wi in items:
+                    di = dots[i]
+                    for j, wj in items:
+                        di[j] = di.get(j, 0.0) + sign * wi * wj
+                touched.update(row)
+
+        affected = set(touched)
+        for i in touched:
+            di = dots[i]
+            for j in [j for j, value in di.items() if abs(value) < _EPSILON]:
+                del di[j]
+            if di:
+                # La norme de i a changé : toutes ses similarités aussi.
+                affected.update(di)
+            else:
+                del dots[i]
+        return affected
+
+    def neighbors(self, items, k):
+        dots = self.dots
+        result = {}
+        for i in items:
+            di = dots.get(i)
+            norm_i = di.get(i, 0.0) if di else 0.0
+            if norm_i <= 0:
+                result[i] = []
+                continue
+            candidates = []
+            for j, value in di.items():
+                if j == i or value <= 0:
+                    continue
+                norm_j = dots[j].get(j, 0.0)
+                if norm_j > 0:
+                    candidates.append((value / math.sqrt(norm_i * norm_j), j))
+            result[i] = [(j, similarity) for similarity, j in heapq.nlargest(k, candidates)]
+        return result
+
+
+class SparseKernel:
+    """Même calcul avec des matrices creuses SciPy (CSR) et des opérations NumPy vectorisées."""
+
+    name = 'numpy'
+
+    def __init__(self):
+        # Dépendances optionnelles : importées seulement si ce noyau est choisi.
+        import numpy
+        from scipy import sparse
+        self.np = numpy
+        self.sparse = sparse
+        self.index = {}   # id du restaurant -> colonne
+        self.ids = []     # colonne -> id du restaurant
+        self.dots = sparse.csr_matrix((0, 0))
+
+    def _register(self, rows):
+        for row in rows:
+            for item in row:
+                if item not in self.index:
+                    self.index[item] = len(self.ids)
+                    self.ids.append(item)
+
+    def _matrix(self, rows):
+        np = self.np
+        indptr, indices, data = [0], [], []
+        for row in rows:
+            for item, weight in row.items():
+                indices.append(self.index[item])
+                data.append(weight)
+            indptr.append(len(indices))
+        return self.sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int64),
+             np.asarray(indptr, dtype=np.int64)),
+            shape=(len(rows), len(self.ids)),
+        )
+
+    def reset(self, user_rows):
+        self.index, self.ids = {}, []
+        rows = list(user_rows.values())
+        self._register(rows)
+        matrix = self._matrix(rows)
+        self.dots = (matrix.T @ matrix).tocsr()
+        return set(self.ids)
+
+    def apply(self, changes):
+        np = self.np
+        olds = [old for old, _ in changes]
+        news = [new for _, new in changes]
+        self._register(olds + news)
+        size = len(self.ids)
+        if self.dots.shape != (size, size):
+            self.dots.resize((size, size))
+
+        old_matrix, new_matrix = self._matrix(olds), self._matrix(news)
+        dots = (self.dots + (new_matrix.T @ new_matrix) - (old_matrix.T @ old_matrix)).tocsr()
+        dots.data[np.abs(dots.data) < _EPSILON] = 0.0
+        dots.eliminate_zeros()
+        self.dots = dots
+
+        touched = sorted({self.index[item] for row in olds + news for item in row})
+        if not touched:
+            return set()
+        columns = np.union1d(np.asarray(touched), dots[touched].indices)
+        return {self.ids[column] for column in columns.tolist()}
+
+    def neighbors(self, items, k):
+        np = self.np
+        dots = self.dots
+        norms = dots.diagonal()
+        result = {}
+        for item in items:
+            column = self.index.get(item)
+            if column is None or norms[column] <= 0:
+                result[item] = []
+                continue
+            start, end = dots.indptr[column], dots.indptr[column + 1]
+            columns, values = dots.indices[start:end], dots.data[start:end]
+            keep = (columns != column) & (values > 0) & (norms[columns] > 0)
+            columns, values = columns[keep], values[keep]
+            similarities = values / np.sqrt(norms[column] * norms[columns])
+            if len(similarities) > k:
+                top = np.argpartition(-similarities, k)[:k]
+            else:
+                top = np.arange(len(similarities))
+            top = top[np.argsort(-similarities[top], kind='stable')]
+            result[item] = [(self.ids[columns[t]], float(similarities[t])) for t in top]
+        return result
+
+
+# ------------------ MOTEUR ------------------
+
+class Recommender:
+    def __init__(self):
+        self.backend = 'auto'
+        self.k = 50
+        self.refresh_interval = 30
+        self.rebuild_interval = 3600
+        self.favorite_weight = 1.0
+        self.review_factor = 1.0
+        self.kernel = None
+        self.stats = {}
+        self._app = None
+        self._users = {}
+        self._neighbors = {}
+        self._pending = set()
+        self._watermarks = (0, 0)
+        self._loaded = False
+        self._lock = threading.RLock()
+        self._thread = None
+        self._loader = None
+        self._loader_lock = threading.Lock()
+
+    def init_app(self, app):
+        config = app.config
+        self._app = app
+        self.backend = config.get('RECOMMENDATIONS_BACKEND', self.backend)
+        self.k = config.get('RECOMMENDATIONS_NEIGHBORS', self.k)
+        self.refresh_interval = config.get('RECOMMENDATIONS_REFRESH_INTERVAL', self.refresh_interval)
+        self.rebuild_interval = config.get('RECOMMENDATIONS_REBUILD_INTERVAL', self.rebuild_interval)
+        self.favorite_weight = config.get('RECOMMENDATIONS_FAVORITE_WEIGHT', self.favorite_weight)
+        self.review_factor = config.get('RECOMMENDATIONS_REVIEW_WEIGHT', self.review_factor)
+        app.cli.add_command(recommendations_cli)
+
+    def _make_kernel(self):
+        if self.backend in ('auto', 'numpy'):
+            try:
+                return SparseKernel()
+            except ImportError:
+                if self.backend == 'numpy':
+                    raise
+                logger.info("recommandations : NumPy / SciPy absents, calcul en Python")
+        return PythonKernel()
+
+    def _load_rows(self, connection, user_ids=None):
+        return load_rows(connection, user_ids, self.favorite_weight, self.review_factor)
+
+    @staticmethod
+    def _current_watermarks(connection):
+        return (
+            connection.execute(select(func.max(Favorite.id))).scalar() or 0,
+            connection.execute(select(func.max(Review.id))).scalar() or 0,
+        )
+
+    def load(self):
+        """Reconstruit toute la matrice et tous les voisins."""
+        started = time.perf_counter()
+        with db.engine.connect() as connection:
+            watermarks = self._current_watermarks(connection)
+            users = self._load_rows(connection)
+        kernel = self._make_kernel()
+        neighbors = kernel.neighbors(kernel.reset(users), self.k)
+        with self._lock:
+            # Les utilisateurs marqués pendant le calcul restent en attente : le
+            # prochain rafraîchissement compare leur ligne à celle chargée ici.
+            self.kernel, self._users, self._neighbors = kernel, users, neighbors
+            self._watermarks = watermarks
+            self._loaded = True
+        self.stats = {
+            'backend': kernel.name,
+            'users': len(users),
+            'restaurants': len(neighbors),
+            'build_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+        self.start_thread()
+        return self.stats
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+
+    def _load_in_background(self):
+        with self._loader_lock:
+            if self._loader is None or not self._loader.is_alive():
+                self._loader = threading.Thread(target=self._load_once, name='recommendations-load', daemon=True)
+                self._loader.start()
+
+    def _load_once(self):
+        try:
+            with self._app.app_context():
+                self.ensure_loaded()
+        except Exception:
+            # Nouvel essai à la prochaine demande.
+            logger.exception("recommandations : échec de la construction")
+
+    def mark(self, user_ids):
+        """Utilisateurs dont les favoris ou critiques ont changé (appliqué au prochain rafraîchissement)."""
+        with self._lock:
+            self._pending.update(user_ids)
+
+    def refresh(self):
+        """Applique les changements en attente ; renvoie le nombre d'utilisateurs modifiés."""
+        if not self._loaded:
+            return 0
+        with self._lock:
+            pending, self._pending = self._pending, set()
+            favorites_mark, reviews_mark = self._watermarks
+            with db.engine.connect() as connection:
+                # Nouvelles lignes écrites par les autres processus.
+                watermarks = self._current_watermarks(connection)
+                if watermarks[0] > favorites_mark:
+                    pending.update(connection.execute(
+                        select(Favorite.food_user_id).where(Favorite.id > favorites_mark).distinct()).scalars())
+                if watermarks[1] > reviews_mark:
+                    pending.update(connection.execute(
+                        select(Review.food_user_id).where(Review.id > reviews_mark).distinct()).scalars())
+                pending.discard(None)
+                fresh = self._load_rows(connection, pending) if pending else {}
+            self._watermarks = watermarks
+
+            changes = []
+            for user_id in pending:
+                old, new = self._users.get(user_id, {}), fresh.get(user_id, {})
+                if old != new:
+                    changes.append((old, new))
+                    if new:
+                        self._users[user_id] = new
+                    else:
+                        self._users.pop(user_id, None)
+            if changes:
+                affected = self.kernel.apply(changes)
+                self._neighbors.update(self.kernel.neighbors(affected, self.k))
+        return len(changes)
+
+    def recommend(self, user_id, limit):
+        """
+        [(restaurant, score)] pour l'utilisateur, ou None s'il n'a encore rien
+        noté ni aimé. Lève RecommendationsLoading tant que la première
+        construction, lancée en arrière-plan, n'est pas terminée.
+        """
+        if not self._loaded:
+            if self._app is not None and not self._app.config.get('BACKGROUND_THREADS', True):
+                self.ensure_loaded()  # tests et scripts : pas de fil de fond
+            else:
+                self._load_in_background()
+                raise RecommendationsLoading("Recommandations en cours de calcul, réessayez dans un instant")
+        row = self._users.get(user_id)
+        if not row:
+            return None
+        scores = defaultdict(float)
+        neighbors = self._neighbors
+        for item, weight in row.items():
+            for other, similarity in neighbors.get(item, ()):
+                if other not in row:
+                    scores[other] += weight * similarity
+        return heapq.nlargest(limit, scores.items(), key=lambda entry: (entry[1], -entry[0]))
+
+    def start_thread(self):
+        # Démarré au premier chargement, dans le processus qui sert les requêtes
+        # (serve.py le relance dans chaque worker après le fork).
+        if self._app is None or not self._app.config.get('BACKGROUND_THREADS', True):
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='recommendations', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        last_rebuild = time.monotonic()
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                with self._app.app_context():
+                    if self.rebuild_interval and time.monotonic() - last_rebuild >= self.rebuild_interval:
+                        self.load()
+                        last_rebuild = time.monotonic()
+                    else:
+                        self.refresh()
+            except Exception:
+                logger.exception("recommandations : échec du rafraîchissement")
+
+
+recommender = Recommender()
+
+
+# ------------------ SUIVI DES ÉCRITURES ------------------
+
+@event.listens_for(Session, 'after_flush')
+def _collect_users(session, flush_context):
+    pending = session.info.setdefault('recommendation_users', set())
+    for objects in (session.new, session.deleted, session.dirty):
+        for obj in objects:
+            if isinstance(obj, (Favorite, Review)):
+                history = inspect(obj).attrs.food_user_id.history
+                pending.update(history.deleted, history.unchanged, history.added, (obj.food_user_id,))
+    pending.discard(None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _mark_on_commit(session):
+    user_ids = session.info.pop('recommendation_users', None)
+    if user_ids and recommender._loaded:
+        recommender.mark(user_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('recommendation_users', None)
+
+
+recommendations_cli = AppGroup('recommendations', help="Recommandations par filtrage collaboratif.")
+
+
+@recommendations_cli.command('build')
+def build_command():
+    """Construit la matrice et les voisins (mesure du temps de calcul)."""
+    stats = recommender.load()
+    click.echo(f"Noyau {stats['backend']} : {stats['users']} utilisateurs, "
+               f"{stats['restaurants']} restaurants, {stats['build_ms']} ms.")
+
+
+@recommendations_cli.command('show')
+@click.argument('food_user_id', type=int)
+@click.option('--limit', default=10, show_default=True)
+def show_command(food_user_id, limit):
+    """Affiche les recommandations d'un utilisateur."""
+    recommender.ensure_loaded()
+    ranking = recommender.recommend(food_user_id, limit)
+    if ranking is None:
+        click.echo("Aucun favori ni critique positive : pas de recommandation personnalisée.")
+        return
+    for restaurant_id, score in ranking:
+        click.echo(f"{restaurant_id:>8}  {score:.4f}")
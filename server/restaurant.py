@@ -3,18 +3,48 @@ from sqlalchemy.ext.associationproxy import association_proxy
 
 # Assurez-vous que le fichier config.py est correctement importé
 from config import db 
+from profiling import serializer
 
 
 # REMOVED: SerializerMixin
 class Restaurant(db.Model):
     __tablename__ = 'restaurants'
 
+    # Index composites utilisés par la pagination keyset de GET /restaurants
+    # (tri par note ou par nom, départagé par l'id).
+    __table_args__ = (
+        db.Index('ix_restaurants_rating_id', 'rating', 'id'),
+        db.Index('ix_restaurants_name_id', 'name', 'id'),
+        # Recherche par boîte englobante hors SQLite (sous SQLite : R*Tree, voir geo.py).
+        db.Index('ix_restaurants_latitude_longitude', 'latitude', 'longitude'),
+        # Tri par score bayésien (GET /restaurants?sort=-score).
+        db.Index('ix_restaurants_bayesian_score_id', 'bayesian_score', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
     rating = db.Column(db.Float)
     image_url = db.Column(db.String)
     phone_number = db.Column(db.String)
     address = db.Column(db.String)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    city = db.Column(db.String)
+    category = db.Column(db.String)
+
+    # Agrégats des critiques, maintenus de façon incrémentale par aggregates.py
+    # dans la même transaction que l'écriture de la critique.
+    review_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_sum = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    star_1_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    star_2_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    star_3_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    star_4_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    star_5_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Nombre de favoris, maintenu de la même façon.
+    favorite_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Score du classement (moyenne bayésienne), écrit périodiquement par leaderboard.py.
+    bayesian_score = db.Column(db.Float)
 
     # Relationships
     reviews = db.relationship('Review', back_populates='restaurant', cascade='all, delete-orphan')
@@ -27,8 +57,30 @@ class Restaurant(db.Model):
     def __repr__(self):
         return f"<Restaurant {self.id}: {self.name}>"
 
+    # ------------------ AGRÉGATS DES CRITIQUES ------------------
+
+    @property
+    def star_histogram(self):
+        """Nombre de critiques par nombre d'étoiles (clés "1" à "5")."""
+        return {
+            "1": self.star_1_count or 0,
+            "2": self.star_2_count or 0,
+            "3": self.star_3_count or 0,
+            "4": self.star_4_count or 0,
+            "5": self.star_5_count or 0,
+        }
+
+    @property
+    def average_rating(self):
+        """Moyenne des notes des critiques (les critiques sans note sont ignorées)."""
+        rated = sum(self.star_histogram.values())
+        if not rated:
+            return None
+        return round(self.rating_sum / rated, 2)
+
     # ------------------ SERIALIZATION MANUELLE (LÉGÈRE) ------------------
 
+    @serializer
     def restaurant_lite_dict(self):
         """
         Version légère de la sérialisation, utilisée pour l'inclusion 
@@ -40,19 +92,28 @@ class Restaurant(db.Model):
             "rating": self.rating,
             "image_url": self.image_url,
             "phone_number": self.phone_number,
-            "address": self.address
+            "address": self.address,
+            "review_count": self.review_count or 0,
+            "average_rating": self.average_rating,
         }
 
     # ------------------ SERIALIZATION MANUELLE (COMPLÈTE) ------------------
 
+    @serializer
     def to_dict(self):
         """
         Sérialisation complète du restaurant, incluant les relations.
-        Note: Les objets liés (reviews, menus, favorites) utilisent 
+        Note: Les objets liés (reviews, menus) utilisent 
         leur propre méthode to_dict() pour sérialiser leur contenu.
         """
         # Commence par les attributs de base
         data = self.restaurant_lite_dict()
+        data["star_histogram"] = self.star_histogram
+        data["latitude"] = self.latitude
+        data["longitude"] = self.longitude
+        data["city"] = self.city
+        data["category"] = self.category
+        data["bayesian_score"] = self.bayesian_score
         
         # Inclusion des collections : Utilise la méthode to_dict() de chaque objet lié.
         # Vous devez vous assurer que Review.to_dict() et Favorite.to_dict() 
@@ -64,8 +125,9 @@ class Restaurant(db.Model):
         # Menus
         data["menus"] = [menu.to_dict() for menu in self.menus]
         
-        # Favorites (souvent on n'inclut que les ID ou un compte, mais ici on inclut la relation complète)
-        data["favorites"] = [favorite.to_dict() for favorite in self.favorites]
+        # Favorites : seulement le compteur ; la liste est paginée
+        # (GET /restaurants/<id>/favorited_by).
+        data["favorite_count"] = self.favorite_count or 0
 
         return data
         
@@ -86,6 +148,15 @@ class Restaurant(db.Model):
             raise ValueError('La note doit être un nombre entre 0 et 5')
         return rating
 
+    @validates("latitude", "longitude")
+    def validate_coordinates(self, key, value):
+        if value is None:
+            return value # Restaurant non localisé
+        limit = 90 if key == "latitude" else 180
+        if not isinstance(value, (int, float)) or not -limit <= value <= limit:
+            raise ValueError(f"La {key} doit être un nombre entre -{limit} et {limit}")
+        return float(value)
+
     @validates("phone_number")
     def validate_phone_number(self, key, phone_number):
         if phone_number is None:
@@ -123,3 +194,8 @@ class Restaurant(db.Model):
             raise ValueError("L'URL de l'image doit être une adresse web valide (commencer par http:// ou https://)")
 
         return trimmed_url
+
+
+# Filtre ?name_prefix= de GET /restaurants (insensible à la casse) : plage sur
+# lower(name), l'index d'expression se déclare une fois la colonne définie.
+db.Index('ix_restaurants_name_lower', db.func.lower(Restaurant.name))
@@ -1,11 +1,18 @@
 # review.py
 from sqlalchemy.orm import validates
 from config import db
+from profiling import serializer
 from datetime import datetime 
 
 class Review(db.Model):
     __tablename__ = 'reviews'
 
+    # Index des clés étrangères (filtres ?restaurant_id= et chargements des relations).
+    __table_args__ = (
+        db.Index('ix_reviews_restaurant_id', 'restaurant_id'),
+        db.Index('ix_reviews_food_user_id', 'food_user_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.String, nullable=False)
     rating = db.Column(db.Float)
@@ -21,6 +28,7 @@ class Review(db.Model):
         return f"<Review {self.id}: {self.content[:20]}... ({self.rating}/5)>"
 
     # ------------------ SERIALIZATION MANUELLE ------------------
+    @serializer
     def to_dict(self):
         """
         Sérialise la critique, en utilisant les versions 'lite' des objets liés 
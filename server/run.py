@@ -1,7 +1,9 @@
 # run.py
+# Serveur de développement (un processus, mode debug). En production : serve.py.
 
 # Importe l'objet 'app' de votre fichier principal (où les ressources sont définies)
 from app import app, db
+from database import SchemaOutdated, check_schema, startup_report
 
 # Il est crucial d'importer tous les modèles ici 
 # pour que SQLAlchemy puisse les reconnaître et créer les tables.
@@ -12,11 +14,13 @@ from dish import Dish
 from menu_dish import MenuDish
 from review import Review
 from favorite import Favorite
+from job import Job
 
 def create_tables():
     """
     Crée les tables de la base de données si elles n'existent pas.
     Doit être exécuté dans le contexte de l'application (app.app_context()).
+    Le schéma est normalement créé et mis à jour par `flask db upgrade`.
     """
     with app.app_context():
         # Cette ligne lit tous les modèles importés ci-dessus
@@ -26,14 +30,20 @@ def create_tables():
 
 
 if __name__ == '__main__':
-    # Création des tables avant de lancer le serveur (peut être retiré après la première fois)
-    create_tables()
+    # Vérification du schéma (lecture de la révision Alembic) au lieu d'un
+    # db.create_all() à chaque démarrage.
+    try:
+        check_schema(app)
+    except SchemaOutdated as e:
+        print(f"\nAttention : {e}")
     
     print("\n---------------------------------------------------------")
     print("API Food Review Démarrée !")
     print("Assurez-vous que .env contient une SECRET_KEY valide.")
-    print("---------------------------------------------------------\n")
+    print("---------------------------------------------------------")
+    for key, value in startup_report(app):
+        print(f"  {key:<16} {value}")
+    print()
     
     # Lancement de l'application Flask
     app.run(port=5000, debug=True)
-
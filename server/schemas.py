@@ -0,0 +1,263 @@
+# schemas.py
+# Schémas déclaratifs par modèle pour les champs clairsemés (sparse fieldsets)
+# et le contrôle de la profondeur d'inclusion des relations.
+#
+#   GET /restaurants?fields=id,name
+#   GET /restaurants/3?include=reviews.food_user&fields[reviews]=rating,content&fields[reviews.food_user]=username
+#
+# `fields` liste les colonnes de la ressource racine, `fields[<chemin>]` celles
+# d'une relation incluse et `include` les relations à imbriquer (chemins
+# séparés par des points, MAX_INCLUDE_DEPTH niveaux au plus). Seules les
+# colonnes et relations demandées sont chargées (load_only, selectinload,
+# joinedload) puis sérialisées. Sans ces paramètres, les endpoints conservent
+# leur sérialisation to_dict() habituelle.
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+from restaurant import Restaurant
+from food_user import FoodUser
+from menu import Menu
+from dish import Dish
+from menu_dish import MenuDish
+from review import Review
+from favorite import Favorite
+from profiling import serializer
+
+MAX_INCLUDE_DEPTH = 3
+
+
+class SchemaError(ValueError):
+    """Paramètre fields / include invalide."""
+
+
+class Relation:
+    """
+    Relation exposée par un schéma. `through` décrit une association traversée
+    (ex. Menu.dishes passe par menu_dishes puis dish).
+    """
+
+    def __init__(self, schema, attr, many, through=None):
+        self.schema = schema
+        self.attr = attr
+        self.many = many
+        self.through = through
+
+
+class Schema:
+    def __init__(self, model, fields, computed=None, relations=None):
+        self.model = model
+        self.fields = tuple(fields)
+        # champ calculé -> colonnes nécessaires à son calcul
+        self.computed = computed or {}
+        self.relations = relations or {}
+
+    @property
+    def all_fields(self):
+        return self.fields + tuple(self.computed)
+
+    def relation(self, name):
+        if name not in self.relations:
+            raise SchemaError(
+                f"Relation inconnue '{name}' pour {self.model.__name__} "
+                f"(valeurs possibles : {', '.join(self.relations) or 'aucune'})"
+            )
+        return self.relations[name]
+
+    def child(self, name):
+        return SCHEMAS[self.relation(name).schema]
+
+    def check_fields(self, fields, path):
+        unknown = [f for f in fields if f not in self.all_fields]
+        if unknown:
+            where = f" (fields[{path}])" if path else ""
+            raise SchemaError(
+                f"Champ(s) inconnu(s) {', '.join(unknown)}{where} ; "
+                f"valeurs possibles : {', '.join(self.all_fields)}"
+            )
+
+    def columns_for(self, fields, includes):
+        """Colonnes à charger : champs demandés, dépendances calculées, clés primaires et étrangères."""
+        mapper = inspect(self.model)
+        columns = {key.key for key in mapper.primary_key}
+        for field in fields:
+            columns.update(self.computed.get(field, (field,)))
+        for name in includes:
+            relation = self.relation(name)
+            attr = relation.through[0] if relation.through else relation.attr
+            columns.update(c.key for c in mapper.relationships[attr].local_columns)
+        return [getattr(self.model, c) for c in sorted(columns)]
+
+
+def serializer_for(schema_name, args, default_options, default_serialize, extra_columns=()):
+    """
+    Renvoie (options de chargement, fonction de sérialisation) : la sélection
+    demandée par `fields` / `include` si présente, sinon le comportement par défaut.
+    """
+    selection = FieldSelection.from_args(schema_name, args)
+    if selection is None:
+        return tuple(default_options), default_serialize
+    return tuple(selection.options(extra_columns)), selection.serialize
+
+
+def _value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+SCHEMAS = {
+    'restaurant': Schema(
+        Restaurant,
+        ('id', 'name', 'rating', 'image_url', 'phone_number', 'address', 'review_count', 'favorite_count',
+         'latitude', 'longitude', 'city', 'category', 'bayesian_score'),
+        computed={
+            'average_rating': ('rating_sum', 'star_1_count', 'star_2_count', 'star_3_count', 'star_4_count', 'star_5_count'),
+            'star_histogram': ('star_1_count', 'star_2_count', 'star_3_count', 'star_4_count', 'star_5_count'),
+        },
+        relations={
+            'reviews': Relation('review', 'reviews', many=True),
+            'menus': Relation('menu', 'menus', many=True),
+            'favorites': Relation('favorite', 'favorites', many=True),
+        },
+    ),
+    'review': Schema(
+        Review,
+        ('id', 'content', 'rating', 'review_date', 'food_user_id', 'restaurant_id'),
+        relations={
+            'food_user': Relation('food_user', 'food_user', many=False),
+            'restaurant': Relation('restaurant', 'restaurant', many=False),
+        },
+    ),
+    'menu': Schema(
+        Menu,
+        ('id', 'name', 'restaurant_id'),
+        relations={
+            'restaurant': Relation('restaurant', 'restaurant', many=False),
+            'dishes': Relation('dish', 'dishes', many=True, through=('menu_dishes', 'dish')),
+            'menu_dishes': Relation('menu_dish', 'menu_dishes', many=True),
+        },
+    ),
+    'dish': Schema(
+        Dish,
+        ('id', 'name', 'description', 'price'),
+        relations={
+            'menu_dishes': Relation('menu_dish', 'menu_dishes', many=True),
+        },
+    ),
+    'menu_dish': Schema(
+        MenuDish,
+        ('id', 'dish_id', 'menu_id'),
+        relations={
+            'dish': Relation('dish', 'dish', many=False),
+            'menu': Relation('menu', 'menu', many=False),
+        },
+    ),
+    'favorite': Schema(
+        Favorite,
+        ('id', 'food_user_id', 'restaurant_id', 'created_at', 'updated_at'),
+        relations={
+            'restaurant': Relation('restaurant', 'restaurant', many=False),
+            'food_user': Relation('food_user', 'food_user', many=False),
+        },
+    ),
+    'food_user': Schema(
+        FoodUser,
+        # _password_hash n'est jamais exposé.
+        ('id', 'username', 'email', 'google_id', 'created_at', 'updated_at'),
+        relations={
+            'reviews': Relation('review', 'reviews', many=True),
+            'favorites': Relation('favorite', 'favorites', many=True),
+            'restaurants': Relation('restaurant', 'restaurants', many=True, through=('favorites', 'restaurant')),
+        },
+    ),
+}
+
+
+class FieldSelection:
+    """
+    Sélection analysée depuis la requête : un arbre d'inclusions et, pour
+    chaque nœud, la liste des champs à sérialiser.
+    """
+
+    def __init__(self, schema, fields, includes):
+        self.schema = schema
+        self.fields = fields
+        self.includes = includes  # nom -> FieldSelection
+
+    @classmethod
+    def from_args(cls, schema_name, args):
+        """Renvoie None si la requête ne demande ni `fields` ni `include`."""
+        field_args = {key: value for key, value in args.items() if key == 'fields' or key.startswith('fields[')}
+        if not field_args and not args.get('include'):
+            return None
+
+        schema = SCHEMAS[schema_name]
+        tree, included = {}, {''}
+        for path in filter(None, (p.strip() for p in args.get('include', '').split(','))):
+            parts = path.split('.')
+            if len(parts) > MAX_INCLUDE_DEPTH:
+                raise SchemaError(f"Inclusion trop profonde '{path}' (maximum {MAX_INCLUDE_DEPTH} niveaux)")
+            node, current = tree, schema
+            for part in parts:
+                current.relation(part)
+                node = node.setdefault(part, {})
+                current = current.child(part)
+            included.update('.'.join(parts[:i]) for i in range(1, len(parts) + 1))
+
+        requested = {}
+        for key, value in field_args.items():
+            path = '' if key == 'fields' else key[len('fields['):-1]
+            if path not in included:
+                raise SchemaError(f"fields[{path}] fait référence à une relation non incluse (voir 'include')")
+            requested[path] = [f.strip() for f in value.split(',') if f.strip()]
+        return cls._build(schema, tree, requested, '')
+
+    @classmethod
+    def _build(cls, schema, tree, requested, path):
+        fields = requested.get(path)
+        if fields is None:
+            fields = list(schema.all_fields)
+        schema.check_fields(fields, path)
+        includes = {
+            name: cls._build(schema.child(name), subtree, requested, f'{path}.{name}' if path else name)
+            for name, subtree in tree.items()
+        }
+        return cls(schema, fields, includes)
+
+    # ------------------ CHARGEMENT ------------------
+
+    def options(self, extra_columns=()):
+        """
+        Options de requête chargeant exactement les colonnes et relations demandées
+        (plus `extra_columns`, ex. la colonne de tri utilisée par la pagination).
+        """
+        columns = self.schema.columns_for(self.fields, self.includes) + list(extra_columns)
+        return [load_only(*columns)] + self._relation_options()
+
+    def _relation_options(self):
+        options = []
+        model = self.schema.model
+        for name, child in self.includes.items():
+            relation = self.schema.relation(name)
+            child_columns = child.schema.columns_for(child.fields, child.includes)
+            if relation.through:
+                link_attr, target_attr = relation.through
+                link_model = inspect(model).relationships[link_attr].mapper.class_
+                loader = selectinload(getattr(model, link_attr)).joinedload(getattr(link_model, target_attr))
+            elif relation.many:
+                loader = selectinload(getattr(model, relation.attr))
+            else:
+                loader = joinedload(getattr(model, relation.attr))
+            options.append(loader.load_only(*child_columns).options(*child._relation_options()))
+        return options
+
+    # ------------------ SÉRIALISATION ------------------
+
+    @serializer
+    def serialize(self, obj):
+        data = {field: _value(getattr(obj, field)) for field in self.fields}
+        for name, child in self.includes.items():
+            related = getattr(obj, self.schema.relation(name).attr)
+            if self.schema.relation(name).many:
+                data[name] = [child.serialize(item) for item in related]
+            else:
+                data[name] = child.serialize(related) if related is not None else None
+        return data
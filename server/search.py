@@ -0,0 +1,195 @@
+# search.py
+# Recherche plein texte côté serveur sur les restaurants (name, address) et les
+# plats (name, description) à l'aide de tables virtuelles SQLite FTS5.
+#
+# Les tables *_fts sont des index "external content" : elles ne stockent que
+# l'index inversé et relisent le texte dans les tables d'origine. Des triggers
+# SQL les tiennent à jour à chaque INSERT / UPDATE / DELETE, y compris pour les
+# écritures faites hors de l'ORM (seed, migrations, sqlite3).
+# Les résultats sont classés par bm25 (le nom pèse plus lourd que le reste).
+#
+# Chaque écriture ajoute de petits segments à l'index : après des écritures sur
+# les colonnes indexées, une tâche de fond 'search.optimize' (dédupliquée,
+# différée de SEARCH_OPTIMIZE_DELAY secondes) les fusionne.
+#
+# Sur un autre moteur que SQLite, la recherche retombe sur des ILIKE.
+import re
+
+import click
+from flask import current_app, has_app_context
+from flask.cli import AppGroup
+from sqlalchemy import and_, event, inspect, or_, text
+from sqlalchemy.orm import Session
+
+from config import db
+from jobs import job_queue
+from restaurant import Restaurant
+from dish import Dish
+
+# table indexée -> (table FTS, colonnes indexées, poids bm25 par colonne)
+FTS_INDEXES = {
+    'restaurants': ('restaurants_fts', ('name', 'address'), (10.0, 1.0)),
+    'dishes': ('dishes_fts', ('name', 'description'), (10.0, 2.0)),
+}
+
+SEARCHABLE_MODELS = {
+    'restaurants': Restaurant,
+    'dishes': Dish,
+}
+
+OPTIMIZE_DELAY = 600
+
+
+class SearchError(ValueError):
+    """Requête de recherche invalide."""
+
+
+def _fts_ddl(table, fts_table, columns):
+    cols = ', '.join(columns)
+    new_cols = ', '.join(f'new.{c}' for c in columns)
+    old_cols = ', '.join(f'old.{c}' for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+        f"{cols}, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END",
+        # Seules les colonnes indexées déclenchent la mise à jour (pas les compteurs).
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+        f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+    ]
+
+
+def install_search_index(connection):
+    """Crée les tables FTS5 et leurs triggers (idempotent) puis reconstruit l'index."""
+    if connection.dialect.name != 'sqlite':
+        return
+    for table, (fts_table, columns, _) in FTS_INDEXES.items():
+        for statement in _fts_ddl(table, fts_table, columns):
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+
+
+def drop_search_index(connection):
+    if connection.dialect.name != 'sqlite':
+        return
+    for fts_table, _, _ in FTS_INDEXES.values():
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {fts_table}")
+
+
+# db.create_all() / db.drop_all() (run.py, seed.py) gèrent aussi l'index.
+@event.listens_for(db.metadata, 'after_create')
+def _after_create(target, connection, **kw):
+    install_search_index(connection)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _before_drop(target, connection, **kw):
+    drop_search_index(connection)
+
+
+def optimize_search_index(connection):
+    """Fusionne les segments des index FTS5 (commande 'optimize')."""
+    if connection.dialect.name != 'sqlite':
+        return
+    for fts_table, _, _ in FTS_INDEXES.values():
+        connection.exec_driver_sql(f"INSERT INTO {fts_table}({fts_table}) VALUES ('optimize')")
+
+
+@job_queue.handler('search.optimize')
+def optimize_job():
+    with db.engine.begin() as connection:
+        optimize_search_index(connection)
+
+
+@job_queue.handler('search.rebuild')
+def rebuild_job():
+    with db.engine.begin() as connection:
+        install_search_index(connection)
+
+
+def _indexed_change(session):
+    for obj in session.new | session.deleted:
+        if isinstance(obj, (Restaurant, Dish)):
+            return True
+    for obj in session.dirty:
+        if isinstance(obj, (Restaurant, Dish)):
+            _, columns, _ = FTS_INDEXES[obj.__tablename__]
+            state = inspect(obj)
+            if any(state.attrs[column].history.has_changes() for column in columns):
+                return True
+    return False
+
+
+@event.listens_for(Session, 'after_flush')
+def _schedule_optimize(session, flush_context):
+    # Les triggers ont déjà mis l'index à jour ; seule la fusion est différée.
+    if _indexed_change(session) and session.get_bind().dialect.name == 'sqlite':
+        delay = current_app.config.get('SEARCH_OPTIMIZE_DELAY', OPTIMIZE_DELAY) if has_app_context() else OPTIMIZE_DELAY
+        job_queue.enqueue('search.optimize', key='search.optimize', delay=delay, session=session)
+
+
+def fts_query(raw):
+    """
+    Transforme la saisie utilisateur en requête FTS5 sûre : chaque mot devient
+    un terme entre guillemets en recherche par préfixe, tous les mots sont requis.
+    """
+    tokens = re.findall(r'\w+', raw or '')
+    if not tokens:
+        raise SearchError("Le paramètre 'q' doit contenir au moins un mot")
+    return ' '.join(f'"{token}"*' for token in tokens), tokens
+
+
+def search(kind, raw_query, limit, offset=0):
+    """
+    Recherche dans les restaurants ou les plats.
+    Renvoie (objets classés par pertinence, il_existe_une_suite).
+    """
+    if kind not in SEARCHABLE_MODELS:
+        raise SearchError(f"Type de recherche inconnu '{kind}' (valeurs possibles : {', '.join(SEARCHABLE_MODELS)})")
+    model = SEARCHABLE_MODELS[kind]
+    match, tokens = fts_query(raw_query)
+
+    if db.session.get_bind().dialect.name == 'sqlite':
+        fts_table, _, weights = FTS_INDEXES[kind]
+        ids = db.session.execute(
+            text(
+                f"SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH :match "
+                f"ORDER BY bm25({fts_table}, {', '.join(map(str, weights))}) LIMIT :limit OFFSET :offset"
+            ),
+            {'match': match, 'limit': limit + 1, 'offset': offset},
+        ).scalars().all()
+        has_more = len(ids) > limit
+        ids = ids[:limit]
+        by_id = {obj.id: obj for obj in model.query.filter(model.id.in_(ids)).all()} if ids else {}
+        return [by_id[i] for i in ids if i in by_id], has_more
+
+    # Repli sans FTS5 : chaque mot doit apparaître dans l'une des colonnes indexées.
+    _, columns, _ = FTS_INDEXES[kind]
+    conditions = [
+        or_(*[getattr(model, column).ilike(f'%{token}%') for column in columns])
+        for token in tokens
+    ]
+    rows = (
+        model.query.filter(and_(*conditions))
+        .order_by(model.name, model.id)
+        .limit(limit + 1).offset(offset).all()
+    )
+    return rows[:limit], len(rows) > limit
+
+
+search_cli = AppGroup('search', help="Index de recherche plein texte.")
+
+
+@search_cli.command('rebuild')
+def rebuild_command():
+    """Recrée les tables FTS5 et leurs triggers, puis réindexe tout."""
+    with db.engine.begin() as connection:
+        install_search_index(connection)
+    click.echo("Index de recherche reconstruit.")
+
+
+def init_app(app):
+    app.cli.add_command(search_cli)
@@ -1,14 +1,14 @@
 # Standard library imports
-import requests
-from flask import Flask
-from faker import Faker
-from random import randint, choice, sample
-from datetime import datetime
+from sqlalchemy import text
+from random import Random, randint, choice, sample
+from datetime import datetime, timedelta
+import argparse
 import os 
-from dotenv import load_dotenv # Ajouté pour une bonne pratique de configuration
+import time
 
 # Local imports
-from config import db
+from config import db, make_app
+from database import stamp_head
 from restaurant import Restaurant
 from menu import Menu
 from dish import Dish
@@ -16,22 +16,108 @@ from menu_dish import MenuDish
 from food_user import FoodUser
 from review import Review
 from favorite import Favorite # ESSENTIEL : Importation du modèle Favorite
-
-# Load environment variables (si nécessaire pour la clé secrète dans config.py)
-load_dotenv() 
-
-app = Flask(__name__)
-# Utilisation de os.getenv pour la cohérence avec config.py
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///app.db') 
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.json.compact = False
-db.init_app(app)
+from hashing import password_hasher
+from aggregates import rebuild_favorite_counts, rebuild_review_aggregates
+from leaderboard import rebuild_scores
+import search # Enregistre la création de l'index plein texte lors de db.create_all()
+import geo # Idem pour l'index géographique (R*Tree)
 
 # NOTE: La clé API ne devrait pas être dans le code source, mais dans .env.
 # Pour le moment, nous laissons la clé ici, mais il est préférable d'utiliser os.environ.get('YELP_API_KEY')
 YELP_API_KEY = "nS0hSkt6MykfzvtTOX0nD8MexHqE5NYlAlaZUj6_r9_Uz6E-XTAypJc_N10lkzWj1wb2ZJ3QTsQH-x1u8SYFpxvzwpKGo2H01US8j-s-7_Bg_Y-OdhmyHWKKLAVzZXYx"  # Remplacez par votre clé réelle
 
+# Sample Korean dishes
+SAMPLE_DISHES = [
+    # La liste des plats est laissée telle quelle pour la brièveté du fichier
+    {"name": "Bibimbap", "description": "Mixed rice with vegetables", "price": 12.99},
+    {"name": "Kimchi Jjigae", "description": "Kimchi stew with tofu", "price": 13.99},
+    {"name": "Bulgogi", "description": "Marinated beef BBQ", "price": 15.99},
+    {"name": "Japchae", "description": "Stir-fried sweet potato noodles", "price": 14.99},
+    {"name": "Tteokbokki", "description": "Spicy rice cakes", "price": 10.99},
+    {"name": "Galbi", "description": "Grilled short ribs", "price": 16.99},
+    {"name": "Sundubu-jjigae", "description": "Soft tofu stew", "price": 12.99},
+    {"name": "Samgyeopsal", "description": "Grilled pork belly", "price": 14.99},
+    {"name": "Haemul Pajeon", "description": "Seafood pancake", "price": 13.99},
+    {"name": "Gimbap", "description": "Korean sushi rolls", "price": 9.99},
+    {"name": "Dakgangjeong", "description": "Crispy fried chicken", "price": 11.99},
+    {"name": "Mandu", "description": "Korean dumplings", "price": 10.99},
+    {"name": "Naengmyeon", "description": "Cold buckwheat noodles", "price": 12.99},
+    {"name": "Banchan", "description": "Small side dishes", "price": 5.99},
+    {"name": "Bossam", "description": "Boiled pork wrap", "price": 15.99},
+    {"name": "Jjajangmyeon", "description": "Black bean sauce noodles", "price": 13.99},
+    {"name": "Soondae", "description": "Korean blood sausage", "price": 14.99},
+    {"name": "Yukgaejang", "description": "Spicy beef soup", "price": 14.99},
+    {"name": "Hobakjeon", "description": "Zucchini fritters", "price": 9.99},
+    {"name": "Gamjatang", "description": "Pork bone soup", "price": 13.99},
+    {"name": "Gujeolpan", "description": "Nine-sectioned plate with vegetables and meats", "price": 20.99},
+    {"name": "Sinseollo", "description": "Meat and vegetables in rich broth", "price": 22.99},
+    {"name": "Bulgogi", "description": "Thinly sliced beef marinated in soy sauce", "price": 15.99},
+    {"name": "Dak galbi", "description": "Stir-fried marinated diced chicken in gochujang", "price": 14.99},
+    {"name": "Samgyeopsal", "description": "Unseasoned grilled pork belly", "price": 14.99},
+    {"name": "Makchang gui", "description": "Grilled pork large intestines", "price": 16.99},
+    {"name": "Gobchang gui", "description": "Grilled small intestines of pork or ox", "price": 16.99},
+    {"name": "Saengseon gui", "description": "Grilled fish", "price": 17.99},
+    {"name": "Seokhwa gui", "description": "Grilled shellfish", "price": 18.99},
+    {"name": "Deodeok gui", "description": "Grilled deodeok roots", "price": 15.99},
+    {"name": "Beoseot gui", "description": "Grilled mushrooms", "price": 13.99},
+    {"name": "Gim gui", "description": "Grilled dry laver", "price": 10.99},
+    {"name": "Galbijjim", "description": "Braised marinated beef short rib with vegetables", "price": 18.99},
+    {"name": "Andong jjimdak", "description": "Steamed chicken with vegetables and noodles", "price": 17.99},
+    {"name": "Agujjim", "description": "Braised angler and vegetables", "price": 19.99},
+    {"name": "Jeonbokjjim", "description": "Abalone marinated in soy sauce and rice wine", "price": 22.99},
+    {"name": "Gyeran jjim", "description": "Steamed egg custard", "price": 9.99},
+    {"name": "Oiseon", "description": "Steamed cucumber with beef and mushrooms", "price": 12.99},
+    {"name": "Hobakjeon", "description": "Pan-fried Korean zucchini", "price": 11.99},
+    {"name": "Dubujeon", "description": "Steamed tofu mixed with ground beef and vegetables", "price": 10.99},
+    {"name": "Sannakji", "description": "Live octopus", "price": 23.99},
+    {"name": "Yukhoe", "description": "Similar to beef tartare", "price": 18.99},
+    {"name": "Sukhoe", "description": "Parboiled fish or squid", "price": 16.99},
+    {"name": "Ganghoe", "description": "Rolls of scallions, carrots, and eggs", "price": 11.99},
+    {"name": "Bossam", "description": "Steamed pork wrapped in a leaf vegetable", "price": 15.99},
+    {"name": "Bbolsal", "description": "Pork cheeks marinated in salt and sesame oil", "price": 16.99},
+    {"name": "Yukgaejang", "description": "Spicy soup with shredded beef", "price": 13.99},
+    {"name": "Hoe", "description": "Raw seafood dish with gochujang or soy sauce", "price": 17.99},
+    {"name": "Namul", "description": "Seasoned vegetables", "price": 9.99},
+    {"name": "Saengchae", "description": "Shredded fresh vegetables with seasonings", "price": 10.99},
+    {"name": "Oisaengchae", "description": "Cucumber dressed in pepper powder and seasonings", "price": 9.99},
+    {"name": "Sukchae", "description": "Cooked vegetables", "price": 8.99},
+    {"name": "Kongnamul", "description": "Soybean sprouts used in various dishes", "price": 7.99},
+    {"name": "Japchae", "description": "Vermicelli noodles with stir-fried vegetables and beef", "price": 14.99},
+    {"name": "Tteokguk", "description": "Rice cake soup", "price": 12.99},
+    {"name": "Haejangguk", "description": "Soup with pork spine and vegetables", "price": 13.99},
+    {"name": "Miyeok guk", "description": "Seaweed soup", "price": 11.99},
+    {"name": "Manduguk", "description": "Dumpling soup", "price": 10.99},
+    {"name": "Galbitang", "description": "Soup made from short rib", "price": 14.99},
+    {"name": "Oritang", "description": "Stew with duck and vegetables", "price": 17.99},
+    {"name": "Samgyetang", "description": "Soup with Cornish game hens and ginseng", "price": 18.99},
+    {"name": "Seolleongtang", "description": "Beef bone stock simmered overnight", "price": 14.99},
+    {"name": "Maeuntang", "description": "Hot and spicy fish soup", "price": 15.99},
+    {"name": "Gamjatang", "description": "Spicy soup with pork spine and vegetables", "price": 13.99},
+    {"name": "Daktoritang", "description": "Spicy chicken and potato stew", "price": 14.99},
+    {"name": "Chueotang", "description": "Ground Loach soup", "price": 12.99},
+    {"name": "Bosintang", "description": "Soup made primarily with dog meat", "price": 15.99},
+    {"name": "Doenjang jjigae", "description": "Soybean paste soup", "price": 11.99},
+    {"name": "Cheonggukjang jjigae", "description": "Soup made from thick soybean paste", "price": 10.99},
+    {"name": "Gochujang jjigae", "description": "Chili pepper paste soup", "price": 11.99}
+]
+
+
+def reset_schema():
+    """
+    Recrée toutes les tables à partir des modèles, puis marque la base à la
+    révision de tête : run.py / serve.py l'acceptent (check_schema) et un
+    `flask db upgrade` ultérieur ne rejoue pas les migrations déjà couvertes.
+    """
+    db.drop_all()
+    db.create_all()
+    with db.engine.begin() as connection:
+        stamp_head(connection)
+
+
 def get_yelp_data():
+    # requests n'est importé que pour les appels à Yelp (ni --synthetic, ni l'API).
+    import requests
+
     params = {
         'location': 'Seattle',
         'categories': 'korean',
@@ -63,12 +149,13 @@ def add_favorite(food_user_id, restaurant_id):
         db.session.rollback()
 
 def seed_database():
+    from faker import Faker
+
     fake = Faker()
     try:
         # Nettoyage de la base de données avant le seeding
         print("Nettoyage des tables existantes...")
-        db.drop_all()
-        db.create_all()
+        reset_schema()
 
         # Seed restaurants from Yelp data
         print("1. Ajout des restaurants à partir de l'API Yelp...")
@@ -78,13 +165,19 @@ def seed_database():
             # Tentative de gérer les adresses multiples
             address_list = data.get('location', {}).get('display_address', [])
             address = ", ".join(address_list) if address_list else "Adresse non spécifiée"
+            coordinates = data.get('coordinates') or {}
+            categories = data.get('categories') or [{}]
 
             restaurant = Restaurant(
                 name=data.get('name'), 
                 rating=data.get('rating'), 
                 image_url=data.get('image_url'), 
                 phone_number=data.get('phone'),
-                address=address # Ajout de l'adresse
+                address=address, # Ajout de l'adresse
+                latitude=coordinates.get('latitude'),
+                longitude=coordinates.get('longitude'),
+                city=data.get('location', {}).get('city'),
+                category=categories[0].get('title'),
             )
             db.session.add(restaurant)
             restaurants_list.append(restaurant)
@@ -92,89 +185,15 @@ def seed_database():
         db.session.commit()
         print(f"   -> {len(restaurants_list)} restaurants ajoutés.")
 
-        # Sample Korean dishes
-        sample_dishes = [
-            # La liste des plats est laissée telle quelle pour la brièveté du fichier
-            {"name": "Bibimbap", "description": "Mixed rice with vegetables", "price": 12.99},
-            {"name": "Kimchi Jjigae", "description": "Kimchi stew with tofu", "price": 13.99},
-            {"name": "Bulgogi", "description": "Marinated beef BBQ", "price": 15.99},
-            {"name": "Japchae", "description": "Stir-fried sweet potato noodles", "price": 14.99},
-            {"name": "Tteokbokki", "description": "Spicy rice cakes", "price": 10.99},
-            {"name": "Galbi", "description": "Grilled short ribs", "price": 16.99},
-            {"name": "Sundubu-jjigae", "description": "Soft tofu stew", "price": 12.99},
-            {"name": "Samgyeopsal", "description": "Grilled pork belly", "price": 14.99},
-            {"name": "Haemul Pajeon", "description": "Seafood pancake", "price": 13.99},
-            {"name": "Gimbap", "description": "Korean sushi rolls", "price": 9.99},
-            {"name": "Dakgangjeong", "description": "Crispy fried chicken", "price": 11.99},
-            {"name": "Mandu", "description": "Korean dumplings", "price": 10.99},
-            {"name": "Naengmyeon", "description": "Cold buckwheat noodles", "price": 12.99},
-            {"name": "Banchan", "description": "Small side dishes", "price": 5.99},
-            {"name": "Bossam", "description": "Boiled pork wrap", "price": 15.99},
-            {"name": "Jjajangmyeon", "description": "Black bean sauce noodles", "price": 13.99},
-            {"name": "Soondae", "description": "Korean blood sausage", "price": 14.99},
-            {"name": "Yukgaejang", "description": "Spicy beef soup", "price": 14.99},
-            {"name": "Hobakjeon", "description": "Zucchini fritters", "price": 9.99},
-            {"name": "Gamjatang", "description": "Pork bone soup", "price": 13.99},
-            {"name": "Gujeolpan", "description": "Nine-sectioned plate with vegetables and meats", "price": 20.99},
-            {"name": "Sinseollo", "description": "Meat and vegetables in rich broth", "price": 22.99},
-            {"name": "Bulgogi", "description": "Thinly sliced beef marinated in soy sauce", "price": 15.99},
-            {"name": "Dak galbi", "description": "Stir-fried marinated diced chicken in gochujang", "price": 14.99},
-            {"name": "Samgyeopsal", "description": "Unseasoned grilled pork belly", "price": 14.99},
-            {"name": "Makchang gui", "description": "Grilled pork large intestines", "price": 16.99},
-            {"name": "Gobchang gui", "description": "Grilled small intestines of pork or ox", "price": 16.99},
-            {"name": "Saengseon gui", "description": "Grilled fish", "price": 17.99},
-            {"name": "Seokhwa gui", "description": "Grilled shellfish", "price": 18.99},
-            {"name": "Deodeok gui", "description": "Grilled deodeok roots", "price": 15.99},
-            {"name": "Beoseot gui", "description": "Grilled mushrooms", "price": 13.99},
-            {"name": "Gim gui", "description": "Grilled dry laver", "price": 10.99},
-            {"name": "Galbijjim", "description": "Braised marinated beef short rib with vegetables", "price": 18.99},
-            {"name": "Andong jjimdak", "description": "Steamed chicken with vegetables and noodles", "price": 17.99},
-            {"name": "Agujjim", "description": "Braised angler and vegetables", "price": 19.99},
-            {"name": "Jeonbokjjim", "description": "Abalone marinated in soy sauce and rice wine", "price": 22.99},
-            {"name": "Gyeran jjim", "description": "Steamed egg custard", "price": 9.99},
-            {"name": "Oiseon", "description": "Steamed cucumber with beef and mushrooms", "price": 12.99},
-            {"name": "Hobakjeon", "description": "Pan-fried Korean zucchini", "price": 11.99},
-            {"name": "Dubujeon", "description": "Steamed tofu mixed with ground beef and vegetables", "price": 10.99},
-            {"name": "Sannakji", "description": "Live octopus", "price": 23.99},
-            {"name": "Yukhoe", "description": "Similar to beef tartare", "price": 18.99},
-            {"name": "Sukhoe", "description": "Parboiled fish or squid", "price": 16.99},
-            {"name": "Ganghoe", "description": "Rolls of scallions, carrots, and eggs", "price": 11.99},
-            {"name": "Bossam", "description": "Steamed pork wrapped in a leaf vegetable", "price": 15.99},
-            {"name": "Bbolsal", "description": "Pork cheeks marinated in salt and sesame oil", "price": 16.99},
-            {"name": "Yukgaejang", "description": "Spicy soup with shredded beef", "price": 13.99},
-            {"name": "Hoe", "description": "Raw seafood dish with gochujang or soy sauce", "price": 17.99},
-            {"name": "Namul", "description": "Seasoned vegetables", "price": 9.99},
-            {"name": "Saengchae", "description": "Shredded fresh vegetables with seasonings", "price": 10.99},
-            {"name": "Oisaengchae", "description": "Cucumber dressed in pepper powder and seasonings", "price": 9.99},
-            {"name": "Sukchae", "description": "Cooked vegetables", "price": 8.99},
-            {"name": "Kongnamul", "description": "Soybean sprouts used in various dishes", "price": 7.99},
-            {"name": "Japchae", "description": "Vermicelli noodles with stir-fried vegetables and beef", "price": 14.99},
-            {"name": "Tteokguk", "description": "Rice cake soup", "price": 12.99},
-            {"name": "Haejangguk", "description": "Soup with pork spine and vegetables", "price": 13.99},
-            {"name": "Miyeok guk", "description": "Seaweed soup", "price": 11.99},
-            {"name": "Manduguk", "description": "Dumpling soup", "price": 10.99},
-            {"name": "Galbitang", "description": "Soup made from short rib", "price": 14.99},
-            {"name": "Oritang", "description": "Stew with duck and vegetables", "price": 17.99},
-            {"name": "Samgyetang", "description": "Soup with Cornish game hens and ginseng", "price": 18.99},
-            {"name": "Seolleongtang", "description": "Beef bone stock simmered overnight", "price": 14.99},
-            {"name": "Maeuntang", "description": "Hot and spicy fish soup", "price": 15.99},
-            {"name": "Gamjatang", "description": "Spicy soup with pork spine and vegetables", "price": 13.99},
-            {"name": "Daktoritang", "description": "Spicy chicken and potato stew", "price": 14.99},
-            {"name": "Chueotang", "description": "Ground Loach soup", "price": 12.99},
-            {"name": "Bosintang", "description": "Soup made primarily with dog meat", "price": 15.99},
-            {"name": "Doenjang jjigae", "description": "Soybean paste soup", "price": 11.99},
-            {"name": "Cheonggukjang jjigae", "description": "Soup made from thick soybean paste", "price": 10.99},
-            {"name": "Gochujang jjigae", "description": "Chili pepper paste soup", "price": 11.99}
-        ]
 
 
         # Seed dishes
         print("2. Ajout des plats...")
-        for dish_data in sample_dishes:
+        for dish_data in SAMPLE_DISHES:
             dish = Dish(name=dish_data['name'], description=dish_data['description'], price=dish_data['price'])
             db.session.add(dish)
         db.session.commit()
-        print(f"   -> {len(sample_dishes)} plats ajoutés.")
+        print(f"   -> {len(SAMPLE_DISHES)} plats ajoutés.")
 
         # Create menus and assign dishes to restaurants
         print("3. Création des menus et liens MenuDish...")
@@ -254,14 +273,284 @@ def seed_database():
 
         db.session.commit()
         print(f"   -> {review_count} critiques ajoutées.")
+
+        # Les critiques sont insérées en masse : on recalcule les agrégats en une passe.
+        rebuild_review_aggregates()
+        rebuild_scores()
+        print("   -> Agrégats des critiques et classement recalculés.")
         
         print("Base de données remplie avec succès (Seeded successfully)!")
     except Exception as e:
         print(f"ERREUR lors du remplissage de la base de données : {e}")
         db.session.rollback()
 
-if __name__ == '__main__':
+def backfill_coordinates():
+    """
+    Renseigne latitude / longitude des restaurants existants qui n'en ont pas,
+    à partir des coordonnées Yelp (rapprochement par nom et téléphone).
+    L'index géographique est mis à jour par ses triggers.
+    """
+    by_key = {}
+    for data in get_yelp_data():
+        coordinates = data.get('coordinates') or {}
+        if coordinates.get('latitude') is not None and coordinates.get('longitude') is not None:
+            by_key[(data.get('name'), data.get('phone'))] = coordinates
+
+    updated = 0
+    for restaurant in Restaurant.query.filter(Restaurant.latitude.is_(None)).all():
+        coordinates = by_key.get((restaurant.name, restaurant.phone_number))
+        if coordinates:
+            restaurant.latitude = coordinates['latitude']
+            restaurant.longitude = coordinates['longitude']
+            updated += 1
+    db.session.commit()
+    print(f"   -> Coordonnées renseignées pour {updated} restaurants.")
+
+# ------------------ MODE SYNTHÉTIQUE (HORS LIGNE, EN MASSE) ------------------
+# Jeux de données de taille "production" pour les tests de charge, sans appel
+# à Yelp. Les lignes sont générées par un random.Random(seed) : une même
+# graine produit exactement la même base. Les insertions passent par le Core
+# SQLAlchemy (executemany) par paquets de `chunk_size` lignes, un commit par
+# paquet ; les agrégats des critiques sont recalculés en une passe à la fin.
+#
+#   DATABASE_PROFILE=bulk python seed.py --synthetic --restaurants 10000 --reviews 1000000
+#
+# Le mot de passe de tous les utilisateurs synthétiques est --password
+# ("password" par défaut) : Login est utilisable pendant les tirs de charge.
+
+MENU_NAMES = ["Lunch Menu", "Dinner Menu", "Brunch Menu", "Happy Hour", "Tasting Menu", "Kids Menu", "Late Night"]
+DISH_VARIANTS = ["", "Spicy ", "Classic ", "Royal ", "Vegan ", "Family ", "Mini ", "House "]
+CUISINES = ["Korean BBQ", "Kitchen", "Tofu House", "Noodle Bar", "Pocha", "Bistro", "Grill", "Eatery"]
+# Catégorie (au sens des catégories Yelp) de chaque type d'établissement.
+CATEGORY_BY_CUISINE = {
+    "Korean BBQ": "Barbeque", "Kitchen": "Korean", "Tofu House": "Korean", "Noodle Bar": "Noodles",
+    "Pocha": "Bars", "Bistro": "Korean", "Grill": "Barbeque", "Eatery": "Korean",
+}
+# Seattle est surreprésentée, comme dans les résultats Yelp.
+CITIES = ["Seattle", "Seattle", "Seattle", "Seattle", "Bellevue", "Redmond", "Kirkland", "Shoreline"]
+EPOCH = datetime(2023, 1, 1)
+# Restaurants répartis autour du centre de Seattle (environ 17 x 19 km).
+CITY_CENTER = (47.6062, -122.3321)
+CITY_SPREAD = (0.08, 0.125)
+TWO_YEARS = 2 * 365 * 24 * 3600
+
+
+class SyntheticCounts:
+    def __init__(self, restaurants=1000, dishes=500, menus_per_restaurant=2, dishes_per_menu=15,
+                 users=5000, reviews=100000, favorites=20000):
+        counts = {'restaurants': restaurants, 'dishes': dishes, 'menus_per_restaurant': menus_per_restaurant,
+                  'dishes_per_menu': dishes_per_menu, 'users': users, 'reviews': reviews, 'favorites': favorites}
+        negative = [name for name, value in counts.items() if value < 0]
+        if negative:
+            raise ValueError(f"Valeurs négatives : {', '.join(negative)}")
+        # Critiques et favoris désignent un restaurant et un utilisateur existants.
+        if (reviews or favorites) and not (restaurants and users):
+            raise ValueError("--reviews et --favorites exigent au moins un restaurant et un utilisateur")
+        self.restaurants = restaurants
+        self.dishes = dishes
+        self.menus_per_restaurant = menus_per_restaurant
+        self.dishes_per_menu = min(dishes_per_menu, dishes)
+        self.users = users
+        self.reviews = reviews
+        self.favorites = min(favorites, users * restaurants)
+
+
+def _bulk_insert(model, rows, chunk_size):
+    """Insère les dictionnaires de `rows` (générateur) par paquets, un commit par paquet."""
+    table = model.__table__
+    chunk, total = [], 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            db.session.execute(table.insert(), chunk)
+            db.session.commit()
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(table.insert(), chunk)
+        db.session.commit()
+        total += len(chunk)
+    return total
+
+
+def _timestamp(rng):
+    return EPOCH + timedelta(seconds=rng.randrange(TWO_YEARS))
+
+
+def _restaurant_rows(counts, rng, fake):
+    for i in range(1, counts.restaurants + 1):
+        cuisine = rng.choice(CUISINES)
+        city = rng.choice(CITIES)
+        yield {
+            'id': i,
+            'name': f"{fake.last_name()} {cuisine} #{i}",
+            'rating': rng.choice((2.5, 3.0, 3.5, 3.5, 4.0, 4.0, 4.0, 4.5, 4.5, 5.0)),
+            'image_url': f"https://picsum.photos/seed/restaurant{i}/400/300",
+            'phone_number': f"+1206{rng.randrange(10 ** 7):07d}",
+            'address': f"{rng.randrange(1, 9999)} {fake.street_name()}, {city}, WA {rng.randrange(98101, 98200)}",
+            'latitude': round(CITY_CENTER[0] + rng.uniform(-CITY_SPREAD[0], CITY_SPREAD[0]), 6),
+            'longitude': round(CITY_CENTER[1] + rng.uniform(-CITY_SPREAD[1], CITY_SPREAD[1]), 6),
+            'city': city,
+            'category': CATEGORY_BY_CUISINE[cuisine],
+        }
+
+
+def _dish_rows(counts, rng):
+    for i in range(1, counts.dishes + 1):
+        base = SAMPLE_DISHES[(i - 1) % len(SAMPLE_DISHES)]
+        variant = DISH_VARIANTS[((i - 1) // len(SAMPLE_DISHES)) % len(DISH_VARIANTS)]
+        yield {
+            'id': i,
+            'name': f"{variant}{base['name']}",
+            'description': base['description'],
+            'price': round(base['price'] + rng.choice((-2, -1, 0, 0, 1, 2, 3)), 2),
+        }
+
+
+def _menu_rows(counts):
+    menu_id = 0
+    for restaurant_id in range(1, counts.restaurants + 1):
+        for n in range(counts.menus_per_restaurant):
+            menu_id += 1
+            yield {'id': menu_id, 'name': MENU_NAMES[n % len(MENU_NAMES)], 'restaurant_id': restaurant_id}
+
+
+def _menu_dish_rows(counts, rng):
+    menus = counts.restaurants * counts.menus_per_restaurant
+    for menu_id in range(1, menus + 1):
+        for dish_id in rng.sample(range(1, counts.dishes + 1), counts.dishes_per_menu):
+            yield {'dish_id': dish_id, 'menu_id': menu_id}
+
+
+def _user_rows(counts, fake, password_hash):
+    for i in range(1, counts.users + 1):
+        yield {
+            'id': i,
+            'username': f"{fake.user_name()}{i}",
+            'email': f"user{i}@example.com",
+            '_password_hash': password_hash,
+        }
+
+
+def _favorite_rows(counts, rng):
+    seen = set()
+    while len(seen) < counts.favorites:
+        pair = (rng.randrange(1, counts.users + 1), rng.randrange(1, counts.restaurants + 1))
+        if pair in seen:
+            continue
+        seen.add(pair)
+        yield {'food_user_id': pair[0], 'restaurant_id': pair[1], 'created_at': _timestamp(rng)}
+
+
+def _review_rows(counts, rng, sentences):
+    # Chaque restaurant a une "qualité" propre : les notes s'en écartent d'environ
+    # une étoile, ce qui donne des moyennes et des classements réalistes.
+    quality = [0.0] + [rng.uniform(2.0, 4.8) for _ in range(counts.restaurants)]
+    # Popularité inégale : une minorité de restaurants concentre les critiques.
+    weights = [1.0 / (rank ** 0.8) for rank in range(1, counts.restaurants + 1)]
+    restaurant_ids = list(range(1, counts.restaurants + 1))
+    rng.shuffle(restaurant_ids)
+    batch = 10000
+    produced = 0
+    while produced < counts.reviews:
+        size = min(batch, counts.reviews - produced)
+        for restaurant_id in rng.choices(restaurant_ids, weights=weights, k=size):
+            rating = min(5, max(1, round(rng.gauss(quality[restaurant_id], 1.0))))
+            yield {
+                'content': ' '.join(rng.sample(sentences, rng.randint(1, 3))),
+                'rating': rating,
+                'review_date': _timestamp(rng),
+                'food_user_id': rng.randrange(1, counts.users + 1),
+                'restaurant_id': restaurant_id,
+            }
+        produced += size
+
+
+def seed_synthetic(counts, seed=42, chunk_size=20000, password='password'):
+    from faker import Faker
+
+    rng = Random(seed)
+    fake = Faker()
+    fake.seed_instance(seed)
+    # Réservoir de phrases : Faker est trop lent pour un appel par critique.
+    sentences = [fake.sentence(nb_words=rng.randint(6, 14)) for _ in range(2000)]
+    password_hash = password_hasher.generate(password)
+
+    print("Nettoyage des tables existantes...")
+    reset_schema()
+
+    steps = (
+        ("restaurants", Restaurant, _restaurant_rows(counts, rng, fake)),
+        ("plats", Dish, _dish_rows(counts, rng)),
+        ("menus", Menu, _menu_rows(counts)),
+        ("liens MenuDish", MenuDish, _menu_dish_rows(counts, rng)),
+        ("utilisateurs", FoodUser, _user_rows(counts, fake, password_hash)),
+        ("favoris", Favorite, _favorite_rows(counts, rng)),
+        ("critiques", Review, _review_rows(counts, rng, sentences)),
+    )
+    started = time.perf_counter()
+    for label, model, rows in steps:
+        step_start = time.perf_counter()
+        total = _bulk_insert(model, rows, chunk_size)
+        elapsed = time.perf_counter() - step_start
+        print(f"   -> {total} {label} en {elapsed:.1f} s ({total / max(elapsed, 1e-9):,.0f} lignes/s)")
+
+    step_start = time.perf_counter()
+    rebuild_review_aggregates()
+    rebuild_favorite_counts()
+    rebuild_scores()
+    print(f"   -> Agrégats, favoris et classement recalculés en {time.perf_counter() - step_start:.1f} s")
+    if db.engine.dialect.name == 'sqlite':
+        # Statistiques pour le planificateur de requêtes après un chargement massif.
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+    print(f"Base synthétique générée en {time.perf_counter() - started:.1f} s (graine {seed}).")
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Remplit la base : Yelp (par défaut) ou données synthétiques.")
+    parser.add_argument('--synthetic', action='store_true', help="Génération hors ligne, en masse et déterministe.")
+    parser.add_argument('--backfill-coordinates', action='store_true',
+                        help="Complète les coordonnées des restaurants existants depuis Yelp, sans vider la base.")
+    defaults = SyntheticCounts()
+    parser.add_argument('--restaurants', type=int, default=defaults.restaurants)
+    parser.add_argument('--dishes', type=int, default=defaults.dishes)
+    parser.add_argument('--menus-per-restaurant', type=int, default=defaults.menus_per_restaurant)
+    parser.add_argument('--dishes-per-menu', type=int, default=defaults.dishes_per_menu)
+    parser.add_argument('--users', type=int, default=defaults.users)
+    parser.add_argument('--reviews', type=int, default=defaults.reviews)
+    parser.add_argument('--favorites', type=int, default=defaults.favorites)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=20000)
+    parser.add_argument('--password', default='password')
+    args = parser.parse_args(argv)
+    if args.synthetic:
+        try:
+            args.counts = SyntheticCounts(
+                args.restaurants, args.dishes, args.menus_per_restaurant, args.dishes_per_menu,
+                args.users, args.reviews, args.favorites,
+            )
+        except ValueError as e:
+            parser.error(str(e))
+    return args
+
+
+def main(argv=None, app=None):
+    args = _parse_args(argv)
+    # Même configuration que l'API (config.make_app), sans ses routes ni ses sous-systèmes.
+    app = app or make_app()
     # Le contexte de l'application est essentiel pour interagir avec SQLAlchemy
     with app.app_context():
-        print("Début du remplissage de la base de données...")
-        seed_database()
+        if args.backfill_coordinates:
+            print("Ajout des coordonnées des restaurants à partir de l'API Yelp...")
+            backfill_coordinates()
+        else:
+            print("Début du remplissage de la base de données...")
+            if args.synthetic:
+                seed_synthetic(args.counts, seed=args.seed, chunk_size=args.chunk_size, password=args.password)
+            else:
+                seed_database()
+
+
+if __name__ == '__main__':
+    main()
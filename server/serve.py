@@ -0,0 +1,351 @@
+# serve.py
+# Serveur de production multi-processus ("préfork") :
+#
+#   python serve.py [--host 0.0.0.0] [--port 5000] [--workers 4]
+#
+# Le processus parent importe l'application, vérifie que le schéma est à la
+# révision de tête des migrations (sans db.create_all()), puis la "chauffe" :
+# configuration des mappers, classement et recommandations en mémoire, requêtes
+# sur les listes les plus demandées (cache des requêtes SQL compilées, cache de
+# réponses). Les objets ainsi créés sont gelés (gc.freeze) pour que le ramasse-
+# miettes des workers ne touche pas leurs pages : après le fork, elles restent
+# partagées en copie sur écriture. Le parent ouvre ensuite le port et crée N
+# workers ; chacun sert les requêtes avec des fils (serveur WSGI de Werkzeug,
+# sans mode debug) et relance ses fils de fond (classement, recommandations,
+# file de tâches). Un worker qui s'arrête est remplacé.
+#
+# Signaux du parent :
+#   SIGTERM, SIGINT  arrêt propre : les workers cessent d'accepter des
+#                    connexions et terminent leurs requêtes en cours
+#                    (--graceful-timeout secondes au plus).
+#   SIGHUP           rechargement : arrêt propre des workers, puis le parent se
+#                    ré-exécute (nouveau code, nouvelle configuration) en gardant
+#                    le port ouvert ; les connexions arrivées entre-temps
+#                    attendent dans la file d'écoute.
+#
+# Le rapport de démarrage détaille le coût de l'import, de la vérification du
+# schéma et de chaque étape de chauffe ; --check s'arrête après ce rapport.
+#
+# Caches propres à chaque processus : avec le LRU en mémoire, chaque worker
+# garde ses propres réponses, mais les versions des étiquettes sont partagées
+# (cache.SharedTagVersions, créées avant la chauffe) : une écriture traitée par
+# un worker périme les entrées de tous, y compris celles que la chauffe leur a
+# léguées. RESPONSE_CACHE_BACKEND=redis partage aussi les réponses. Les
+# identités de /check_session (SESSION_USER_CACHE_TTL) et le classement en
+# mémoire (LEADERBOARD_REFRESH_INTERVAL) restent propres à chaque worker ; leur
+# écart est borné par ces délais, signalés au démarrage.
+import time
+
+_STARTED = time.perf_counter()
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+
+from werkzeug.serving import make_server
+from werkzeug.wsgi import ClosingIterator
+
+logger = logging.getLogger('serve')
+
+LISTEN_FD_VARIABLE = 'SERVE_LISTEN_FD'
+# Pages servies au chargement du client ; SERVE_WARM_PATHS=/a,/b ou --warm-path les remplacent.
+DEFAULT_WARM_PATHS = ('/restaurants', '/leaderboard')
+
+
+def _ms(seconds):
+    return f'{seconds * 1000:.1f} ms'
+
+
+class InFlight:
+    """Middleware WSGI : compte les requêtes en cours (réponses en flux comprises)."""
+
+    def __init__(self, app):
+        self.app = app
+        self.count = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.count += 1
+        try:
+            return ClosingIterator(self.app(environ, start_response), [self._done])
+        except BaseException:
+            self._done()
+            raise
+
+    def _done(self):
+        with self._lock:
+            self.count -= 1
+            if not self.count:
+                self._idle.notify_all()
+
+    def wait_idle(self, timeout):
+        with self._lock:
+            return self._idle.wait_for(lambda: not self.count, timeout)
+
+
+# ------------------ DÉMARRAGE DU PARENT ------------------
+
+def warm_up(app, paths, recommendations=True):
+    """Chauffe les caches du processus parent ; renvoie [(étape, durée en s)]."""
+    from sqlalchemy.orm import configure_mappers
+
+    from leaderboard import leaderboard
+    from recommendations import recommender
+
+    steps = [('mappers', configure_mappers), ('classement', leaderboard.ensure_loaded)]
+    if recommendations:
+        steps.append(('recommandations', recommender.ensure_loaded))
+
+    timings = []
+    with app.app_context():
+        for name, step in steps:
+            started = time.perf_counter()
+            step()
+            timings.append((name, time.perf_counter() - started))
+
+    client = app.test_client()
+    for path in paths:
+        started = time.perf_counter()
+        status = client.get(path).status_code
+        timings.append((f'GET {path} ({status})', time.perf_counter() - started))
+    return timings
+
+
+def process_caches(app):
+    """Avertissements sur l'état en mémoire que chaque worker garde pour lui."""
+    config = app.config
+    return [
+        f"identités de /check_session : cache par worker, écart jusqu'à "
+        f"{config.get('SESSION_USER_CACHE_TTL', 30)} s après une modification",
+        f"classement : calculé par worker, écart jusqu'à "
+        f"{config.get('LEADERBOARD_REFRESH_INTERVAL', 900)} s pour les écritures des autres workers",
+    ]
+
+
+def listening_socket(host, port, backlog=2048):
+    """Socket d'écoute hérité d'un rechargement (SIGHUP), sinon créé."""
+    inherited = os.environ.pop(LISTEN_FD_VARIABLE, None)
+    if inherited is not None:
+        return socket.socket(fileno=int(inherited))
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+# ------------------ WORKERS ------------------
+
+class Arbiter:
+    def __init__(self, app, sock, host, port, workers, graceful_timeout):
+        self.app = app
+        self.sock = sock
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.children = {}       # pid -> numéro du worker
+        self._signal = None
+
+    # --- dans le worker ---
+
+    def _serve(self, number):
+        from config import db
+        from jobs import job_queue
+        from leaderboard import leaderboard
+        from recommendations import recommender
+
+        signal.signal(signal.SIGINT, signal.SIG_IGN)   # Ctrl-C : le parent coordonne l'arrêt
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+        app = self.app
+        with app.app_context():
+            # Aucune connexion du parent n'est réutilisée après le fork.
+            db.engine.dispose(close=False)
+        app.config['BACKGROUND_THREADS'] = True
+        leaderboard.start_thread()
+        recommender.start_thread()
+        job_queue.start()
+
+        in_flight = InFlight(app)
+        server = make_server(self.host, self.port, in_flight, threaded=True, fd=self.sock.fileno())
+
+        def stop(signum, frame):
+            # shutdown() attend la fin de serve_forever : appelé depuis un autre fil.
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, stop)
+        logger.info("worker %s prêt (pid %s)", number, os.getpid())
+        server.serve_forever()
+        if not in_flight.wait_idle(self.graceful_timeout):
+            logger.warning("worker %s : %s requête(s) interrompue(s)", number, in_flight.count)
+        server.socket.close()
+
+    def spawn(self, number):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = number
+            return pid
+        code = 0
+        try:
+            self._serve(number)
+        except BaseException:
+            logger.exception("worker %s : arrêt sur erreur", number)
+            code = 1
+        finally:
+            os._exit(code)
+
+    # --- dans le parent ---
+
+    def _on_signal(self, signum, frame):
+        self._signal = signum
+
+    def _reap(self):
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if not pid:
+                return
+            number = self.children.pop(pid, None)
+            if number is not None and self._signal is None:
+                logger.warning("worker %s (pid %s) arrêté (code %s) : remplacé",
+                               number, pid, os.waitstatus_to_exitcode(status))
+
+    def stop_workers(self):
+        """Arrêt propre de tous les workers (SIGKILL au-delà du délai)."""
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.graceful_timeout + 1
+        while self.children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.05)
+        for pid in list(self.children):
+            logger.warning("worker pid %s : arrêt forcé", pid)
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+            self.children.pop(pid, None)
+
+    def run(self):
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, self._on_signal)
+
+        last_spawn = {}
+        while self._signal is None:
+            self._reap()
+            running = set(self.children.values())
+            for number in range(self.workers):
+                if number not in running:
+                    # Un worker qui meurt dès son démarrage n'est relancé qu'après 1 s.
+                    if time.monotonic() - last_spawn.get(number, -1.0) >= 1.0:
+                        last_spawn[number] = time.monotonic()
+                        self.spawn(number)
+            time.sleep(0.2)
+
+        logger.info("signal %s : arrêt des workers", signal.Signals(self._signal).name)
+        self.stop_workers()
+        if self._signal == signal.SIGHUP:
+            self.reload()
+
+    def reload(self):
+        """Se ré-exécute en transmettant le socket d'écoute (le port reste ouvert)."""
+        fd = self.sock.fileno()
+        os.set_inheritable(fd, True)
+        os.environ[LISTEN_FD_VARIABLE] = str(fd)
+        logger.info("rechargement")
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+
+def parse_args(argv=None):
+    environ = os.environ
+    parser = argparse.ArgumentParser(description="Serveur de production multi-processus (préfork).")
+    parser.add_argument('--host', default=environ.get('SERVE_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(environ.get('SERVE_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--graceful-timeout', type=float, default=float(environ.get('SERVE_GRACEFUL_TIMEOUT', 30)),
+                        help="Secondes laissées aux requêtes en cours lors d'un arrêt ou d'un rechargement.")
+    parser.add_argument('--warm-path', action='append', dest='warm_paths',
+                        help="URL à précharger (répétable ; défaut : SERVE_WARM_PATHS ou listes principales).")
+    parser.add_argument('--skip-recommendations', action='store_true',
+                        help="Ne pas calculer les recommandations avant d'ouvrir le port.")
+    parser.add_argument('--check', action='store_true',
+                        help="Import, vérification du schéma et chauffe, puis rapport et sortie.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(process)d] %(message)s')
+    report = []
+
+    started = time.perf_counter()
+    from app import app
+    from cache import response_cache
+    from database import SchemaOutdated, check_schema, startup_report
+    report.append(('import', _ms(time.perf_counter() - started)))
+
+    if args.workers > 1:
+        for warning in process_caches(app):
+            logger.warning("%s workers, %s", args.workers, warning)
+
+    started = time.perf_counter()
+    try:
+        revisions = check_schema(app)
+    except SchemaOutdated as e:
+        print(e, file=sys.stderr)
+        return 1
+    report.append(('schéma', f"{_ms(time.perf_counter() - started)} (révision {', '.join(sorted(revisions))})"))
+
+    # Pas de fils de fond dans le parent : ils ne survivraient pas au fork.
+    app.config['BACKGROUND_THREADS'] = False
+    # Avant la chauffe : les réponses léguées aux workers portent les versions partagées.
+    if response_cache.share_versions():
+        report.append(('cache', "réponses par worker, versions des étiquettes partagées"))
+    started = time.perf_counter()
+    paths = args.warm_paths or [p for p in os.environ.get('SERVE_WARM_PATHS', '').split(',') if p] or DEFAULT_WARM_PATHS
+    timings = warm_up(app, paths, not args.skip_recommendations)
+    with app.app_context():
+        # Les connexions ouvertes par la chauffe ne doivent pas être partagées par les workers.
+        app.extensions['sqlalchemy'].engine.dispose()
+    gc.collect()
+    gc.freeze()
+    report.append(('chauffe', _ms(time.perf_counter() - started)))
+    report += [(f'  {name}', _ms(seconds)) for name, seconds in timings]
+    report.append(('objets gelés', gc.get_freeze_count()))
+    report.append(('total', _ms(time.perf_counter() - _STARTED)))
+
+    print("\n---------------------------------------------------------")
+    print("API Food Review : démarrage (production)")
+    print("---------------------------------------------------------")
+    for key, value in report + startup_report(app):
+        print(f"  {key:<16} {value}")
+    print(flush=True)
+    if args.check:
+        return 0
+
+    sock = listening_socket(args.host, args.port)
+    print(f"  {args.workers} worker(s) sur http://{args.host}:{args.port} (pid {os.getpid()})\n", flush=True)
+    Arbiter(app, sock, args.host, args.port, args.workers, args.graceful_timeout).run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+# session_cache.py
+# Cache en mémoire (TTL court) des identités des utilisateurs connectés.
+#
+# Le client interroge /check_session à chaque chargement : la réponse se limite
+# à l'identité (id, username, email, google_id) et est servie depuis ce cache
+# sans toucher la base. Les entrées sont invalidées par FoodUsersById.patch /
+# delete ; le TTL borne l'écart entre plusieurs processus.
+import threading
+import time
+
+from config import db
+from food_user import FoodUser
+
+IDENTITY_COLUMNS = (FoodUser.id, FoodUser.username, FoodUser.email, FoodUser.google_id)
+
+
+class SessionUserCache:
+    def __init__(self, ttl=30, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('SESSION_USER_CACHE_TTL', self.ttl)
+        self.max_entries = app.config.get('SESSION_USER_CACHE_MAX_ENTRIES', self.max_entries)
+
+    def get(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, identity = entry
+        if expires_at < time.monotonic():
+            self.invalidate(user_id)
+            return None
+        return identity
+
+    def put(self, user_id, identity):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # Purge des entrées expirées, puis des plus anciennes si nécessaire.
+                now = time.monotonic()
+                for key in [k for k, (expires_at, _) in self._entries.items() if expires_at < now]:
+                    del self._entries[key]
+                while len(self._entries) >= self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+            self._entries[user_id] = (time.monotonic() + self.ttl, identity)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def load(self, user_id):
+        """Identité de l'utilisateur (cache, sinon une requête sur 4 colonnes) ; None s'il n'existe plus."""
+        identity = self.get(user_id)
+        if identity is not None:
+            return identity
+        row = db.session.query(*IDENTITY_COLUMNS).filter(FoodUser.id == user_id).first()
+        if row is None:
+            return None
+        identity = dict(row._mapping)
+        self.put(user_id, identity)
+        return identity
+
+
+session_users = SessionUserCache()
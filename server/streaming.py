@@ -0,0 +1,61 @@
+# streaming.py
+# Réponses JSON en flux pour les grosses collections (/reviews, /dishes,
+# /food_users, /menus).
+#
+# Au lieu de construire la liste complète des dictionnaires puis de l'encoder
+# d'un bloc, la requête est parcourue par paquets (yield_per) et chaque ligne
+# est sérialisée puis envoyée immédiatement (réponse "chunked"). La mémoire
+# utilisée par requête reste ainsi constante, quelle que soit la taille du résultat.
+#
+# Activation : ?stream=1 (tableau JSON compact) ou ?format=ndjson /
+# Accept: application/x-ndjson (un objet JSON par ligne).
+import json
+
+from flask import Response, request, stream_with_context
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+DEFAULT_BATCH_SIZE = 500
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def wants_ndjson():
+    if request.args.get('format') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def wants_stream():
+    return request.args.get('stream') in ('1', 'true') or wants_ndjson()
+
+
+def _json_array(rows, serialize):
+    yield '['
+    first = True
+    for row in rows:
+        if first:
+            first = False
+            yield _encoder.encode(serialize(row))
+        else:
+            yield ',' + _encoder.encode(serialize(row))
+    yield ']'
+
+
+def _ndjson(rows, serialize):
+    for row in rows:
+        yield _encoder.encode(serialize(row)) + '\n'
+
+
+def stream_query(query, serialize, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Renvoie une réponse en flux sérialisant chaque ligne de `query` avec `serialize`.
+    Les options de chargement de la requête doivent être compatibles avec
+    yield_per (selectinload ou joinedload sur des relations many-to-one).
+    """
+    rows = query.yield_per(batch_size)
+    if wants_ndjson():
+        body, mimetype = _ndjson(rows, serialize), NDJSON_MIMETYPE
+    else:
+        body, mimetype = _json_array(rows, serialize), 'application/json'
+    # stream_with_context garde la session SQLAlchemy ouverte pendant l'envoi.
+    return Response(stream_with_context(body), mimetype=mimetype)
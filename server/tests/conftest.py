@@ -0,0 +1,32 @@
+# tests/conftest.py
+# Application de test : base SQLite temporaire (DATABASE_URL), schéma créé par
+# db.create_all() (avec les index FTS et R*Tree des écouteurs de search.py et
+# geo.py), sans fils de fond.
+import os
+import sys
+import tempfile
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+_DATABASE = os.path.join(tempfile.mkdtemp(prefix='food-tests-'), 'test.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{_DATABASE}'
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app
+    from config import db
+
+    app.config.update(TESTING=True, BACKGROUND_THREADS=False)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,83 @@
+# tests/test_cache_invalidation.py
+# Une écriture doit périmer toutes les réponses en cache qui l'affichent, et
+# les versions des étiquettes ne doivent pas être évincées avec les réponses.
+import os
+
+import pytest
+
+from cache import LRUBackend, SharedTagVersions, response_cache
+from config import db
+from food_user import FoodUser
+from leaderboard import leaderboard
+from menu import Menu
+from restaurant import Restaurant
+
+
+@pytest.fixture(scope='module')
+def restaurant(app):
+    with app.app_context():
+        restaurant = Restaurant(name='Invalidation Bistro', rating=4.0, address='2 Pike St, Seattle, WA')
+        user = FoodUser(username='invalidation', email='invalidation@example.com')
+        db.session.add_all([restaurant, user])
+        db.session.flush()
+        db.session.add(Menu(name='Midi', restaurant_id=restaurant.id))
+        db.session.commit()
+        return restaurant.id, user.id
+
+
+def review_counts(client, restaurant_id):
+    menus = client.get(f'/menus?restaurant_id={restaurant_id}').get_json()
+    listed = client.get('/restaurants?name_prefix=Invalidation').get_json()
+    detail = client.get(f'/restaurants/{restaurant_id}').get_json()
+    return {
+        'menus': menus[0]['restaurant']['review_count'],
+        'restaurants': next(r['review_count'] for r in listed if r['id'] == restaurant_id),
+        'detail': detail['review_count'],
+    }
+
+
+def test_review_write_refreshes_cached_reads(client, restaurant):
+    restaurant_id, user_id = restaurant
+    response_cache.clear()
+    assert review_counts(client, restaurant_id) == {'menus': 0, 'restaurants': 0, 'detail': 0}
+
+    response = client.post('/reviews', json={'content': 'Très bon', 'rating': 5,
+                                             'restaurant_id': restaurant_id, 'food_user_id': user_id})
+    assert response.status_code == 201, response.get_data(as_text=True)
+    assert review_counts(client, restaurant_id) == {'menus': 1, 'restaurants': 1, 'detail': 1}
+
+
+def test_score_persist_refreshes_cached_reads(app, client, restaurant):
+    restaurant_id, _ = restaurant
+    response_cache.clear()
+    assert client.get(f'/restaurants/{restaurant_id}').get_json()['bayesian_score'] is None
+
+    leaderboard._dirty = {restaurant_id: 4.5}
+    with app.app_context():
+        assert leaderboard.persist() == 1
+    assert client.get(f'/restaurants/{restaurant_id}').get_json()['bayesian_score'] == 4.5
+    assert client.get('/restaurants?sort=-score&name_prefix=Invalidation').get_json()[0]['id'] == restaurant_id
+
+
+def test_tag_versions_survive_eviction(app):
+    backend = response_cache.backend
+    response_cache.backend = LRUBackend(max_entries=4)
+    try:
+        before = response_cache._tag_versions(['menus'])['menus']
+        response_cache.invalidate({'menus'})
+        for i in range(16):
+            response_cache.backend.set(f'response:/filler?{i}', {})
+        assert response_cache._tag_versions(['menus']) == {'menus': before + 1}
+    finally:
+        response_cache.backend = backend
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="workers de serve.py : fork requis")
+def test_shared_tag_versions_cross_fork():
+    versions = SharedTagVersions(slots=64)
+    pid = os.fork()
+    if not pid:
+        versions.incr({'menus', 'restaurant:1'})
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert versions.get(['menus', 'restaurant:1']) == {'menus': 1, 'restaurant:1': 1}
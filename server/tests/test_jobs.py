@@ -0,0 +1,99 @@
+# tests/test_jobs.py
+# File de tâches (jobs.py) : déduplication, délai exponentiel, reprise des
+# tâches abandonnées et `flask jobs retry`.
+from datetime import timedelta
+
+import pytest
+
+from config import db
+from job import FAILED, PENDING, RUNNING, Job
+from jobs import _now, job_queue
+
+calls = []
+
+
+@job_queue.handler('tests.ok')
+def ok_job(value=None):
+    calls.append(value)
+
+
+@job_queue.handler('tests.boom')
+def boom_job():
+    raise RuntimeError('boom')
+
+
+@pytest.fixture(autouse=True)
+def queue(app):
+    with app.app_context():
+        db.session.query(Job).delete()
+        db.session.commit()
+        calls.clear()
+        yield job_queue
+        db.session.rollback()
+
+
+def statuses():
+    db.session.expire_all()
+    return [(job.dedup_key, job.status) for job in Job.query.order_by(Job.id)]
+
+
+def failed_job(key):
+    """Tâche de clé `key` marquée 'failed' après sa dernière tentative."""
+    job_id = job_queue.enqueue('tests.boom', key=key, max_attempts=1)
+    assert job_queue.run_one('test')
+    assert db.session.get(Job, job_id).status == FAILED
+    return job_id
+
+
+def test_enqueue_merges_pending_jobs_with_the_same_key(queue):
+    assert queue.enqueue('tests.ok', {'value': 1}, key='k') is not None
+    assert queue.enqueue('tests.ok', {'value': 2}, key='k') is None
+    assert queue.run_one('test') and not queue.run_one('test')
+    assert calls == [1]
+    # Une fois la première exécutée, la clé est de nouveau libre.
+    assert queue.enqueue('tests.ok', {'value': 3}, key='k') is not None
+
+
+def test_failed_attempt_is_rescheduled_with_backoff(queue):
+    job_id = queue.enqueue('tests.boom', max_attempts=3)
+    for attempt in (1, 2):
+        started = _now()
+        assert queue.run_one('test')
+        job = db.session.get(Job, job_id)
+        db.session.refresh(job)
+        assert (job.status, job.attempts) == (PENDING, attempt)
+        assert 'boom' in job.last_error
+        delay = queue.retry_backoff * 2 ** (attempt - 1)
+        assert started + timedelta(seconds=delay) <= job.run_at <= _now() + timedelta(seconds=delay)
+        job.run_at = _now()
+        db.session.commit()
+    assert queue.run_one('test')
+    db.session.refresh(job)
+    assert (job.status, job.attempts) == (FAILED, 3)
+
+
+def test_stale_running_jobs_are_requeued_once_per_key(queue):
+    for _ in range(2):
+        queue.enqueue('tests.ok', key='k')
+        assert queue.claim('gone') is not None
+    db.session.query(Job).update({Job.locked_at: _now() - timedelta(seconds=queue.lock_timeout + 1)})
+    db.session.commit()
+    assert queue.requeue_stale() == 1
+    assert statuses() == [('k', FAILED), ('k', PENDING)]
+
+
+def test_retry_requeues_the_newest_failed_job_per_key(queue):
+    older, newer = failed_job('k'), failed_job('k')
+    failed_job(None)
+    assert queue.retry() == 2
+    assert statuses() == [('k', FAILED), ('k', PENDING), (None, PENDING)]
+    assert db.session.get(Job, newer).attempts == 0
+    # Déjà une tâche en attente pour la clé : rien à relancer.
+    assert queue.retry([older]) == 0
+
+
+def test_retry_skips_keys_already_pending(queue):
+    failed_job('k')
+    queue.enqueue('tests.ok', key='k')
+    assert queue.retry() == 0
+    assert statuses() == [('k', FAILED), ('k', PENDING)]
@@ -0,0 +1,73 @@
+# tests/test_query_counts.py
+# Les arbres de chargement de loading.py (et les read models) doivent lire un
+# restaurant et ses menus en un nombre fixe de requêtes SQL, quel que soit le
+# nombre de critiques, de favoris, de menus et de plats.
+import pytest
+from sqlalchemy import event
+
+from cache import response_cache
+from config import db
+from dish import Dish
+from favorite import Favorite
+from food_user import FoodUser
+from menu import Menu
+from menu_dish import MenuDish
+from restaurant import Restaurant
+from review import Review
+
+ENDPOINTS = [
+    '/restaurants/{id}',
+    '/restaurants/{id}/menus',
+    '/menus?restaurant_id={id}',
+]
+
+
+def make_restaurant(n):
+    """Restaurant avec n critiques, n favoris, n menus de n plats chacun."""
+    restaurant = Restaurant(name=f'Restaurant {n}', rating=4.0, address='1 Pine St, Seattle, WA')
+    users = [FoodUser(username=f'user{n}x{i}', email=f'user{n}x{i}@example.com') for i in range(n)]
+    db.session.add(restaurant)
+    db.session.add_all(users)
+    db.session.flush()
+    for i, user in enumerate(users):
+        db.session.add(Review(content=f'Critique {i}', rating=1 + i % 5,
+                              food_user_id=user.id, restaurant_id=restaurant.id))
+        db.session.add(Favorite(food_user_id=user.id, restaurant_id=restaurant.id))
+        menu = Menu(name=f'Menu {i}', restaurant_id=restaurant.id)
+        db.session.add(menu)
+        for j in range(n):
+            dish = Dish(name=f'Plat {n}-{i}-{j}', description='Plat du jour', price=10.0 + j)
+            db.session.add(MenuDish(menu=menu, dish=dish))
+    db.session.commit()
+    return restaurant.id
+
+
+def count_queries(client, app, path):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    response_cache.clear()
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return len(statements)
+
+
+@pytest.fixture(scope='module')
+def restaurants(app):
+    with app.app_context():
+        return {n: make_restaurant(n) for n in (1, 3, 8)}
+
+
+@pytest.mark.parametrize('endpoint', ENDPOINTS)
+def test_query_count_does_not_grow_with_related_rows(app, client, restaurants, endpoint):
+    counts = {n: count_queries(client, app, endpoint.format(id=restaurant_id))
+              for n, restaurant_id in restaurants.items()}
+    assert len(set(counts.values())) == 1, f"{endpoint} : requêtes SQL par taille {counts}"